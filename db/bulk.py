@@ -0,0 +1,42 @@
+# headlines への一括書き込み
+# 1行ずつ session.add() → commit() → refresh() すると1件あたり2〜3往復かかるので、
+# チャンクごとに複数行の INSERT IGNORE（または INSERT ... ON DUPLICATE KEY UPDATE）1本で書き込む。
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert # MySQL 方言の INSERT（prefix IGNORE / on_duplicate_key_update が使える）
+from db.models import Headline, url_hash
+
+CHUNK_SIZE = 500 # 1本の INSERT に詰める行数（max_allowed_packet を超えない程度に）
+
+def bulk_insert_headlines(session, records, on_duplicate="ignore", chunk_size=CHUNK_SIZE):
+    """
+    records: [dict(source=..., title=..., url=..., date=..., ...), ...]（キーは Headline のカラム名。url_hash は無ければここで付ける）
+    on_duplicate:
+      "ignore" … 同じ url_hash が既にあればその行はそのまま（INSERT IGNORE）
+      "update" … 既存行を渡された値で上書き（INSERT ... ON DUPLICATE KEY UPDATE）
+    戻り値: {url_hash: id}（今回入れた行も、既にあった行も含む）
+    commit は呼び出し側で行う。
+    """
+    ids = {}
+    rows = []
+    for rec in records:
+        row = dict(rec)
+        row.setdefault("url_hash", url_hash(row["url"]))
+        rows.append(row)
+    columns = sorted({k for row in rows for k in row}) # 複数行 VALUES は全行同じ列が必要なので、足りない列は None で埋める
+    rows = [{c: row.get(c) for c in columns} for row in rows]
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        stmt = mysql_insert(Headline.__table__).values(chunk) # 複数行 VALUES (...), (...), ... の1文
+        if on_duplicate == "update":
+            stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns if c not in ("id", "url", "url_hash")})
+        else:
+            stmt = stmt.prefix_with("IGNORE")
+        session.execute(stmt)
+
+        # 採番された id はユニーク索引で引き直す（IGNORE でスキップされた行があると LAST_INSERT_ID からは逆算できないため）
+        hashes = [row["url_hash"] for row in chunk]
+        ids.update(session.execute(
+            select(Headline.url_hash, Headline.id).where(Headline.url_hash.in_(hashes))
+        ).all())
+    return ids
@@ -0,0 +1,125 @@
+# 日ごとのダイジェスト（headline_digest テーブル）の更新と再構築
+# 「ソースごとの新しい順 N 件」「カテゴリごとの新しい順 N 件」を毎回 headlines から数え直さないように、
+# 各記事の (日付, ソース) 内の順位・(日付, カテゴリ) 内の順位を持った表を、save_headlines の書き込みと一緒に更新しておく。
+# 読む側は (date, source, source_rank) / (category, date, category_rank) の索引を範囲で読むだけで上位 N 件が揃う。
+# 順位は id の新しい順（1 が最新）。どちらの順位も MAX_RANK を超えた行は持たない（表の大きさは 日数 × グループ数 × MAX_RANK まで）。
+# 実行：python -m db.digest rebuild [YYYY-MM-DD]   … その日以降（省略時は全期間）を headlines から作り直す
+import sys # sys：サブコマンド
+from collections import Counter
+from sqlalchemy import text, bindparam
+
+MAX_RANK = 50 # 各グループで持っておく上位件数（読む側の N はこれ以下にする）
+OTHER = "その他" # カテゴリが NULL/空 の行のまとめ先（utils.categorize.OTHER と同じ）
+
+def _category(value):
+    return value or OTHER
+
+def update_digest(conn, rows):
+    """
+    rows: 今回 headlines に新しく入った行 [dict(id, date, source, category), ...]
+    既存の行より id が大きい（AUTO_INCREMENT で後から入った）前提で、
+      1) 同じ (日付, ソース)・(日付, カテゴリ) の既存行の順位を、今回の件数ぶん後ろへずらし
+      2) 今回の行を 1, 2, ... 位として入れ
+      3) どちらの順位も MAX_RANK を超えた行を消す
+    conn は Connection でも Session でもよい（commit は呼び出し側）。
+    """
+    if not rows:
+        return
+    # 既にダイジェストにある行（同時に走った別の実行が入れたものなど）は除く
+    known = {hid for (hid,) in conn.execute(
+        text("SELECT headline_id FROM headline_digest WHERE headline_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": [r["id"] for r in rows]},
+    )}
+    rows = sorted((r for r in rows if r["id"] not in known), key=lambda r: r["id"], reverse=True) # 新しい順
+    if not rows:
+        return
+    by_source = Counter((r["date"], r["source"]) for r in rows)
+    by_category = Counter((r["date"], _category(r["category"])) for r in rows)
+
+    # 1) 既存行の順位をずらす（グループごとに1本の executemany）
+    conn.execute(
+        text("UPDATE headline_digest SET source_rank = source_rank + :n WHERE date = :date AND source = :source"),
+        [{"n": n, "date": d, "source": s} for (d, s), n in by_source.items()],
+    )
+    conn.execute(
+        text("UPDATE headline_digest SET category_rank = category_rank + :n WHERE date = :date AND category = :category"),
+        [{"n": n, "date": d, "category": c} for (d, c), n in by_category.items()],
+    )
+
+    # 2) 今回の行を上位として入れる
+    source_pos, category_pos = Counter(), Counter()
+    inserts = []
+    for r in rows:
+        category = _category(r["category"])
+        source_pos[(r["date"], r["source"])] += 1
+        category_pos[(r["date"], category)] += 1
+        inserts.append({
+            "id": r["id"], "date": r["date"], "source": r["source"], "category": category,
+            "source_rank": source_pos[(r["date"], r["source"])],
+            "category_rank": category_pos[(r["date"], category)],
+        })
+    conn.execute(
+        text("INSERT INTO headline_digest (headline_id, date, source, category, source_rank, category_rank) "
+             "VALUES (:id, :date, :source, :category, :source_rank, :category_rank)"),
+        inserts,
+    )
+
+    # 3) どちらのグループでも上位に入らなくなった行を落とす
+    conn.execute(
+        text("DELETE FROM headline_digest WHERE date = :date AND source_rank > :max AND category_rank > :max"),
+        [{"date": d, "max": MAX_RANK} for d in {r["date"] for r in rows}],
+    )
+
+# 順位を付けて上位だけ入れる INSERT ... SELECT（{where} で対象の日を、{extra} で入れるカテゴリを絞る）
+_INSERT_RANKED = f"""
+    INSERT INTO headline_digest (headline_id, date, source, category, source_rank, category_rank)
+    SELECT id, date, source, category, source_rank, category_rank
+      FROM (SELECT id, date, source,
+                   COALESCE(NULLIF(category, ''), '{OTHER}') AS category,
+                   ROW_NUMBER() OVER (PARTITION BY date, source ORDER BY id DESC) AS source_rank,
+                   ROW_NUMBER() OVER (PARTITION BY date, COALESCE(NULLIF(category, ''), '{OTHER}') ORDER BY id DESC) AS category_rank
+              FROM headlines
+             WHERE {{where}}) ranked
+     WHERE (source_rank <= :max OR category_rank <= :max){{extra}}
+"""
+REBUILD_SQL = text(_INSERT_RANKED.format(where="date >= :since", extra=""))
+REFRESH_SQL = text(_INSERT_RANKED.format(where="date = :date", extra=" AND category IN :categories")) \
+    .bindparams(bindparam("categories", expanding=True))
+
+def refresh_categories(conn, groups):
+    """
+    再分類でカテゴリが変わったときに、変わった (日付, カテゴリ) のグループだけ順位を付け直す。
+    groups：{(date, category), ...}（変わった行の、変わる前と後のカテゴリの両方）
+    ソースは変わらないのでソース内の順位はそのまま。その日の行だけを読んで、対象カテゴリの行を入れ直す。
+    ダイジェストがまだ空（作っていない）なら何もしない（読む側は headlines から数える）。作り直した日数を返す。
+    conn は Connection でも Session でもよい（commit は呼び出し側）。
+    """
+    if not groups or conn.execute(text("SELECT 1 FROM headline_digest LIMIT 1")).first() is None:
+        return 0
+    by_date = {}
+    for d, category in groups:
+        by_date.setdefault(d, set()).add(_category(category))
+    delete = text("DELETE FROM headline_digest WHERE date = :date AND category IN :categories") \
+        .bindparams(bindparam("categories", expanding=True))
+    for d, categories in by_date.items():
+        params = {"date": d, "categories": sorted(categories), "max": MAX_RANK}
+        conn.execute(delete, params)
+        conn.execute(REFRESH_SQL, params)
+    return len(by_date)
+
+def rebuild_digest(engine, since=None):
+    """since（date / 'YYYY-MM-DD'）以降の日付のダイジェストを headlines から作り直す（省略時は全期間）。入った行数を返す"""
+    since = since or "1000-01-01"
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM headline_digest WHERE date >= :since"), {"since": since})
+        inserted = conn.execute(REBUILD_SQL, {"since": since, "max": MAX_RANK}).rowcount
+    print(f"✅ digest: {since} 以降を再構築（{inserted}行）")
+    return inserted
+
+# 直接実行：python -m db.digest rebuild [YYYY-MM-DD]
+if __name__ == "__main__":
+    from db.settings import engine
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        rebuild_digest(engine, sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        print("使い方: python -m db.digest rebuild [YYYY-MM-DD]")
@@ -1,9 +1,16 @@
 # SQLAlchemyを使ってテーブルを自動的にデータベースに作成する処理
 from db.models import Base # Base は 「どんなテーブルが定義されているか」情報を記録しているオブジェクト
 from db.settings import engine # engine は「どこに、どうやって接続するか」を知っているオブジェクト
+from db.migrations import migrate, check_hot_queries # 既存テーブルへのカラム・インデックス追加（バージョン管理つき）
 
 # モデル Headline(Base) が定義している headlines テーブルが、MySQLデータベースに作成される
   # Base.metadata：すべてのテーブル定義の「設計図の集合体」のようなもの。
   # .create_all(...)：その設計図に従って、まだ存在しないテーブルを作成する。
   # bind=engine：どのデータベースに作成するかを指定（接続情報）。
 Base.metadata.create_all(bind=engine)
+
+# すでにあるテーブルには create_all が何もしないので、後から増えたカラム・インデックスをここで反映する
+migrate(engine)
+
+# よく走るクエリが索引を使えているかを確認（使えていないものは ⚠️ で表示）
+check_hot_queries(engine)
@@ -0,0 +1,106 @@
+# キーワードの正規化テーブル（headline_keywords）と日ごとの件数（keyword_daily_counts）の更新・再構築
+# headlines.keywords はカンマ区切りの文字列なので、「『日銀』の付いた記事」「今週よく出たキーワード」を出すには
+# LIKE の全件走査と Python での分割が要る。ここで1記事1キーワード1行の表と、(日付, キーワード) ごとの件数を持っておき、
+# 読む側（db/queries.py の headlines_by_keyword / trending_keywords、サーバーの /tag・/trending）は索引を範囲で読むだけにする。
+# save_headlines の書き込みと一緒に、今回入った行のぶんだけ件数を足していく（INSERT ... ON DUPLICATE KEY UPDATE count = count + n）。
+# 実行：python -m db.keywords rebuild [YYYY-MM-DD]   … その日以降（省略時は全期間）を headlines.keywords から作り直す
+import sys # sys：サブコマンド
+import unicodedata # unicodedata：全角/半角をそろえる（NFKC）
+from collections import Counter
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.mysql import insert as mysql_insert # MySQL 方言の INSERT（prefix IGNORE / on_duplicate_key_update が使える）
+from db.models import HeadlineKeyword, KeywordDailyCount
+
+KEYWORD_MAX_CHARS = 100 # headline_keywords.keyword の長さ
+CHUNK_SIZE = 5000 # 再構築で1回に読む行数
+
+def normalize_keyword(keyword: str) -> str:
+    """NFKC ＋ 前後の空白除去（大文字・小文字はそのまま。DB の列は utf8mb4_bin なので、この結果の文字列がそのままキーになる）"""
+    return unicodedata.normalize("NFKC", keyword or "").strip()[:KEYWORD_MAX_CHARS]
+
+def split_keywords(csv: str):
+    """'日銀, 利上げ,日銀' → ['日銀', '利上げ']（正規化・空の除去・重複の除去。順番は元のまま）"""
+    out, seen = [], set()
+    for kw in (csv or "").split(","):
+        kw = normalize_keyword(kw)
+        if kw and kw.casefold() not in seen: # 1つの記事に 'AI' と 'ai' が並んだら最初の表記だけにする
+            seen.add(kw.casefold())
+            out.append(kw)
+    return out
+
+def _insert_keywords(conn, pairs):
+    """pairs: [dict(headline_id, keyword, date), ...] を INSERT IGNORE でまとめて入れる"""
+    for start in range(0, len(pairs), CHUNK_SIZE):
+        conn.execute(mysql_insert(HeadlineKeyword.__table__).values(pairs[start:start + CHUNK_SIZE]).prefix_with("IGNORE"))
+
+def save_keywords(conn, rows):
+    """
+    rows: 今回 headlines に新しく入った行 [dict(id, date, keywords), ...]（keywords は CSV）
+      1) 記事ごとのキーワードを headline_keywords に入れ
+      2) (日付, キーワード) ごとの件数を今回のぶんだけ足す
+    既に headline_keywords にある記事（同時に走った別の実行が入れたものなど）は、二重に数えないよう除く。
+    conn は Connection でも Session でもよい（commit は呼び出し側）。
+    """
+    rows = [r for r in rows if r.get("keywords")]
+    if not rows:
+        return
+    known = {hid for (hid,) in conn.execute(
+        text("SELECT DISTINCT headline_id FROM headline_keywords WHERE headline_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": [r["id"] for r in rows]},
+    )}
+    pairs = [
+        {"headline_id": r["id"], "keyword": kw, "date": r["date"]}
+        for r in rows if r["id"] not in known
+        for kw in split_keywords(r["keywords"])
+    ]
+    if not pairs:
+        return
+    _insert_keywords(conn, pairs)
+
+    counts = Counter((p["date"], p["keyword"]) for p in pairs)
+    stmt = mysql_insert(KeywordDailyCount.__table__).values([
+        {"date": d, "keyword": kw, "count": n} for (d, kw), n in counts.items()
+    ])
+    conn.execute(stmt.on_duplicate_key_update(count=KeywordDailyCount.__table__.c.count + stmt.inserted.count))
+
+COUNT_SQL = text("""
+    INSERT INTO keyword_daily_counts (date, keyword, count)
+    SELECT date, keyword, COUNT(*) FROM headline_keywords WHERE date >= :since GROUP BY date, keyword
+""")
+
+def _rebuild(conn, since, chunk_size=CHUNK_SIZE):
+    """since 以降の headline_keywords / keyword_daily_counts を消して、headlines.keywords から作り直す。入った記事数を返す"""
+    conn.execute(text("DELETE FROM headline_keywords WHERE date >= :since"), {"since": since})
+    conn.execute(text("DELETE FROM keyword_daily_counts WHERE date >= :since"), {"since": since})
+    select_chunk = text(
+        "SELECT id, date, keywords FROM headlines "
+        "WHERE id > :last_id AND date >= :since AND keywords IS NOT NULL AND keywords <> '' ORDER BY id LIMIT :limit"
+    )
+    last_id = done = 0
+    while True:
+        rows = conn.execute(select_chunk, {"last_id": last_id, "since": since, "limit": chunk_size}).all()
+        if not rows:
+            break
+        pairs = [{"headline_id": r.id, "keyword": kw, "date": r.date} for r in rows for kw in split_keywords(r.keywords)]
+        if pairs:
+            _insert_keywords(conn, pairs)
+        last_id = rows[-1].id
+        done += len(rows)
+    conn.execute(COUNT_SQL, {"since": since}) # 件数は入れ終わった表から GROUP BY で1回で数える
+    return done
+
+def rebuild_keywords(engine, since=None, chunk_size=CHUNK_SIZE):
+    """since（date / 'YYYY-MM-DD'）以降の日付のキーワード表を作り直す（省略時は全期間）。対象の記事数を返す"""
+    since = since or "1000-01-01"
+    with engine.begin() as conn:
+        done = _rebuild(conn, since, chunk_size)
+    print(f"✅ keywords: {since} 以降を再構築（{done}記事）")
+    return done
+
+# 直接実行：python -m db.keywords rebuild [YYYY-MM-DD]
+if __name__ == "__main__":
+    from db.settings import engine
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        rebuild_keywords(engine, sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        print("使い方: python -m db.keywords rebuild [YYYY-MM-DD]")
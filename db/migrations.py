@@ -0,0 +1,215 @@
+# バージョン付きのスキーマ移行（既存のテーブルに、後から追加したカラム・インデックスを反映する）
+# Base.metadata.create_all() は「まだ無いテーブル」を作るだけで、既存テーブルの変更はしないため、ここで ALTER する。
+# 適用済みの番号は schema_migrations テーブルに記録し、まだのものだけを番号順に1つずつ（1トランザクションずつ）適用する。
+# 各関数は何度実行しても同じ結果になるように（既にあれば何もしないように）書く。
+#   create_all で作ったばかりのDB（モデル側に同じカラム・索引がある）でも、途中まで手で直したDBでも安全に流せるように。
+# 実行：python -m db.migrations [migrate|status|check]
+import sys # sys：サブコマンド
+from datetime import datetime
+from sqlalchemy import inspect, text
+from scraper.generate_html import RECENT_DAYS, MAX_PER_SOURCE # 日ごとのレポートの表示範囲（HOT_QUERIES を実際の範囲と揃える）
+
+def _has_column(conn, table, column):
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+def _has_index(conn, table, name):
+    return name in {i["name"] for i in inspect(conn).get_indexes(table)}
+
+def add_url_hash(conn):
+    """headlines.url_hash（url の SHA1）を追加して既存行を埋め、ユニーク索引を張る"""
+    if not _has_column(conn, "headlines", "url_hash"):
+        conn.execute(text("ALTER TABLE headlines ADD COLUMN url_hash CHAR(40) NULL AFTER url"))
+    conn.execute(text("UPDATE headlines SET url_hash = SHA1(url) WHERE url_hash IS NULL AND url IS NOT NULL"))
+    if not _has_index(conn, "headlines", "ux_headlines_url_hash"):
+        # 過去に同じURLが複数入っている場合は一番古い行だけにハッシュを残す（ユニーク索引を張れるように）
+        conn.execute(text("""
+            UPDATE headlines h
+              JOIN (SELECT url_hash, MIN(id) AS keep_id
+                      FROM headlines
+                     WHERE url_hash IS NOT NULL
+                     GROUP BY url_hash
+                    HAVING COUNT(*) > 1) d
+                ON h.url_hash = d.url_hash AND h.id <> d.keep_id
+               SET h.url_hash = NULL
+        """))
+        conn.execute(text("CREATE UNIQUE INDEX ux_headlines_url_hash ON headlines (url_hash)"))
+
+def add_near_duplicate_columns(conn):
+    """近似重複の検出用に headlines.minhash / cluster_id と索引を追加する"""
+    if not _has_column(conn, "headlines", "minhash"):
+        conn.execute(text("ALTER TABLE headlines ADD COLUMN minhash TEXT NULL"))
+    if not _has_column(conn, "headlines", "cluster_id"):
+        conn.execute(text("ALTER TABLE headlines ADD COLUMN cluster_id INT NULL"))
+    if not _has_index(conn, "headlines", "ix_headlines_date"):
+        conn.execute(text("CREATE INDEX ix_headlines_date ON headlines (date)"))
+    if not _has_index(conn, "headlines", "ix_headlines_cluster_id"):
+        conn.execute(text("CREATE INDEX ix_headlines_cluster_id ON headlines (cluster_id)"))
+
+def add_category_version(conn):
+    """headlines.category_version（どのカテゴリ規則で分類したか）と索引を追加する"""
+    if not _has_column(conn, "headlines", "category_version"):
+        conn.execute(text("ALTER TABLE headlines ADD COLUMN category_version CHAR(12) NULL AFTER category"))
+    if not _has_index(conn, "headlines", "ix_headlines_category_version"):
+        conn.execute(text("CREATE INDEX ix_headlines_category_version ON headlines (category_version)"))
+
+def add_read_indexes(conn):
+    """
+    よく走る読み取りクエリ用の複合索引
+      (date, source, id) … 直近 N 日の取得（date >= ?）・日付の一覧（GROUP BY date）・ソース別の新しい順
+      (category, id)     … カテゴリ別の新しい順（WHERE category = ? ORDER BY id DESC）
+      (category, date)   … サーバーのカテゴリページ（WHERE category = ? ORDER BY date DESC）
+    (date) 単独の索引は (date, source, id) の先頭と重なるので消す。
+    """
+    if not _has_index(conn, "headlines", "ix_headlines_date_source_id"):
+        conn.execute(text("CREATE INDEX ix_headlines_date_source_id ON headlines (date, source, id)"))
+    if not _has_index(conn, "headlines", "ix_headlines_category_id"):
+        conn.execute(text("CREATE INDEX ix_headlines_category_id ON headlines (category, id)"))
+    if not _has_index(conn, "headlines", "ix_headlines_category_date"):
+        conn.execute(text("CREATE INDEX ix_headlines_category_date ON headlines (category, date)"))
+    if _has_index(conn, "headlines", "ix_headlines_date"):
+        conn.execute(text("DROP INDEX ix_headlines_date ON headlines"))
+
+def backfill_headline_digest(conn):
+    """headline_digest（create_all で作成済み）が空なら、既存の headlines から作る"""
+    from db.digest import REBUILD_SQL, MAX_RANK
+    if conn.execute(text("SELECT 1 FROM headline_digest LIMIT 1")).first() is None:
+        conn.execute(REBUILD_SQL, {"since": "1000-01-01", "max": MAX_RANK})
+
+def add_fulltext_index(conn):
+    """
+    title / summary / keywords に ngram パーサ（2文字ずつ＝bigram）の FULLTEXT 索引を張る（db/search.py・サーバーの検索用）。
+    InnoDB が INSERT のたびに索引を更新するので、save_headlines 側で別に書き込む必要は無い。
+    ストップワード（英語の a, is など）を含む bigram が索引から落ちないよう、作成時だけストップワードを切る。
+    この設定は索引を作るときに効く（検索のたびには要らない）。検索で「is」「an」などを含む bigram が引けるのはこのため。
+    テーブルを作り直す操作（ALTER TABLE ... FORCE、OPTIMIZE TABLE など）で索引が作り直されるときも、同じ SET を先に流すこと。
+    """
+    if not _has_index(conn, "headlines", "ft_headlines_text"):
+        conn.execute(text("SET SESSION innodb_ft_enable_stopword = OFF"))
+        conn.execute(text("ALTER TABLE headlines ADD FULLTEXT INDEX ft_headlines_text (title, summary, keywords) WITH PARSER ngram"))
+
+def backfill_headline_keywords(conn):
+    """headline_keywords / keyword_daily_counts（create_all で作成済み）が空なら、既存の headlines.keywords から作る"""
+    from db.keywords import _rebuild
+    if conn.execute(text("SELECT 1 FROM headline_keywords LIMIT 1")).first() is None:
+        _rebuild(conn, "1000-01-01")
+
+def binary_keyword_collation(conn):
+    """
+    headline_keywords / keyword_daily_counts の keyword 列を utf8mb4_bin にする（db/models.py の KEYWORD_TYPE）。
+    既定の照合順序では「バス」と「パス」が同じキーになっていたので、変えたら両方の表を headlines.keywords から作り直す。
+    """
+    from db.keywords import _rebuild
+    changed = False
+    for table in ("headline_keywords", "keyword_daily_counts"):
+        collation = conn.execute(text(
+            "SELECT COLLATION_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = 'keyword'"
+        ), {"t": table}).scalar()
+        if collation != "utf8mb4_bin":
+            conn.execute(text(f"ALTER TABLE {table} MODIFY keyword VARCHAR(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL"))
+            changed = True
+    if changed:
+        _rebuild(conn, "1000-01-01")
+
+# (番号, 移行) … 番号は一度出したら変えない・使い回さない。新しいものは末尾に足す。
+MIGRATIONS = [
+    (1, add_url_hash),
+    (2, add_near_duplicate_columns),
+    (3, add_category_version),
+    (4, add_read_indexes),
+    (5, backfill_headline_digest),
+    (6, add_fulltext_index),
+    (7, backfill_headline_keywords),
+    (8, binary_keyword_collation),
+]
+
+def _ensure_migrations_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INT PRIMARY KEY,
+            name       VARCHAR(100) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """))
+
+def applied_versions(conn) -> set:
+    _ensure_migrations_table(conn)
+    return {v for (v,) in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def migrate(engine):
+    """未適用の移行を番号順に適用する（1つ = 1トランザクション。途中で失敗したら、そこまでが記録に残る）"""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    pending = [(v, fn) for v, fn in MIGRATIONS if v not in done]
+    if not pending:
+        print("✅ schema: 最新です")
+    for version, fn in pending:
+        with engine.begin() as conn: # ※ MySQL の ALTER/CREATE INDEX は暗黙コミットされるので、関数側を冪等にしてある
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": fn.__name__, "t": datetime.now()},
+            )
+        print(f"✅ schema: {version:03d} {fn.__name__}")
+    return [v for v, _ in pending]
+
+def status(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, fn in MIGRATIONS:
+        print(f"{'✅' if version in done else '⏳'} {version:03d} {fn.__name__}")
+
+# —— よく走るクエリが索引を使っているかの確認 ——
+# (名前, SQL, パラメータ)。生成スクリプト・サーバーで実際に流しているものと同じ形にしておく。
+# 日ごとのレポートの範囲（今日を含む RECENT_DAYS 日・ソースごとに MAX_PER_SOURCE 件）は generate_html の定数から作る。
+# ※ 1文字の検索（LIKE '%q%' のフォールバック）は索引では速くならないので対象外。
+HOT_QUERIES = [
+    ("generate_html: 直近N日",
+     "SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY source ORDER BY id DESC) AS rn FROM headlines "
+     "WHERE date >= CURDATE() - INTERVAL :days DAY AND date <= CURDATE()) ranked WHERE rn <= :n",
+     {"days": RECENT_DAYS - 1, "n": MAX_PER_SOURCE}),
+    ("build_html: 新しい順", "SELECT id, category, title, url FROM headlines ORDER BY id DESC LIMIT 2000", {}),
+    ("server: 日付の一覧", "SELECT date FROM headlines GROUP BY date ORDER BY date DESC LIMIT 5", {}),
+    ("server: カテゴリ別", "SELECT title, url, date FROM headlines WHERE category = :category ORDER BY date DESC", {"category": "政治"}),
+    ("カテゴリ別の新しい順", "SELECT id, title FROM headlines WHERE category = :category ORDER BY id DESC LIMIT 50", {"category": "政治"}),
+    ("save_headlines: URL重複", "SELECT url_hash FROM headlines WHERE url_hash IN (:h)", {"h": "0" * 40}),
+    ("digest: 直近N日・ソース別", "SELECT headline_id FROM headline_digest WHERE date >= CURDATE() - INTERVAL :days DAY AND source_rank <= :n",
+     {"days": RECENT_DAYS - 1, "n": MAX_PER_SOURCE}),
+    ("digest: カテゴリ別", "SELECT headline_id FROM headline_digest WHERE category = :category ORDER BY date DESC, category_rank LIMIT 50", {"category": "政治"}),
+    ("keywords: タグページ", "SELECT headline_id FROM headline_keywords WHERE keyword = :kw ORDER BY date DESC, headline_id DESC LIMIT 50", {"kw": "日銀"}),
+    ("keywords: トレンド", "SELECT keyword, SUM(count) FROM keyword_daily_counts WHERE date >= CURDATE() - INTERVAL 7 DAY GROUP BY keyword", {}),
+    ("search: 全文検索", "SELECT id FROM headlines WHERE MATCH(title, summary, keywords) AGAINST (:q IN BOOLEAN MODE)", {"q": '+"経済"'}),
+    ("再分類: 古い規則の行", "SELECT id FROM headlines WHERE category_version = :v", {"v": "0" * 12}),
+]
+
+def check_hot_queries(engine, queries=HOT_QUERIES):
+    """
+    HOT_QUERIES を EXPLAIN し、索引を使っていない（全件走査 type=ALL・key が NULL）ものを報告する。
+    戻り値: [(名前, EXPLAIN の1行), ...]（問題なしなら空）。MySQL 以外では何もしない。
+    """
+    if engine.dialect.name != "mysql":
+        print(f"ℹ️ check: {engine.dialect.name} では EXPLAIN の確認をしません（MySQL 用）")
+        return []
+    problems = []
+    with engine.connect() as conn:
+        for name, sql, params in queries:
+            for row in conn.execute(text("EXPLAIN " + sql), params).mappings():
+                if row.get("table") not in ("headlines", "headline_digest", "headline_keywords", "keyword_daily_counts"):
+                    continue
+                if row.get("type") == "ALL" or row.get("key") is None:
+                    problems.append((name, dict(row)))
+                    print(f"⚠️ 索引なし: {name} :: type={row.get('type')} rows={row.get('rows')} extra={row.get('Extra')}")
+                else:
+                    print(f"✅ {name} :: key={row.get('key')} type={row.get('type')}")
+    return problems
+
+# 直接実行：python -m db.migrations [migrate|status|check]
+if __name__ == "__main__":
+    from db.settings import engine
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "status":
+        status(engine)
+    elif command == "check":
+        sys.exit(1 if check_hot_queries(engine) else 0)
+    else:
+        migrate(engine)
@@ -1,6 +1,7 @@
 # SQLAlchemy：Pythonでデータベース操作をオブジェクト指向で扱えるようにするライブラリ
+import hashlib # hashlib：URL から固定長のハッシュ（url_hash）を作る
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Text, Date
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Index
 
 # ベースクラスを作る
 Base = declarative_base() # これで Base という変数が、すべてのテーブル定義の親クラスになります。
@@ -8,14 +9,25 @@ Base = declarative_base() # これで Base という変数が、すべてのテ
 # テーブル定義
 class Headline(Base): # Base を継承しているので、SQLAlchemyがこのクラスをテーブルとして認識します。
     __tablename__ = 'headlines' # __tablename__ = 'headlines'：このクラスはデータベース上では 'headlines' という名前のテーブルとして扱われます。
+    __table_args__ = (
+        Index('ux_headlines_url_hash', 'url_hash', unique=True), # URL重複チェック用（既存DBへは db/migrations.py が追加する）
+        Index('ix_headlines_date_source_id', 'date', 'source', 'id'), # 直近N日の取得・日付の一覧・近似重複の照合相手
+        Index('ix_headlines_category_id', 'category', 'id'), # カテゴリ別の新しい順
+        Index('ix_headlines_category_date', 'category', 'date'), # サーバーのカテゴリページ（日付の新しい順）
+        Index('ix_headlines_cluster_id', 'cluster_id'),
+        Index('ix_headlines_category_version', 'category_version'), # 古い規則で分類された行だけを探す用
+        # 全文検索用の FULLTEXT 索引 ft_headlines_text (title, summary, keywords) WITH PARSER ngram は MySQL 専用なので db/migrations.py の 006 で張る
+    )
 
     # 各カラムの定義
     id       = Column(Integer, primary_key=True, autoincrement=True) # 主キー（primary key）です。autoincrement=True：レコードを追加するたびに自動で連番になります。
     source   = Column(String(255)) # ニュースソースの名前（例：NHK、Yahoo、CNNなど）最大255文字までの文字列として保存されます。
     title    = Column(Text) # ニュースの見出しタイトル、長めの文字列になる可能性があるため Text 型が使われています。
     url      = Column(Text) # ニュース記事のリンクURL、これも長くなる可能性があるため Text 型。
+    url_hash = Column(String(40)) # url の SHA1（16進40文字）。Text の url には索引を張れないので、重複チェックはこの固定長列のユニーク索引で行う。
     date     = Column(Date) # 記事の掲載日や収集日などを記録するための日付フィールド（例：2025-08-04）
     category = Column(String(50))
+    category_version = Column(String(12), nullable=True) # category を決めたカテゴリ規則のバージョン（utils.categorize.RULES_VERSION）
 
     # 生成系
     summary  = Column(String(120))   # 90文字運用なら120で十分（余裕分）
@@ -25,3 +37,58 @@ class Headline(Base): # Base を継承しているので、SQLAlchemyがこの
     quality  = Column(String(16), nullable=True)    # 例: 'ok'|'shortened'|'fallback'
 
     body     = Column(Text)          # 記事本文
+
+    # 近似重複（utils/dedup.py）
+    minhash    = Column(Text, nullable=True)    # タイトル＋本文冒頭の MinHash 署名（16進512文字）
+    cluster_id = Column(Integer, nullable=True)    # 同じ出来事の記事をまとめる代表行の id（重複が無ければ NULL）
+
+class HeadlineDigest(Base):
+    """日ごとのダイジェスト：(日付, ソース)・(日付, カテゴリ) ごとの新しい順の順位（db/digest.py が更新する）"""
+    __tablename__ = 'headline_digest'
+    __table_args__ = (
+        Index('ix_digest_date_source_rank', 'date', 'source', 'source_rank'), # 直近N日・ソースごとの上位
+        Index('ix_digest_category_date_rank', 'category', 'date', 'category_rank'), # カテゴリごとの新しい順の上位
+    )
+
+    headline_id   = Column(Integer, primary_key=True, autoincrement=False) # headlines.id
+    date          = Column(Date, nullable=False)
+    source        = Column(String(255), nullable=False)
+    category      = Column(String(50), nullable=False) # NULL/空 は「その他」
+    source_rank   = Column(Integer, nullable=False)    # 同じ日・同じソースの中での順位（1 が最新）
+    category_rank = Column(Integer, nullable=False)    # 同じ日・同じカテゴリの中での順位（1 が最新）
+
+# キーワードの列は utf8mb4_bin（バイト列で比べる）。既定の照合順序（utf8mb4_0900_ai_ci など）だと濁点・半濁点を無視して
+# 「バス」と「パス」が同じキーになり、タグページ・トレンドで混ざる（Python 側の Counter とも数が食い違う）。
+# 等しさを Python の文字列比較（NFKC 後）とそろえる。SQLite など MySQL 以外では素の VARCHAR。
+KEYWORD_TYPE = String(100).with_variant(String(100, collation="utf8mb4_bin"), "mysql")
+
+class HeadlineKeyword(Base):
+    """記事ごとのキーワード（headlines.keywords の CSV を1語1行にしたもの。db/keywords.py が更新する）"""
+    __tablename__ = 'headline_keywords'
+    __table_args__ = (
+        Index('ix_headline_keywords_keyword_date', 'keyword', 'date', 'headline_id'), # キーワード別の新しい順（タグページ）
+    )
+
+    headline_id = Column(Integer, primary_key=True, autoincrement=False) # headlines.id
+    keyword     = Column(KEYWORD_TYPE, primary_key=True) # 正規化済み（NFKC・前後の空白除去）
+    date        = Column(Date, nullable=False)          # headlines.date（キーワード別に日付で絞る・並べるための写し）
+
+class KeywordDailyCount(Base):
+    """日ごと・キーワードごとの記事数（トレンド用。save_headlines が今回のぶんだけ足していく）"""
+    __tablename__ = 'keyword_daily_counts'
+
+    date    = Column(Date, primary_key=True)
+    keyword = Column(KEYWORD_TYPE, primary_key=True)
+    count   = Column(Integer, nullable=False, default=0)
+
+class CategoryRuleset(Base):
+    """これまでに使ったカテゴリ規則の控え（差分のキーワードだけで再分類するために、古い規則の中身を残しておく）"""
+    __tablename__ = 'category_rulesets'
+
+    version    = Column(String(12), primary_key=True) # utils.categorize.RULES_VERSION
+    rules      = Column(Text, nullable=False)         # CATEGORY_RULES の JSON（[[カテゴリ, [キーワード, ...]], ...]）
+    created_at = Column(DateTime)
+
+def url_hash(url: str) -> str:
+    """Headline.url_hash に入れる値（MySQL の SHA1(url) と同じ16進文字列）"""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
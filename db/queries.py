@@ -0,0 +1,154 @@
+# 表示用の読み取りクエリ（HTML・レポートの生成で使う）
+# Headline をまるごと読む（本文 body まで転送される）のではなく、表示する列だけを SELECT し、
+# 「グループごとに新しい順で上位 N 件」は ROW_NUMBER() OVER (PARTITION BY ...) で SQL 側で絞る。
+# → 転送量・メモリはテーブルの大きさではなく、画面に出す件数に比例する。（ウィンドウ関数は MySQL 8.0 以降）
+# ダイジェスト（headline_digest、db/digest.py）ができていれば、順位を数え直さずにその索引を範囲で読む。
+# キーワード別の記事・よく出たキーワードは、正規化したキーワード表（db/keywords.py）の索引を引く。
+from datetime import date, timedelta
+from sqlalchemy import select, func, union_all
+from db.models import Headline, HeadlineDigest, HeadlineKeyword, KeywordDailyCount
+from db.digest import MAX_RANK
+from db.keywords import normalize_keyword
+
+CATEGORY_WINDOW = 2000 # カテゴリ別一覧は、新しい方からこの件数の中から選ぶ
+
+# 表示に使う列（body・minhash などの重い列は含めない）
+DISPLAY_COLUMNS = (
+    Headline.id, Headline.source, Headline.title, Headline.url, Headline.date, Headline.category,
+    Headline.summary, Headline.keywords, Headline.comment, Headline.comment_type,
+)
+
+def top_per_group(session, group, limit_per_group=None, filters=(), columns=DISPLAY_COLUMNS):
+    """
+    group（列 or 式）ごとに id の新しい順で最大 limit_per_group 件（None なら全件）を返す。
+    戻り値: {group の値: [Row, ...]}（Row は r.title のように属性で読める。グループ内は新しい順）
+    """
+    rn = func.row_number().over(partition_by=group, order_by=Headline.id.desc()).label("rn")
+    ranked = select(*columns, group.label("grp"), rn).where(*filters).subquery()
+    stmt = select(*[ranked.c[c.key] for c in columns], ranked.c.grp).order_by(ranked.c.grp, ranked.c.rn)
+    if limit_per_group is not None:
+        stmt = stmt.where(ranked.c.rn <= limit_per_group)
+
+    bucket = {}
+    for row in session.execute(stmt):
+        bucket.setdefault(row.grp, []).append(row)
+    return bucket
+
+def headline_stats(session, since=None):
+    """(MAX(id), 件数)。since を渡すとその日付以降だけ（出力を作り直すかどうかの判定用。(date, source, id) の索引だけで数えられる）"""
+    stmt = select(func.max(Headline.id), func.count(Headline.id))
+    if since is not None:
+        stmt = stmt.where(Headline.date >= since)
+    max_id, count = session.execute(stmt).one()
+    return max_id or 0, count
+
+def headline_checksum(session, since=None, window=None):
+    """
+    表示する列（カテゴリ・要約・キーワード・コメント）の CRC32 の合計（出力を作り直すかどうかの判定用）。
+    件数と MAX(id) だけでは、既存の行の書き換え（カテゴリの再判定・本文の再抽出と要約のやり直し）に気づけないので、これも指紋に入れる。
+    since（日付）/ window（新しい方からの件数）で、画面に出る範囲の行だけを読む。（CRC32・CONCAT_WS は MySQL の関数）
+    """
+    crc = func.crc32(func.concat_ws("|", Headline.category, Headline.summary, Headline.keywords, Headline.comment))
+    stmt = select(func.sum(crc))
+    if since is not None:
+        stmt = stmt.where(Headline.date >= since)
+    start = _window_start(session, window) if window else None
+    if start is not None:
+        stmt = stmt.where(Headline.id >= start)
+    return int(session.execute(stmt).scalar() or 0)
+
+def headline_dates(session, since=None, until=None):
+    """記事のある日付（古い順）→ [date, ...]（アーカイブの作り直し用。date 列の索引だけで読める）"""
+    stmt = select(Headline.date).distinct().order_by(Headline.date)
+    if since is not None:
+        stmt = stmt.where(Headline.date >= since)
+    if until is not None:
+        stmt = stmt.where(Headline.date <= until)
+    return list(session.scalars(stmt))
+
+def _digest_ready(session, limit):
+    """ダイジェストが使えるか（上位 limit 件がダイジェストの持っている範囲内で、表が空でない）"""
+    if limit is None or limit > MAX_RANK:
+        return False
+    return session.execute(select(HeadlineDigest.headline_id).limit(1)).first() is not None
+
+def recent_by_source(session, since, max_per_source=None, until=None):
+    """date >= since（until を渡すと date <= until も）の記事を、ソースごとに新しい順で最大 max_per_source 件 → {source: [Row, ...]}"""
+    if not _digest_ready(session, max_per_source):
+        filters = (Headline.date >= since,) + ((Headline.date <= until,) if until is not None else ())
+        return top_per_group(session, Headline.source, max_per_source, filters=filters)
+
+    # 日ごとの上位 max_per_source 件を (date, source, source_rank) の索引で読み、期間全体の上位に絞る（日数 × N 件だけ）
+    stmt = (
+        select(*DISPLAY_COLUMNS)
+        .join(HeadlineDigest, HeadlineDigest.headline_id == Headline.id)
+        .where(HeadlineDigest.date >= since, HeadlineDigest.source_rank <= max_per_source)
+        .order_by(Headline.id.desc())
+    )
+    if until is not None:
+        stmt = stmt.where(HeadlineDigest.date <= until)
+    bucket = {}
+    for row in session.execute(stmt):
+        items = bucket.setdefault(row.source, [])
+        if len(items) < max_per_source:
+            items.append(row)
+    return bucket
+
+def _window_start(session, window):
+    """新しい方から window 件目の id（それより少なければ None）。id の主キー索引を後ろから window 件たどるだけ"""
+    return session.execute(select(Headline.id).order_by(Headline.id.desc()).offset(window - 1).limit(1)).scalar()
+
+def latest_by_category(session, limit_per_category=50, window=CATEGORY_WINDOW):
+    """
+    新しい方から window 件の中で、カテゴリごとに新しい順で最大 limit_per_category 件（カテゴリが NULL/空 は「その他」）→ {category: [Row, ...]}
+    （もともとの「新しい順に2000件を読んでカテゴリに振り分ける」と同じ範囲。id で絞るので、ウィンドウ関数も全件は走査しない）
+    """
+    start = _window_start(session, window) if window else None
+    if not _digest_ready(session, limit_per_category):
+        filters = (Headline.id >= start,) if start is not None else ()
+        return top_per_group(session, func.coalesce(func.nullif(Headline.category, ""), "その他"), limit_per_category, filters=filters)
+
+    # カテゴリごとに (category, date, category_rank) の索引を新しい日から limit 件だけ読み、UNION ALL で1本にまとめる
+    categories = [c for (c,) in session.execute(select(HeadlineDigest.category).distinct())]
+    if not categories:
+        return {}
+    parts = [
+        select(*DISPLAY_COLUMNS, HeadlineDigest.category.label("grp"))
+        .join(HeadlineDigest, HeadlineDigest.headline_id == Headline.id)
+        .where(HeadlineDigest.category == category, HeadlineDigest.category_rank <= limit_per_category,
+               *((HeadlineDigest.headline_id >= start,) if start is not None else ()))
+        .order_by(HeadlineDigest.date.desc(), HeadlineDigest.category_rank)
+        .limit(limit_per_category)
+        .subquery()
+        for category in categories
+    ]
+    bucket = {}
+    for row in session.execute(union_all(*[select(p) for p in parts])):
+        bucket.setdefault(row.grp, []).append(row)
+    return bucket
+
+def headlines_by_keyword(session, keyword, limit=50, since=None, columns=DISPLAY_COLUMNS):
+    """keyword の付いた記事を新しい順に最大 limit 件（since：この日付以降だけ）→ [Row, ...]"""
+    stmt = (
+        select(*columns)
+        .join(HeadlineKeyword, HeadlineKeyword.headline_id == Headline.id)
+        .where(HeadlineKeyword.keyword == normalize_keyword(keyword))
+        .order_by(HeadlineKeyword.date.desc(), HeadlineKeyword.headline_id.desc()) # (keyword, date, headline_id) の索引の順
+        .limit(limit)
+    )
+    if since is not None:
+        stmt = stmt.where(HeadlineKeyword.date >= since)
+    return session.execute(stmt).all()
+
+def trending_keywords(session, days=7, limit=20, today=None):
+    """直近 days 日（今日を含む）に多く出たキーワード → [(keyword, 記事数), ...]（多い順）"""
+    since = (today or date.today()) - timedelta(days=days - 1)
+    total = func.sum(KeywordDailyCount.count).label("total")
+    stmt = (
+        select(KeywordDailyCount.keyword, total)
+        .where(KeywordDailyCount.date >= since)
+        .group_by(KeywordDailyCount.keyword)
+        .order_by(total.desc(), KeywordDailyCount.keyword)
+        .limit(limit)
+    )
+    return [(kw, int(n)) for kw, n in session.execute(stmt)]
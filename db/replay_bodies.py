@@ -0,0 +1,112 @@
+# 保存済みの記事の本文を、本文キャッシュ（utils/body_cache.py の生HTML）から抽出し直して headlines に書き戻す
+# save_headlines は新しいURLの行しか作らないので、抽出ロジックを直したあとに既存の行の本文・指紋・要約を直すのはこちら。
+# ネットワークには一切触れない（キャッシュに生HTMLが無い行は飛ばす）。
+#   1) id 順に CHUNK_SIZE 件ずつ読み、キャッシュの生HTMLから本文を抽出し直す（キャッシュの抽出結果も更新）
+#   2) 本文が変わった行だけ body と minhash（近似重複の指紋）を UPDATE
+#   3) --summarize なら、本文が変わった行を要約し直して summary / keywords / comment を UPDATE し、
+#      最後にキーワード表（headline_keywords / keyword_daily_counts）を変わった最も古い日から作り直す
+# ダイジェスト（headline_digest）は日付・ソース・カテゴリ（タイトルから判定）だけで決まるので、触らない。
+# 実行：python -m db.replay_bodies [--since YYYY-MM-DD] [--summarize] [--dry-run] [--chunk-size 500]
+import time # time：所要時間
+import argparse # argparse：コマンドライン引数
+from datetime import date
+from sqlalchemy import text
+from db.keywords import rebuild_keywords
+from utils.body_cache import get_body_cache
+from utils.extract import extract_body
+from utils import dedup
+
+CHUNK_SIZE = 500 # 1回に読む行数（要約し直すときは、このぶんをまとめて要約に出す）
+
+SELECT_CHUNK = text(
+    "SELECT id, source, title, url, date, body FROM headlines "
+    "WHERE id > :last_id AND date >= :since ORDER BY id LIMIT :limit"
+)
+UPDATE_BODY = text("UPDATE headlines SET body = :body, minhash = :minhash WHERE id = :id")
+UPDATE_SUMMARY = text(
+    "UPDATE headlines SET summary = :summary, keywords = :keywords, comment = :comment, "
+    "comment_type = :comment_type, quality = :quality WHERE id = :id"
+)
+
+def _resummarize(rows):
+    """rows: [(row, 新しい本文), ...] をソースごとにまとめて要約し直す → [UPDATE_SUMMARY のパラメータ, ...]（失敗した行は今の要約のまま）"""
+    from db.save_headlines import _summarize_many, FAILED # 要約モジュール（API キーが要る）は --summarize のときだけ読む
+    by_source = {}
+    for row, body in rows:
+        by_source.setdefault(row.source, []).append((row, body))
+    updates = []
+    for source_name, items in by_source.items():
+        results = _summarize_many(source_name, [(row.title, body) for row, body in items])
+        for (row, _), fields in zip(items, results):
+            if fields == FAILED:
+                continue
+            summary, keywords, comment, comment_type, quality = fields
+            updates.append({
+                "id": row.id, "summary": summary, "keywords": keywords,
+                "comment": comment, "comment_type": comment_type, "quality": quality,
+            })
+    return updates
+
+def replay_bodies(engine, since=None, summarize=False, dry_run=False, chunk_size=CHUNK_SIZE):
+    """since（date / 'YYYY-MM-DD'）以降の行を本文キャッシュから抽出し直す。(確認した件数, 本文が変わった件数, キャッシュに無かった件数) を返す"""
+    since = since or "1000-01-01"
+    cache = get_body_cache()
+    scanned = changed = missing = resummarized = 0
+    oldest = None # 要約（キーワード）が変わった最も古い日
+    last_id = 0
+    started = time.perf_counter()
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(SELECT_CHUNK, {"last_id": last_id, "since": since, "limit": chunk_size}).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned += len(rows)
+
+        replayed = []
+        for row in rows:
+            entry = cache.get(row.url)
+            if entry is None or not entry.get("html"):
+                missing += 1
+                continue
+            body = extract_body(entry["html"], row.url)
+            if body != entry["text"] and not dry_run:
+                cache.put(row.url, entry["html"], body, entry.get("etag"), entry.get("last_modified"), entry["fetched_at"])
+            if body != (row.body or ""):
+                replayed.append((row, body))
+        changed += len(replayed)
+        if not replayed or dry_run:
+            continue
+
+        summaries = _resummarize(replayed) if summarize else []
+        with engine.begin() as conn:
+            conn.execute(UPDATE_BODY, [
+                {"id": row.id, "body": body or None, "minhash": dedup.fingerprint(row.title, body) if body else None}
+                for row, body in replayed
+            ])
+            if summaries:
+                conn.execute(UPDATE_SUMMARY, summaries)
+        if summaries:
+            resummarized += len(summaries)
+            dates = {row.date for row, _ in replayed}
+            oldest = min(dates | ({oldest} if oldest else set()))
+        print(f"  … {scanned}件を確認 / 本文が変わった {changed}件 / キャッシュに無い {missing}件 | id ≤ {last_id}")
+
+    if oldest is not None:
+        rebuild_keywords(engine, oldest) # キーワードが変わった日以降の表を作り直す（日ごとの件数も数え直し）
+    elapsed = time.perf_counter() - started
+    label = "変更予定" if dry_run else "更新"
+    print(f"✅ 本文の再抽出完了: {scanned}件を確認 / 本文 {changed}件{label} / 要約し直し {resummarized}件 / キャッシュに無い {missing}件（{elapsed:.1f}秒）")
+    print(cache.report())
+    return scanned, changed, missing
+
+# 直接実行：python -m db.replay_bodies [--since YYYY-MM-DD] [--summarize] [--dry-run]
+if __name__ == "__main__":
+    from db.settings import engine
+    parser = argparse.ArgumentParser(description="保存済みの記事の本文を、本文キャッシュの生HTMLから抽出し直す（ネットワーク不使用）")
+    parser.add_argument("--since", type=date.fromisoformat, help="この日以降の記事だけ（YYYY-MM-DD。省略時は全期間）")
+    parser.add_argument("--summarize", action="store_true", help="本文が変わった記事を要約し直す（LLM を呼ぶ）")
+    parser.add_argument("--dry-run", action="store_true", help="件数を数えるだけで書き込まない")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="1回に読む行数")
+    args = parser.parse_args()
+    replay_bodies(engine, args.since, args.summarize, args.dry_run, args.chunk_size)
@@ -0,0 +1,25 @@
+# カテゴリ規則の控え（category_rulesets テーブル）の読み書き
+# 行ごとの category_version から「その行を分類したときの規則」を引けるようにしておくと、
+# 規則を変えたときに、変わったキーワードを含む見出しだけを再分類すれば済む（scripts/classify_existing_data.py）。
+import json # json：規則の保存形式
+from datetime import datetime
+from sqlalchemy import select, insert
+from db.models import CategoryRuleset
+from utils.categorize import CATEGORY_RULES, RULES_VERSION
+
+_table = CategoryRuleset.__table__
+
+def save_ruleset(conn, rules=CATEGORY_RULES, version=RULES_VERSION):
+    """今の規則を控えておく（既にあれば何もしない）。conn は Connection でも Session でもよい"""
+    if conn.execute(select(_table.c.version).where(_table.c.version == version)).first():
+        return
+    conn.execute(insert(_table).values(
+        version=version,
+        rules=json.dumps(list(rules.items()), ensure_ascii=False), # 順番も判定に効くので (カテゴリ, キーワード) の並びのまま保存
+        created_at=datetime.now(),
+    ))
+
+def load_ruleset(conn, version):
+    """控えてある規則を {カテゴリ: [キーワード, ...]} で返す（無ければ None）"""
+    row = conn.execute(select(_table.c.rules).where(_table.c.version == version)).first()
+    return dict(json.loads(row[0])) if row else None
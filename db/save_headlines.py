@@ -1,17 +1,41 @@
-from datetime import date
-from sqlalchemy import exists # 重複チェックのために使用。
+from datetime import date, timedelta
+from sqlalchemy import bindparam, or_
 from db.settings import SessionLocal # SessionLocal は SQLAlchemyのセッション（DBとのやりとりの窓口）を作るための関数やクラス
-from db.models import Headline
-from utils.categorize import categorize_title
-from utils.extract import fetch_article_body
+from db.models import Headline, url_hash
+from db.bulk import bulk_insert_headlines # 複数行 INSERT での一括保存
+from db.digest import update_digest # 日ごとのダイジェスト（ソース別・カテゴリ別の順位）
+from db.keywords import save_keywords # キーワードの正規化テーブルと日ごとの件数
+from utils.categorize import categorize_title, RULES_VERSION
+from db.rulesets import save_ruleset # 分類に使った規則の控え（差分だけの再分類用）
+from utils.extract import fetch_article_bodies # 本文をまとめて並行取得する
+from utils import dedup # 近似重複（同じ出来事の別ソース記事）の検出
 
 # --- 要約モジュールの両対応（plus が無ければ旧版にフォールバック） ---
 try:
     from utils.summarize import generate_summary_plus as _gen_plus  # 新
+    from utils.summarize import batch_summarize_plus as _batch_plus  # 新（並行・レート制限付きのまとめ実行）
 except Exception:
     _gen_plus = None
+    _batch_plus = None
 from utils.summarize import generate_summary as _gen_basic  # 旧
 
+PLUS_OPTIONS = dict(
+    max_chars=90,        # HTMLで読みやすい長さ
+    comment_max=60,      # 「編集部メモ」短め
+    temperature=0.2,
+)
+
+def _fields_from_plus(data):
+    """generate_summary_plus() の戻り値 → (summary_text, keywords_csv, comment_text, comment_type, quality)"""
+    summary = (data.get("summary") or "").strip() or None
+    kws_csv = ",".join(data.get("keywords") or []) or None # keywordsは配列想定なので",".join(...)でCSV化（DBに文字列で保存するための簡単な表現）。
+    comment = (data.get("comment") or "").strip() or None
+    ctype = (data.get("comment_type") or "").strip() or None
+    quality = (data.get("quality") or "ok").strip()
+    return summary, kws_csv, comment, ctype, quality # 返ってきたJSONから、必要キー（summary | keywords | comment | comment_type | quality）を安全に取り出す（get()→strip()→空ならNone）。
+
+FAILED = (None, None, None, None, "fallback") # 要約に失敗した行は空値＋"fallback"で保存する
+
 def _summarize(title: str, source_name: str, body_text: str):
     """
     generate_summary_plus() があればそれを使い、
@@ -23,17 +47,10 @@ def _summarize(title: str, source_name: str, body_text: str):
         data = _gen_plus(
             title=title,
             source=source_name,
-            max_chars=90,        # HTMLで読みやすい長さ
             body=body_text or "",
-            comment_max=60,      # 「編集部メモ」短め
-            temperature=0.2,
+            **PLUS_OPTIONS,
         )
-        summary = (data.get("summary") or "").strip() or None
-        kws_csv = ",".join(data.get("keywords") or []) or None # keywordsは配列想定なので",".join(...)でCSV化（DBに文字列で保存するための簡単な表現）。
-        comment = (data.get("comment") or "").strip() or None
-        ctype = (data.get("comment_type") or "").strip() or None
-        quality = (data.get("quality") or "ok").strip()
-        return summary, kws_csv, comment, ctype, quality # 返ってきたJSONから、必要キー（summary | keywords | comment | comment_type | quality）を安全に取り出す（get()→strip()→空ならNone）。
+        return _fields_from_plus(data)
 
     # 新版なし（旧版フォールバック）の場合
     data = _gen_basic(
@@ -47,58 +64,174 @@ def _summarize(title: str, source_name: str, body_text: str):
     quality = (data.get("quality") or "ok").strip() # quality…出力品質メタ。例："ok" | "shortened" | "fallback" など。運用で「要約が短縮し過ぎ」や「本文無しのfallback」などを後で分析できる。
     return summary, kws_csv, None, None, quality # 旧版はcomment/comment_typeが無いのでNoneにする。
 
-def save_headlines(source_name, headlines, category=None):
+def _summarize_many(source_name: str, items):
+    """
+    items: [(title, body_text), ...] をまとめて要約する（plus があれば並行・レート制限付き）。
+    戻り値: items と同じ順の [(summary_text, keywords_csv, comment_text, comment_type, quality), ...]
+    失敗した要素だけ FAILED にする（全体バッチを止めない）。
+    """
+    if _batch_plus:
+        results = _batch_plus(
+            [{"title": title, "source": source_name, "body": body or ""} for title, body in items],
+            **PLUS_OPTIONS,
+        )
+        out = []
+        for (title, _), data in zip(items, results):
+            if data.get("error"): # batch_summarize_plus は失敗を例外ではなく error 付きの dict で返す
+                print(f"[summarize ERROR] {source_name} :: {title}\n  -> {data['error']}")
+                out.append(FAILED)
+            else:
+                out.append(_fields_from_plus(data))
+        return out
+
+    # 旧版のみ：1件ずつ
+    out = []
+    for title, body in items:
+        try:
+            out.append(_summarize(title=title, source_name=source_name, body_text=body))
+        except Exception as e:
+            print(f"[summarize ERROR] {source_name} :: {title}\n  -> {repr(e)}") # エラー時はログ出し・"fallback"扱いで空値を入れて続行（全体バッチを止めない）。
+            out.append(FAILED)
+    return out
+
+def _recent_index(session, today):
+    """直近 DEDUP_DAYS 日の要約済み記事を指紋で引ける索引にする（payload は行そのもの）"""
+    index = dedup.MinHashIndex()
+    rows = session.query(
+        Headline.id, Headline.url_hash, Headline.minhash, Headline.cluster_id, Headline.title,
+        or_(Headline.body.is_(None), Headline.body == "").label("title_only"), # 本文なしで作られた（以前の）指紋
+        Headline.summary, Headline.keywords, Headline.comment, Headline.comment_type, Headline.quality,
+    ).filter(
+        Headline.date >= today - timedelta(days=dedup.DEDUP_DAYS),
+        Headline.minhash.isnot(None),
+        Headline.summary.isnot(None),
+        or_(Headline.quality.is_(None), Headline.quality != "fallback"), # 失敗した要約は使い回さない
+    )
+    for row in rows:
+        index.add(row.minhash, row, row.title, bool(row.title_only))
+    return index
+
+def _set_cluster_ids(session, clusters):
+    """clusters: {url_hash: cluster_id} を1本の executemany で反映する"""
+    if not clusters:
+        return
+    table = Headline.__table__
+    session.execute(
+        table.update().where(table.c.url_hash == bindparam("b_hash")).values(cluster_id=bindparam("b_cid")),
+        [{"b_hash": h, "b_cid": cid} for h, cid in clusters.items()],
+    )
+
+def save_headlines(source_name, headlines, category=None, offline=False):
     """
     headlines: iterable[(title, url)]
+    offline: True なら新しい記事の本文もキャッシュからだけ取る（cli run の --offline-bodies）
     """
     # DBセッション開始
     session = SessionLocal() # session はデータベースとのやりとりに使う「操作窓口」です。この session を使って、クエリ実行・追加・削除などができます。
     try:
         today = date.today()
-        for idx, (title, url) in enumerate(headlines, start=1):
-            # 1) 重複（URL）チェック
-            if session.query(exists().where(Headline.url == url)).scalar(): # exists().where(Headline.url == url) で「このURLの行がある？」をブールでチェック。
-                continue # 既存なら continue でスキップ → 多重保存を防ぐ。
 
-            # 2) カテゴリ自動判定（引数 category を上書きしないよう別名）
+        # 1) 重複（URL）チェック：新規のものだけ残す
+        # url_hash（ユニーク索引付き）に対する IN (...) 1回で、このバッチのうち既に保存済みのものをまとめて調べる。
+        batch = {} # {url_hash: (title, url)}（バッチ内の同じURLもここで1件にまとまる）
+        for title, url in headlines:
+            batch.setdefault(url_hash(url), (title, url))
+        existing = {
+            h for (h,) in session.query(Headline.url_hash).filter(Headline.url_hash.in_(list(batch)))
+        } if batch else set()
+        new_items = [(h, title, url) for h, (title, url) in batch.items() if h not in existing] # 既存なら除外 → 多重保存を防ぐ。
+
+        # 2) 本文抽出：新規分をまとめて並行取得（1URLにつき1回だけダウンロード。失敗したURLは空文字）
+        bodies = fetch_article_bodies([url for _, _, url in new_items], offline=offline)
+
+        # 3) 近似重複：直近の要約済み記事（他ソースを含む）と、このバッチ内で先に出た記事に指紋を照合する。
+        #    同じ出来事なら要約を使い回し、要約（LLM呼び出し）は代表の記事だけにする。
+        #    本文が取れなかった記事は照合しない（指紋を作らない → 自分で要約する）。タイトルだけだと定型の見出しどうしが重なるため。
+        fps = {h: dedup.fingerprint(title, bodies[url]) if bodies.get(url) else None for h, title, url in new_items}
+        recent = _recent_index(session, today)
+        local = dedup.MinHashIndex()
+        reused = {} # {url_hash: 使い回す既存行}
+        leaders = {} # {url_hash: 同じバッチ内の代表の url_hash}
+        for h, title, url in new_items:
+            match = recent.find(fps[h], title)
+            if match:
+                reused[h] = match
+                continue
+            leader = local.find(fps[h], title)
+            if leader:
+                leaders[h] = leader
+                continue
+            if fps[h]:
+                local.add(fps[h], h, title)
+
+        # 4) 要約＋独自コメント：代表の記事だけまとめて並行に要約（本文の有無に応じて品質が変動し得る → qualityで追跡）
+        def _summarize_new(hashes):
+            items = [(h, title, bodies.get(url) or "") for h, title, url in new_items if h in hashes]
+            results = _summarize_many(source_name, [(title, body) for _, title, body in items])
+            return {h: fields for (h, _, _), fields in zip(items, results)}
+        summaries = _summarize_new({h for h, _, _ in new_items if h not in reused and h not in leaders})
+        # 代表の要約が失敗した記事は、自分で要約し直す
+        orphans = {h for h, leader in leaders.items() if summaries[leader] == FAILED}
+        if orphans:
+            summaries.update(_summarize_new(orphans))
+            leaders = {h: leader for h, leader in leaders.items() if h not in orphans}
+        for h, row in reused.items():
+            summaries[h] = (row.summary, row.keywords, row.comment, row.comment_type, row.quality)
+        for h, leader in leaders.items():
+            summaries[h] = summaries[leader]
+        dedup.record(len(new_items), len(reused) + len(leaders))
+        print(dedup.report())
+
+        records = []
+        for h_url, title, url in new_items:
+            fields = summaries[h_url]
+            # 5) カテゴリ自動判定（引数 category を上書きしないよう別名）
             detected_category = categorize_title(title) # categorize_title(title) の結果をdetected_categoryに。下のレコード作成では detected_category if detected_category else category なので、自動判定が空/nullのときだけ引数category（外側で決めたカテゴリ）を使う設計。
 
-            # 3) 本文抽出（失敗しても空文字で続行）
-            body_text = ""
-            try:
-                body_text = fetch_article_body(url) or "" # 例：trafilatura → 取れなければBeautifulSoupで汎用セレクタを当てに行く関数（プロジェクト別ファイル）。
-            except Exception as e:
-                print(f"[extract WARN] {source_name} :: {title} -> {e}") # ここはネットワークも絡むので、失敗しても落とさず続行（空文字でOK）。ログにWARNを出す。
-
-            # 4) 要約＋独自コメント
-            try:
-                summary_text, keywords_csv, comment_text, comment_type, quality = _summarize(
-                    title=title, source_name=source_name, body_text=body_text
-                ) # _summarize()で、本文の有無に応じて品質が変動し得る（qualityで追跡）。
-            except Exception as e:
-                print(f"[summarize ERROR] {source_name} :: {title}\n  -> {repr(e)}") # エラー時はログ出し・"fallback"扱いで空値を入れて続行（全体バッチを止めない）。
-                summary_text, keywords_csv, comment_text, comment_type, quality = None, None, None, None, "fallback"
-
-            # 5) レコード作成
-            h = Headline(
+            body_text = bodies.get(url) or ""
+            summary_text, keywords_csv, comment_text, comment_type, quality = fields
+
+            # 6) レコード作成（summary/keywords/comment/comment_type/body は状況により None になる）
+            records.append(dict(
                 source=source_name,
                 title=title,
                 url=url,
+                url_hash=h_url,
                 date=today,
                 category=detected_category if detected_category else category,
+                category_version=RULES_VERSION,
                 summary=summary_text,
                 keywords=keywords_csv,
                 comment=comment_text,
                 comment_type=comment_type,
                 quality=quality,
                 body=body_text or None,
-            ) # ORMオブジェクト Headline(...) を作って session.add()。フィールドのNULL許容：summary/keywords/comment/comment_type/body は状況により None になるため、モデル側で nullable=True や Text 型を想定。
-            session.add(h)
-
-            # 6) バルクコミット（100件ごとに一度。必要なければ削ってOK）
-            if idx % 100 == 0: 
-                session.commit()
+                minhash=fps[h_url],
+                cluster_id=(reused[h_url].cluster_id or reused[h_url].id) if h_url in reused else None,
+            ))
 
+        # 7) 一括書き込み（複数行 INSERT IGNORE。間に同じURLが入っていても落ちない）
+        if records:
+            save_ruleset(session)
+            ids = bulk_insert_headlines(session, records)
+            # 8) クラスタの紐づけ：代表行の cluster_id は自分の id、同じバッチ内の重複は代表の id を指す
+            clusters = {row.url_hash: row.id for row in reused.values() if row.cluster_id is None and row.url_hash}
+            for h, leader in leaders.items():
+                if leader in ids:
+                    clusters[leader] = ids[leader]
+                    if h in ids:
+                        clusters[h] = ids[leader]
+            _set_cluster_ids(session, clusters)
+            # 9) ダイジェストの順位を今回の行のぶんだけ更新（作り直しはしない）
+            update_digest(session, [
+                dict(id=ids[r["url_hash"]], date=r["date"], source=r["source"], category=r["category"])
+                for r in records if r["url_hash"] in ids
+            ])
+            # 10) キーワードを1語1行の表へ入れ、日ごとの件数を今回のぶんだけ足す
+            save_keywords(session, [
+                dict(id=ids[r["url_hash"]], date=r["date"], keywords=r["keywords"])
+                for r in records if r["url_hash"] in ids
+            ])
         session.commit()
     except Exception as e: # 予期せぬ例外で rollback() → エラーログ → finallyで確実にclose()。
         session.rollback()
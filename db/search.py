@@ -0,0 +1,86 @@
+# 見出しの全文検索（title / summary / keywords）
+# db/migrations.py の 006 で張った FULLTEXT 索引 ft_headlines_text（ngram パーサ＝2文字ずつの bigram の転置索引）を
+# MATCH ... AGAINST で引く。索引は InnoDB が INSERT のたびに更新するので、save_headlines の書き込みがそのまま検索に載る。
+# 語は空白で区切り、どれも含む（AND）記事を関連度の高い順 → 新しい順に返す。語はフレーズとして探す（bigram が連続して並ぶもの）。
+# 2文字未満の語は bigram の索引に載らないので、その語だけ LIKE '%q%' で絞る（語が全部1文字なら LIKE だけの検索になる）。
+# 実行：python -m db.search "キーワード" [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--category 経済] [--limit 20]
+import time # time：検索時間の計測
+import argparse # argparse：コマンドライン引数
+from sqlalchemy import text
+
+MIN_TERM_CHARS = 2 # ngram_token_size（MySQL の既定 2）。これより短い語は索引では探せない
+LIMIT = 100 # 既定の最大件数
+OTHER = "その他" # カテゴリが NULL/空 の行のまとめ先（utils.categorize.OTHER と同じ）
+
+MATCH = "MATCH(title, summary, keywords) AGAINST (:q IN BOOLEAN MODE)" # 列の並びは索引と同じにする（違うと索引が使われない）
+
+def _like(term: str) -> str:
+    """LIKE '%term%' の値（% _ \\ はエスケープ）"""
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def boolean_query(q: str):
+    """
+    検索文字列 → (BOOLEAN MODE の検索式, 索引で探せない短い語のリスト)
+    例: '経済 対策 A' → ('+"経済" +"対策"', ['A'])
+    語は "..." で囲んでフレーズにする（+ - * ( ) などの演算子として解釈させない）。
+    """
+    terms = [t.replace('"', " ").strip() for t in (q or "").split()]
+    terms = [t for t in terms if t]
+    long_terms = [t for t in terms if len(t) >= MIN_TERM_CHARS]
+    short_terms = [t for t in terms if len(t) < MIN_TERM_CHARS]
+    return " ".join(f'+"{t}"' for t in long_terms), short_terms
+
+def search_headlines(session, q, since=None, until=None, category=None, limit=LIMIT):
+    """
+    q に当たる記事を関連度の高い順（同点は新しい順）に最大 limit 件返す。
+    since / until：日付の範囲（date / 'YYYY-MM-DD'、両端を含む）、category：カテゴリ名（'その他' は未分類も含む）
+    戻り値: [Row(id, date, source, title, url, category, score), ...]（LIKE だけの検索では score は 0）
+    session は Session でも Connection でもよい。
+    """
+    query, short_terms = boolean_query(q)
+    if not query and not short_terms:
+        return []
+
+    where, params = [], {"limit": limit}
+    if query:
+        where.append(MATCH)
+        params["q"] = query
+    for i, term in enumerate(short_terms):
+        where.append(f"(title LIKE :t{i} OR summary LIKE :t{i} OR keywords LIKE :t{i})")
+        params[f"t{i}"] = _like(term)
+    if since:
+        where.append("date >= :since")
+        params["since"] = since
+    if until:
+        where.append("date <= :until")
+        params["until"] = until
+    if category:
+        where.append("COALESCE(NULLIF(category, ''), :other) = :category")
+        params.update(category=category, other=OTHER)
+
+    score = MATCH if query else "0"
+    stmt = text(
+        f"SELECT id, date, source, title, url, category, {score} AS score "
+        f"FROM headlines WHERE {' AND '.join(where)} "
+        f"ORDER BY score DESC, date DESC, id DESC LIMIT :limit"
+    )
+    return session.execute(stmt, params).all()
+
+# 直接実行：python -m db.search "キーワード" [...]
+if __name__ == "__main__":
+    from db.settings import engine
+    parser = argparse.ArgumentParser(description="headlines を全文検索する（title / summary / keywords）")
+    parser.add_argument("q", help="検索語（空白区切りで AND）")
+    parser.add_argument("--since", help="この日付以降（YYYY-MM-DD）")
+    parser.add_argument("--until", help="この日付以前（YYYY-MM-DD）")
+    parser.add_argument("--category", help="カテゴリで絞る")
+    parser.add_argument("--limit", type=int, default=20, help="最大件数")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        rows = search_headlines(conn, args.q, args.since, args.until, args.category, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+    for r in rows:
+        print(f"{r.date} [{r.category or OTHER}] {r.source}: {r.title} ({float(r.score):.2f})")
+    print(f"🔍 {len(rows)}件（{elapsed:.1f}ms）")
@@ -1,5 +1,7 @@
 # ライブラリ
 import requests # requests：ウェブページにアクセスするためのライブラリ。指定URLのHTMLデータを取得するのに使う。
+import time # time：ソースごとの経過時間・タイムアウト判定に使う
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED # 複数ソースを並行取得するためのスレッドプール
 from datetime import datetime
 from bs4 import BeautifulSoup # bs4 の BeautifulSoup：HTMLを解析し、特定の要素（見出しやリンク）を抽出するためのライブラリ。
 from scraper.news_sources.nhk import get_nhk_headlines
@@ -13,42 +15,120 @@ from scraper.news_sources.internet_watch import get_internet_watch_headlines
 from scraper.news_sources.bbc import get_bbc_headlines
 from scraper.news_sources.cnn import get_cnn_headlines
 from db.settings import SessionLocal
-from db.models import Headline
+from db.models import url_hash
+from db.bulk import bulk_insert_headlines # 複数行 INSERT での一括保存
 from db.save_headlines import save_headlines  # 収集→保存の統合呼び出し用
 
 # ニュースをDBに保存して (id, title, url) の形で返す
 def save_and_return_ids(source_name, headlines):
     # SQLAlchemyの Session を生成。
     session = SessionLocal() # SessionLocal は sessionmaker から作られている（はずの）ファクトリ。ここで得た session を通じて DBへINSERT/COMMIT などを行います。
-    results = [] #後で (id, title, url) を入れて返すための空リスト。
-    for title, url in headlines: #渡された headlines を1件ずつ処理。ここは title, url の 2タプル で来る前提です。
-        obj = Headline(source=source_name, title=title, url=url, date=datetime.now().date()) # 各列へ値をセットして インスタンスを作成。
-        session.add(obj) # obj をセッションに登録（まだDBには反映されていない、ステージング状態）。
-        session.commit() # DBへ確定反映（COMMIT）。主キー（id のオートインクリメント）が確定します。
-        session.refresh(obj)  # 挿入後にidを取得。refresh() で確実に同期を取っています。
-        results.append((obj.id, title, url)) # DB採番済みの id と、元の title, url をタプルで保存。
-    session.close() # セッションを必ずクローズ（接続リーク防止）。
-    return results
+    try:
+        headlines = list(headlines) # 渡された headlines は title, url の 2タプル で来る前提です。
+        today = datetime.now().date()
+        # 全件を複数行 INSERT IGNORE でまとめて入れ、採番済みの id を url_hash ごとに受け取る（1件ずつ commit/refresh しない）
+        ids = bulk_insert_headlines(session, [
+            dict(source=source_name, title=title, url=url, date=today) for title, url in headlines
+        ])
+        session.commit() # DBへ確定反映（COMMIT）。
+        # DB採番済みの id と、元の title, url をタプルで返す（既に保存済みだったURLは既存行の id）。
+        return [(ids.get(url_hash(url)), title, url) for title, url in headlines]
+    finally:
+        session.close() # セッションを必ずクローズ（接続リーク防止）。
+
+# 取得対象ソースの一覧：(表示名, 取得関数, レーン)
+  # レーン "http"    … requests + BeautifulSoup で取る軽いソース（スレッドプールで並行）
+  # レーン "browser" … Selenium(Chrome) を使う重いソース（メモリを食うので別枠で同時数を絞る）
+SOURCES = [
+    ("NHKニュース", get_nhk_headlines, "http"),
+    ("時事通信", get_jiji_headlines, "http"),
+    ("ITmedia", get_itmedia_headlines, "http"),
+    ("東洋経済オンライン", get_toyokeizai_headlines, "http"),
+    ("ダイヤモンド・オンライン", get_diamond_headlines, "http"),
+    ("ABEMA TIMES", get_abema_headlines, "http"),
+    ("Sponichi Annex", get_sponichi_headlines, "http"),
+    ("INTERNET Watch", get_internet_watch_headlines, "browser"),
+    ("BBCニュース", get_bbc_headlines, "browser"),
+    ("CNN.co.jp", get_cnn_headlines, "browser"),
+]
+
+HTTP_WORKERS = 8     # requests 系の同時実行数
+BROWSER_WORKERS = 1  # 共有Chrome（news_sources/browser.py）はタブを1つずつしか操作できないので1で十分
+# ソース1件あたりの制限時間（秒）。実行を開始した時点から数える（キュー待ちの時間は含めない）。
+SOURCE_TIMEOUTS = {"http": 20, "browser": 60}
+
+def _run_source(fn, name, started):
+    """実行開始時刻を記録してから取得関数を呼ぶ（タイムアウト判定用）"""
+    started[name] = time.monotonic()
+    return fn()
+
+def iter_headlines(sources=None, timeouts=None):
+    """
+    全ソースを並行に取得し、終わったものから順に (source_name, [(title, url), ...]) を yield する。
+    - http レーンと browser レーンは別々のスレッドプールで動くので、遅い Chrome 系が軽いソースを待たせない。
+    - 制限時間を超えたソースや例外を出したソースは空リストとして返す（全体は止めない）。
+    """
+    sources = SOURCES if sources is None else sources
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    started = {} # {source_name: 実行開始時刻}
+
+    pools = {
+        "http": ThreadPoolExecutor(max_workers=HTTP_WORKERS, thread_name_prefix="fetch-http"),
+        "browser": ThreadPoolExecutor(max_workers=BROWSER_WORKERS, thread_name_prefix="fetch-browser"),
+    }
+    pending = {} # {future: (source_name, lane)}
+    try:
+        for name, fn, lane in sources:
+            fut = pools[lane].submit(_run_source, fn, name, started)
+            pending[fut] = (name, lane)
+
+        while pending:
+            # 1) 制限時間を超えたソースを打ち切る（スレッド自体は止められないので結果を待たないだけ）
+            now = time.monotonic()
+            for fut, (name, lane) in list(pending.items()):
+                t0 = started.get(name)
+                if t0 is not None and not fut.done() and now - t0 > timeouts[lane]:
+                    print(f"⚠️ {name} の取得がタイムアウトしました（{timeouts[lane]}秒）")
+                    del pending[fut]
+                    yield name, []
+            if not pending:
+                break
+
+            # 2) 次にどれかが終わるか、最も早い期限が来るまで待つ
+            remaining = [
+                started[name] + timeouts[lane] - now
+                for name, lane in pending.values() if name in started
+            ]
+            wait_for = max(0.05, min(remaining)) if remaining else 0.5
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            # 3) 終わったものから返す
+            for fut in done:
+                name, lane = pending.pop(fut)
+                try:
+                    headlines = fut.result() or []
+                except Exception as e:
+                    print(f"⚠️ {name} の取得に失敗:", e)
+                    headlines = []
+                print(f"⏱ {name}: {len(headlines)}件 ({time.monotonic() - started.get(name, now):.1f}s)")
+                yield name, headlines
+    finally:
+        # 打ち切ったソースの終了は待たない（まだキューにあるものはキャンセル）
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
 
 def get_all_headlines():
-    return [
-        ("NHKニュース", get_nhk_headlines()),
-        ("時事通信", get_jiji_headlines()),
-        ("ITmedia", get_itmedia_headlines()),
-        ("東洋経済オンライン", get_toyokeizai_headlines()),
-        ("ダイヤモンド・オンライン", get_diamond_headlines()),
-        ("ABEMA TIMES", get_abema_headlines()),
-        ("Sponichi Annex", get_sponichi_headlines()),
-        ("INTERNET Watch", get_internet_watch_headlines()),
-        ("BBCニュース", get_bbc_headlines()),
-        ("CNN.co.jp", get_cnn_headlines())
-    ]
+    """
+    全ソースを並行取得し、従来どおり SOURCES の順に並べて返す。
+    戻り値: [(source_name, [(title, url), ...]), ...]
+    """
+    results = dict(iter_headlines())
+    return [(name, results.get(name, [])) for name, _, _ in SOURCES]
 
 # このファイル単体で実行した場合の簡易パイプライン
 if __name__ == "__main__":
-    all_items = get_all_headlines() # get_all_headlines() で全サイト分を取得。
     total = 0
-    for source_name, headlines in all_items:
+    for source_name, headlines in iter_headlines(): # 取得が終わったソースから順に保存していく（取得と保存を重ねる）。
         if not headlines: # 空ならスキップ。
             continue
         save_headlines(source_name, headlines)
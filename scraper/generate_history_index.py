@@ -1,57 +1,111 @@
-import os # os：ファイル・ディレクトリ操作に使います（ファイル一覧取得、パス結合など）。
+# 過去のニュース一覧（public/history/index.html と月ごとのページ public/history/months/YYYY-MM.html）を作る
+# どの日付のレポートがあるかは public/history/manifest.json（{"dates": ["YYYY-MM-DD", ...]} 古い順）に記録しておき、
+# 日付ごとのレポートを作ったときに add_archive() で1件追記する（毎回フォルダ全体を os.listdir しない）。
+# index.html は月の一覧だけ、月ごとのページにその月の日付を並べるので、何年分たまっても1ページは小さいまま。
+# 普段の実行では、新しいレポートが入った月のページと index.html だけを作り直す。
+import os # os：ファイル・ディレクトリ操作に使います（パス結合・一時ファイルの置き換えなど）。
 import re # re：正規表現モジュールです。ファイル名が「news_2025-07-27.html」のように日付形式になっているかをチェックします。
+import json # json：マニフェストの保存形式
+from utils.html_templates import ( # ページの枠・リンク行（共通テンプレート）
+    open_pages, HISTORY_HEAD, HISTORY_NAV, HISTORY_LIST, HISTORY_ITEM, HISTORY_MONTH_ITEM, HISTORY_LIST_END, HISTORY_FOOT,
+)
 
-def generate_history_index(history_dir, output_path): # history_dir：ニュースHTMLファイルが保存されているフォルダ（例：public/history）。output_path：生成する index.html の出力パス
-    # ファイル一覧取得＆フィルター
-    files = sorted(os.listdir(history_dir), reverse=True) # os.listdir(...)：ディレクトリ内のファイル名一覧を取得。sorted(..., reverse=True)：ファイル名で降順にソート（新しい日付が先頭）
-
-    # news_YYYY-MM-DD.html 形式にマッチするものだけ抽出
-    date_files = [
-        f for f in files
-        if re.match(r'news_\d{4}-\d{2}-\d{2}\.html$', f) # \d{4}-\d{2}-\d{2}：YYYY-MM-DD の形式
-    ]
-
-    # HTMLテンプレートの先頭部分、見出しと<ul>（リスト）の開始タグも含む
-    html = """<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <title>過去のニュース一覧</title>
-    <style>
-        body { font-family: sans-serif; padding: 2rem; max-width: 800px; margin: auto; }
-        h1 { font-size: 1.6rem; }
-        ul { padding-left: 1.2rem; }
-        li { margin: 0.5rem 0; }
-        a { text-decoration: none; color: #0066cc; }
-        a:hover { text-decoration: underline; }
-        footer { margin-top: 3rem; font-size: 0.8rem; color: #999; }
-    </style>
-</head>
-<body>
-    <h1>🗂 過去のニュース一覧</h1>
-    <ul>
-"""
-
-    # 日付付きリンクを追加
-    for f in date_files:
-        date_str = f[5:-5]  # news_YYYY-MM-DD.html → YYYY-MM-DD
-        html += f'        <li><a href="{f}">{date_str} のニュース</a></li>\n' # html に <li><a href=...> 形式でリンクを追加していく
-
-    # HTMLフッターを追加
-    html += """    </ul>
-    <footer>提供：まいにゅ〜</footer>
-</body>
-</html>"""
-# <ul> の閉じタグ、フッターを追加
-
-    # 書き出し処理
-    os.makedirs(os.path.dirname(output_path), exist_ok=True) # 出力先フォルダがなければ作成（exist_ok=True で既にあってもエラーにならない）
-    with open(output_path, 'w', encoding='utf-8') as f: # 作成したHTML文字列をファイルに保存
-        f.write(html)
-
-    print(f"✅ 履歴一覧ページ生成完了：{output_path}")
-
-# 実行部分
+MANIFEST_NAME = "manifest.json"
+MONTHS_DIR = "months"
+ARCHIVE_PATTERN = re.compile(r'news_(\d{4}-\d{2}-\d{2})\.html$') # \d{4}-\d{2}-\d{2}：YYYY-MM-DD の形式
+
+def archive_name(date_str):
+    """日付 → レポートのファイル名（news_YYYY-MM-DD.html）"""
+    return f"news_{date_str}.html"
+
+def month_page(history_dir, month):
+    """月（YYYY-MM）→ その月のページのパス"""
+    return os.path.join(history_dir, MONTHS_DIR, f"{month}.html")
+
+def _save_manifest(history_dir, dates):
+    path = os.path.join(history_dir, MANIFEST_NAME)
+    os.makedirs(history_dir, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"dates": dates}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path) # 途中で落ちても壊れた JSON を残さない
+
+def load_manifest(history_dir):
+    """
+    記録済みの日付（古い順）を返す。
+    マニフェストがまだ無い（この仕組みを入れる前の）ときだけ、フォルダを1回走査して作る。
+    """
+    path = os.path.join(history_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)["dates"]
+    except FileNotFoundError:
+        pass
+    dates = sorted(
+        m.group(1) for m in map(ARCHIVE_PATTERN.match, os.listdir(history_dir) if os.path.isdir(history_dir) else []) if m
+    )
+    _save_manifest(history_dir, dates)
+    print(f"🗂 履歴マニフェストを作成：{len(dates)}件")
+    return dates
+
+def add_archive(history_dir, date_str):
+    """日付ごとのレポートを作ったら呼ぶ（既にあれば何もしない）。追記したら True"""
+    return add_archives(history_dir, [date_str]) > 0
+
+def add_archives(history_dir, date_strs):
+    """まとめて追記する（アーカイブの作り直しで何千日ぶん入れても、マニフェストの読み書きは1回）。追記した件数を返す"""
+    dates = load_manifest(history_dir)
+    new = set(date_strs) - set(dates)
+    if not new:
+        return 0
+    dates.extend(new)
+    dates.sort() # 普段は末尾への追加（過去の日付を作り直した場合にも順番を保つ）
+    _save_manifest(history_dir, dates)
+    return len(new)
+
+def _by_month(dates):
+    months = {}
+    for d in dates:
+        months.setdefault(d[:7], []).append(d)
+    return months
+
+def _month_label(month):
+    year, mon = month.split("-")
+    return f"{year}年{int(mon)}月"
+
+def generate_history_index(history_dir, output_path, months=None): # history_dir：ニュースHTMLファイルが保存されているフォルダ（例：public/history）。output_path：生成する index.html の出力パス
+    """
+    index.html（月の一覧）と月ごとのページを作る。
+    months：作り直す月（YYYY-MM）のリスト。None なら全部。指定外の月も、ページが無ければ作る。
+    """
+    dates = load_manifest(history_dir)
+    by_month = _by_month(dates)
+    targets = set(by_month) if months is None else set(months) & set(by_month)
+    targets |= {m for m in by_month if not os.path.exists(month_page(history_dir, m))}
+
+    # 月ごとのページ：その月の日付を新しい順に
+    for month in sorted(targets):
+        with open_pages(month_page(history_dir, month)) as out:
+            HISTORY_HEAD.render_to(out, title=f"{_month_label(month)}のニュース")
+            HISTORY_NAV.render_to(out, href="../index.html", label="← 過去のニュース一覧")
+            out.write(HISTORY_LIST)
+            for d in reversed(by_month[month]):
+                HISTORY_ITEM.render_to(out, href=f"../{archive_name(d)}", label=f"{d} のニュース")
+            out.write(HISTORY_LIST_END)
+            out.write(HISTORY_FOOT)
+
+    # index.html：月の一覧（新しい順・件数付き）
+    with open_pages(output_path) as out:
+        HISTORY_HEAD.render_to(out, title="過去のニュース一覧")
+        out.write(HISTORY_LIST)
+        for month in sorted(by_month, reverse=True):
+            HISTORY_MONTH_ITEM.render_to(out, href=f"{MONTHS_DIR}/{month}.html", label=_month_label(month), count=len(by_month[month]))
+        out.write(HISTORY_LIST_END)
+        out.write(HISTORY_FOOT)
+
+    print(f"✅ 履歴一覧ページ生成完了：{output_path}（月ページ {len(targets)}件を更新）")
+
+# 実行部分（全部の月を作り直す）
 if __name__ == "__main__":
     base_dir = os.path.dirname(__file__) # __file__：このPythonスクリプトのファイルパス
     history_dir = os.path.join(base_dir, "../public/history") # base_dir：このスクリプトがあるディレクトリ
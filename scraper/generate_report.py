@@ -3,12 +3,11 @@ from reportlab.pdfgen import canvas # reportlab.pdfgen.canvas：PDFのページ
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont # pdfmetrics, TTFont：日本語フォントをPDFで使えるように登録
 from reportlab.lib.pagesizes import A4 # A4：用紙サイズ（A4）を指定
-from datetime import datetime # datetime：発行日時を現在時刻で取得
 from reportlab.lib.colors import blue
 import os # os：ファイルパス操作用（OSに依存しないパスを作る）
 import textwrap # textwrap：長い文章を指定幅で自動改行するためのツール
 import re # re：正規表現によるテキスト前処理
-from scraper.fetch_news import get_all_headlines
+from scraper.snapshot import get_snapshot
 
 # 日本語フォント登録
 font_name = 'IPAexGothic' # IPAexGothic：日本語対応の無料フォント。
@@ -26,7 +25,8 @@ def clean_headline(text):
     return text
 
 # PDF生成関数
-def generate_pdf(path):
+def generate_pdf(path, snapshot=None): # snapshot: この実行で取得済みの HeadlineSnapshot。省略時は保存済みの今日分を読む（無ければ取得）。
+    snapshot = snapshot or get_snapshot()
     # キャンバスとレイアウト初期設定
     c = canvas.Canvas(path, pagesize=A4) # canvas.Canvas：描画キャンバス（1ページ）を作成
     width, height = A4
@@ -42,7 +42,7 @@ def generate_pdf(path):
         c.drawString(margin, y, "今日の主要ニュース")
         y -= 24
         c.setFont(font_name, font_size)
-        c.drawString(margin, y, f"発行日: {datetime.now().strftime('%Y/%m/%d %H:%M')}") # ヘッダーにはタイトルと日付を描画します。
+        c.drawString(margin, y, f"発行日: {snapshot.fetched_at.strftime('%Y/%m/%d %H:%M')}") # ヘッダーにはタイトルと日付（スナップショットの取得日時）を描画します。
         y -= 30
 
     # フッター描画関数
@@ -53,11 +53,11 @@ def generate_pdf(path):
     draw_header()
     c.setFont(font_name, font_size)
 
-    # ニュース見出しを取得＆描画
-    all_news = get_all_headlines()  # [(source_name, [(title, url), ...]), ...]
+    # ニュース見出しを取得＆描画（スクレイピングはせず、スナップショットを読む）
+    all_news = snapshot.sources  # [(source_name, [(title, url), ...]), ...]
 
     # セクションごとの見出し描画ループ
-    for source_name, headlines in all_news: # get_all_headlines() から受け取ったデータのループ。
+    for source_name, headlines in all_news: # スナップショットに入っているソースごとのループ。
         # ページ余白チェック（セクション描画前）
         if y - 40 < 60: # 40pt分の余白が確保できないとき、改ページ。y は現在の描画位置（下方向に減っていく）。改ページ後に y を初期値に戻してヘッダー再描画。
             draw_footer()
@@ -0,0 +1,112 @@
+# Selenium 系ソース（BBC / CNN / INTERNET Watch）で共有する、起動済み（warm）のヘッドレスChrome
+# - ChromeDriver のパス解決（ChromeDriverManager().install()）はプロセス内で1回だけ。
+# - Chrome 本体も1つだけ起動し、ソースごとに新しいタブを開いて使い回す。
+# - ページ読み込みは eager（DOM構築まで）で打ち切り、画像・フォント・CSS はブロックする。
+import os # os：環境変数 CHROMEDRIVER_PATH の参照に使う
+import time # time：起動時間・ページ処理時間の計測
+import atexit # atexit：プロセス終了時に Chrome を確実に閉じる
+import threading # threading：driver は同時に1スレッドからしか操作できないのでロックで守る
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+
+# 読み込ませないリソース（見出しの取得には DOM だけあれば十分）
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", # 画像
+    "*.woff", "*.woff2", "*.ttf", "*.otf", # フォント
+    "*.css", # CSS
+]
+PAGE_LOAD_TIMEOUT = 30 # driver.get() の上限（秒）
+
+_lock = threading.Lock()
+_driver = None # 起動済みの Chrome（最初に使われたときに起動）
+_driver_path = None # 解決済みの ChromeDriver パス
+_base_handle = None # 起動時からある空のタブ（各ソースのタブを閉じたらここへ戻る）
+TIMINGS = {} # {source_name: {"startup": 秒, "page": 秒}}
+
+def _resolve_driver_path():
+    """ChromeDriver のパスを1回だけ解決してキャッシュする（環境変数で固定も可）"""
+    global _driver_path
+    if _driver_path is None:
+        _driver_path = os.getenv("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+    return _driver_path
+
+def _build_options():
+    options = Options()
+    options.add_argument("--headless") # 画面を表示しないモード
+    options.add_argument("--no-sandbox") # サンドボックス無効（Linux環境で必要なことがある）
+    options.add_argument("--disable-dev-shm-usage") # 共有メモリの問題回避（Dockerなどで有効）
+    options.add_argument("--disable-gpu")
+    options.page_load_strategy = "eager" # DOMContentLoaded で driver.get() を返す（画像や広告の読み込みを待たない）
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2, # 2 = ブロック
+        "profile.managed_default_content_settings.fonts": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+    })
+    return options
+
+def _get_driver():
+    """起動済みの Chrome を返す。まだ無ければここで起動する。"""
+    global _driver, _base_handle
+    if _driver is None:
+        _driver = webdriver.Chrome(service=Service(_resolve_driver_path()), options=_build_options())
+        _driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        _base_handle = _driver.current_window_handle
+    return _driver
+
+def _block_resources(driver):
+    """今のタブで画像・フォント・CSS のリクエストを止める（CDP の設定はタブ単位なので毎回かける）"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        print("⚠️ リソースブロックの設定に失敗:", e)
+
+def shutdown():
+    """共有 Chrome を閉じる（次に使われたときは再起動する）"""
+    global _driver, _base_handle
+    if _driver is not None:
+        try:
+            _driver.quit()
+        except Exception:
+            pass
+    _driver = None
+    _base_handle = None
+
+atexit.register(shutdown)
+
+@contextmanager
+def browser_tab(source_name):
+    """
+    共有 Chrome に新しいタブを開いて driver を渡す。with を抜けるとタブを閉じる。
+    使い方:
+        with browser_tab("BBCニュース") as driver:
+            driver.get(url)
+    startup（Chrome の起動待ち）と page（ページ処理）の時間を TIMINGS に記録する。
+    """
+    with _lock:
+        t0 = time.monotonic()
+        driver = _get_driver()
+        startup = time.monotonic() - t0 # 2件目以降は warm なのでほぼ 0
+        driver.switch_to.new_window("tab")
+        _block_resources(driver)
+        t1 = time.monotonic()
+        try:
+            yield driver
+        finally:
+            page = time.monotonic() - t1
+            TIMINGS[source_name] = {"startup": round(startup, 2), "page": round(page, 2)}
+            print(f"🌐 {source_name}: 起動 {startup:.1f}s / ページ {page:.1f}s")
+            try:
+                driver.close() # このソースのタブだけ閉じる
+                driver.switch_to.window(_base_handle)
+            except Exception as e:
+                # Chrome が落ちている等 → 捨てて次回に再起動させる
+                print("⚠️ Chrome のタブを閉じられなかったため再起動します:", e)
+                shutdown()
+
+def get_timings():
+    """ソースごとの {startup, page} 秒を返す"""
+    return dict(TIMINGS)
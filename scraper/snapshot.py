@@ -0,0 +1,88 @@
+# 1回の実行（cli run）で1度だけスクレイピングし、その結果を HTML / PDF / 履歴 / レポートの全工程で共有するためのスナップショット
+# public/headlines_snapshot.json に保存しておくので、後からネットワークに触れずに再描画することもできる。
+import os # os：パス操作・一時ファイルの置き換え
+import json # json：スナップショットの保存形式（区切りを詰めたコンパクトなJSON）
+import hashlib # hashlib：中身のハッシュ（差分ビルドの判定用）
+from datetime import datetime
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "../public/headlines_snapshot.json")
+
+class HeadlineSnapshot:
+    """
+    1回分のスクレイピング結果。
+    sources: [(source_name, [(title, url), ...]), ...]（get_all_headlines() と同じ形）
+    fetched_at: 取得日時
+    """
+    def __init__(self, sources, fetched_at=None):
+        self.sources = [(name, [(title, url) for title, url in items]) for name, items in sources]
+        self.fetched_at = fetched_at or datetime.now()
+
+    @property
+    def date_str(self):
+        """ファイル名やアーカイブに使う日付（YYYY-MM-DD）"""
+        return self.fetched_at.strftime('%Y-%m-%d')
+
+    def content_hash(self):
+        """見出しの中身（ソース・タイトル・URL）のハッシュ。取得日時は含めない（同じ見出しなら同じ値）"""
+        return hashlib.sha1(json.dumps(self.sources, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def to_dict(self):
+        return {
+            "fetched_at": self.fetched_at.isoformat(timespec="seconds"),
+            "sources": [[name, [[title, url] for title, url in items]] for name, items in self.sources],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            sources=[(name, items) for name, items in data.get("sources", [])],
+            fetched_at=datetime.fromisoformat(data["fetched_at"]),
+        )
+
+    def save(self, path=SNAPSHOT_PATH):
+        """一時ファイルに書いてから置き換える（途中で落ちても壊れたJSONを残さない）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """保存済みのスナップショットを読む（ネットワークには触れない）。無ければ None。"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return HeadlineSnapshot.from_dict(json.load(f))
+
+def take_snapshot(path=SNAPSHOT_PATH, on_source=None):
+    """
+    全ソースを1回だけスクレイピングしてスナップショットを作り、保存して返す。
+    on_source(source_name, headlines) を渡すと、取得が終わったソースから順に呼ばれる（DB保存を取得と重ねる用）。
+    """
+    from scraper.fetch_news import SOURCES, iter_headlines # fetch_news は重い（Selenium等）ので、実際に取得するときだけ読み込む
+
+    fetched_at = datetime.now()
+    results = {}
+    for source_name, headlines in iter_headlines():
+        results[source_name] = headlines
+        if on_source and headlines:
+            on_source(source_name, headlines)
+
+    snapshot = HeadlineSnapshot(
+        sources=[(name, results.get(name, [])) for name, _, _ in SOURCES],
+        fetched_at=fetched_at,
+    )
+    snapshot.save(path)
+    return snapshot
+
+def get_snapshot(path=SNAPSHOT_PATH, offline=False):
+    """
+    今日のスナップショットがあればそれを返し、無ければ取得する。
+    offline=True のときは絶対にスクレイピングせず、保存済みのもの（日付が古くても）を返す。無ければ空のスナップショット。
+    """
+    snapshot = load_snapshot(path)
+    if offline:
+        return snapshot or HeadlineSnapshot(sources=[])
+    if snapshot and snapshot.date_str == datetime.now().strftime('%Y-%m-%d'):
+        return snapshot
+    return take_snapshot(path)
@@ -0,0 +1,51 @@
+# utils.categorize のマイクロベンチマーク
+# 100k 件の疑似見出しで、旧実装（呼び出しごとに辞書を組み立てて `kw in title` を回す）と
+# コンパイル済みの categorize_title / categorize_titles のスループットを比べ、結果が一致することも確かめる。
+# 実行：python -m scripts.bench_categorize [件数]
+import sys # sys：件数の引数
+import time # time：計測
+import random # random：疑似見出しの生成（シード固定）
+from utils.categorize import CATEGORY_RULES, OTHER, categorize_title, categorize_titles
+
+FILLER = "今日 の ニュース 東京 で 発表 明らかに について 男性 女性 新た 開始 発売 公開 予定 明日 昨年 見通し 記者 会見 総額 万人 初めて 一部 検討 方針".split()
+
+def _legacy_categorize(title: str) -> str:
+    """旧実装と同じ処理（比較用）"""
+    title = title.lower()
+    categories = {category: list(keywords) for category, keywords in CATEGORY_RULES.items()} # 旧実装は呼び出しごとに辞書を作っていた
+    for category, keywords in categories.items():
+        if any(kw.lower() in title for kw in keywords):
+            return category
+    return OTHER
+
+def make_titles(n: int, seed: int = 0):
+    """フィラー語の間に、7割の確率でどれかのカテゴリのキーワードを1つ埋め込んだ見出し"""
+    rng = random.Random(seed)
+    keywords = [kw for kws in CATEGORY_RULES.values() for kw in kws]
+    titles = []
+    for _ in range(n):
+        head = "".join(rng.choice(FILLER) for _ in range(rng.randint(6, 14)))
+        kw = rng.choice(keywords) if rng.random() < 0.7 else ""
+        tail = "".join(rng.choice(FILLER) for _ in range(3))
+        titles.append(head + kw + tail)
+    return titles
+
+def _bench(label, fn, titles):
+    started = time.perf_counter()
+    result = fn(titles)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed:6.2f}秒  {len(titles) / elapsed:>10,.0f} 件/秒")
+    return result
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    titles = make_titles(n)
+    print(f"🏁 {n:,} 件 / {len(CATEGORY_RULES)} カテゴリ / {sum(len(v) for v in CATEGORY_RULES.values())} キーワード")
+    legacy = _bench("旧実装", lambda ts: [_legacy_categorize(t) for t in ts], titles)
+    single = _bench("categorize_title", lambda ts: [categorize_title(t) for t in ts], titles)
+    batch = _bench("categorize_titles", categorize_titles, titles)
+    mismatches = sum(a != b for a, b in zip(legacy, batch)) + sum(a != b for a, b in zip(legacy, single))
+    print("✅ 結果一致" if mismatches == 0 else f"❌ 不一致 {mismatches} 件")
+
+if __name__ == "__main__":
+    main()
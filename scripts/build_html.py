@@ -4,78 +4,31 @@ from pathlib import Path
 from sqlalchemy import create_engine, text
 from db.settings import engine as _engine  # 既存の設定を使う想定（なければ適宜修正）
 from db.settings import SessionLocal
-from db.models import Headline
+from db.queries import latest_by_category # 表示列だけ・カテゴリごとの上位N件をSQLで
+from utils.html_templates import open_pages, write_items, REPORT_HEAD, REPORT_SECTION, REPORT_SECTION_END, REPORT_FOOT # ページの枠・記事のマークアップ（共通テンプレート）
 
 # OUTPUT_DIR = Path("reports")
 OUTPUT_DIR = Path("public") / "reports" # Path("reports")… 相対パス ./reports。
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True) # 無ければ mkdir(..., exist_ok=True) で作成。
 OUTPUT_HTML = OUTPUT_DIR / "index.html" # OUTPUT_HTML… 出力ファイルの絶対パスは OUTPUT_HTML.resolve() で確認可能。
 
-# HTML テンプレ（head / foot）
-HTML_HEAD = """<!doctype html>
-<html lang="ja">
-<head>
-  <meta charset="utf-8">
-  <title>毎朝ニュースレポート</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1">
-  <style>
-  body{font-family:system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial,"Noto Sans JP","Hiragino Kaku Gothic ProN","Yu Gothic",sans-serif;line-height:1.6;margin:24px;background:#0b0b0f;color:#e9e9ee}
-  a{color:#9ecbff;text-decoration:none}
-  a:hover{text-decoration:underline}
-  .wrap{max-width:980px;margin:0 auto}
-  h1{font-size:24px;margin-bottom:8px}
-  .meta{opacity:.7;font-size:12px;margin-bottom:24px}
-  .cat{display:inline-block;padding:2px 8px;border-radius:999px;background:#1b1b25;font-size:12px;margin-left:8px}
-  ul{list-style:none;padding:0;margin:0}
-  li{padding:14px 0;border-bottom:1px solid #222}
-  .title{font-weight:600}
-  .summary{margin:6px 0 2px 0;font-size:14px;opacity:.95}
-  .keywords{font-size:12px;opacity:.75}
-  .source{opacity:.8;font-size:12px}
-  .summary{margin:6px 0 2px 0;font-size:14px;opacity:.95}
-  .keywords{font-size:12px;opacity:.75}
-  .memo{margin-top:6px;font-size:14px;background:#141824;border:1px solid #202437;padding:8px 10px;border-radius:8px}
-  .badge{display:inline-block;font-size:11px;padding:1px 6px;border-radius:999px;margin-right:6px;vertical-align:1px}
-  .badge-insight{background:#103b28;color:#8ee6b6}
-  .badge-caution{background:#3d2c12;color:#f6c38b}
-  .badge-impact{background:#10263f;color:#9ecbff}
-  </style>
-</head>
-<body><div class="wrap">
-"""
-
-HTML_FOOT = """
-</div></body></html>
-"""
-
 # データ取得（カテゴリごとに上限付き）
 def fetch_latest(limit_per_category: int = 50):
     """
-    カテゴリ別に新しい順で取得（簡易版）。
+    カテゴリ別に新しい順で取得。
+    表示する列だけを読み、各カテゴリの上位 limit_per_category 件はSQL側（ROW_NUMBER）で絞る（id desc ＝ AUTO_INCREMENT を新しさの近似として利用）。
     """
     session = SessionLocal()
     try:
-        # 直近日付でまとめて拾い、カテゴリ→新しい順に並べ替え（メモリ側で）
-        rows = session.query(Headline).order_by(Headline.id.desc()).limit(2000).all() # 「新しい順に上から2000件だけ」取ります（id desc ＝ AUTO_INCREMENT を新しさの近似として利用）。
-        bucket = {}
-        for r in rows:
-            key = r.category or "その他" # r.category or "その他"：DB値がNULL/空の場合のフォールバック。
-            bucket.setdefault(key, []) # その2000件を Python側でカテゴリごとに詰める。
-            if len(bucket[key]) < limit_per_category: # 各カテゴリは limit_per_category 件まで。
-                bucket[key].append(r)
-        return bucket
+        return latest_by_category(session, limit_per_category) # カテゴリが NULL/空 の行は「その他」にまとまる
     finally:
         session.close()
 
 # HTML を組み立てる
-def build_html():
+def build_html(snapshot=None): # snapshot: cli run から渡される HeadlineSnapshot（生成日の表示をその実行の日付に揃える）
     # データの取得と日付の整形
-    bucket = fetch_latest(limit_per_category=50) # bucket は {"政治": [Headline, ...], "経済": [...], ...} の辞書（カテゴリ→記事配列）。各カテゴリで 最大50件 に制限済み（重たくならないように）。
-    today = date.today().strftime("%Y-%m-%d") # today は見出しに入れるための「YYYY-MM-DD」文字列。
-
-    # HTMLの先頭（ヘッダ）を parts に積む
-    parts = [HTML_HEAD, f"<h1>毎朝ニュースレポート</h1>",
-             f'<div class="meta">{today} 生成</div>']
+    bucket = fetch_latest(limit_per_category=50) # bucket は {"政治": [Row, ...], "経済": [...], ...} の辞書（カテゴリ→記事配列）。各カテゴリで 最大50件 に制限済み（重たくならないように）。
+    today = snapshot.date_str if snapshot else date.today().strftime("%Y-%m-%d") # today は見出しに入れるための「YYYY-MM-DD」文字列。
 
     # カテゴリ順は見やすさ重視で一例
     preferred = ["政治","経済","ビジネス","金融・マネー","国際","気象・災害","地域・地方",
@@ -85,36 +38,14 @@ def build_html():
     # preferred の中で 実際にデータがあるものだけを並べる。+ bucket にあるけど preferred に無い 未知カテゴリ を末尾に追加。つまり、想定外の新カテゴリがDBに来ても落ちずに表示される。
     order = [c for c in preferred if c in bucket] + [c for c in bucket.keys() if c not in preferred]
 
-    # 各カテゴリのHTMLブロック生成
-    for cat in order:
-        parts.append(f"<h2>{cat} <span class='cat'>{len(bucket[cat])}件</span></h2>") # cat はカテゴリ名（例：「政治」「経済」）。{len(bucket[cat])} はそのカテゴリの記事件数。<span class='cat'>…件</span> はCSSで丸いバッジ（背景色付き）にして件数表示。
-        # 記事リストの開始タグ
-        parts.append("<ul>") # 記事はHTMLの箇条書き（<ul>＝unordered list）で表現します。以降、各記事を <li> にして追加していきます。
-        # 各記事のループ処理
-        for h in bucket[cat]: # bucket[cat] は、そのカテゴリに属する Headline オブジェクトのリスト。
-            parts.append("<li>") # 記事ごとに <li> を開き、その中にタイトル・要約・キーワード・コメント・出典を順に追加します。
-            # 記事タイトル（リンク化）
-            parts.append(f"<a class='title' href='{h.url}' target='_blank' rel='noopener'>{h.title}</a>") # タイトルは <a> でリンク化。target="_blank" は新規タブ、rel="noopener" はセキュリティ＆パフォーマンス（開いた先から window.opener を使われない）。
-            if h.summary: # summary（要約）があれば1行表示。
-                parts.append(f"<div class='summary'>{h.summary}</div>")
-            if h.keywords: # keywords は DBで「カンマ区切り」想定 → split(',') → トリム → 空要素除去 → #tag 風に整形して表示。
-                parts.append(f"<div class='keywords'>#{' #'.join([k.strip() for k in h.keywords.split(',') if k.strip()])}</div>")
-            # 独自コメント（あれば）
-            if getattr(h, "comment", None): # comment フィールドに何らかのメモ・注釈がある場合に表示。
-                ctype = (getattr(h, "comment_type", "") or "").lower()
-                if ctype not in ("insight","caution","impact"): # comment_type は "insight", "caution", "impact" のいずれかを想定（なければ insight 扱い）。
-                    ctype = "insight"
-                label = {"insight":"示唆","caution":"注意","impact":"影響"}.get(ctype, "メモ") # label は日本語表示用（例："insight" → 「示唆」）。
-                parts.append(f"<div class='memo'><span class='badge badge-{ctype}'>{label}</span>{h.comment}</div>") # .memo でコメント本文、.badge でラベル（色分けバッジ）をCSS装飾できます。
-            # 出典と日付
-            parts.append(f"<div class='source'>{h.source} / {h.date}</div>") # source/date は出典と日付の情報欄。
-            # リストの終了タグ
-            parts.append("</li>")
-        parts.append("</ul>")
-
-    # フッタを閉じてファイルに書く
-    parts.append(HTML_FOOT)
-    OUTPUT_HTML.write_text("\n".join(parts), encoding="utf-8")
+    # カテゴリごとに見出し（件数バッジ付き）と記事リストを順に書き出す（記事1件のマークアップ：タイトル・要約・キーワード・編集部メモ・出典と日付は共通テンプレート）
+    with open_pages(OUTPUT_HTML) as out:
+        REPORT_HEAD.render_to(out, today=today)
+        for cat in order:
+            REPORT_SECTION.render_to(out, category=cat, count=len(bucket[cat]))
+            write_items(out, bucket[cat], "report")
+            out.write(REPORT_SECTION_END)
+        out.write(REPORT_FOOT)
     print(f"✅ HTML written: {OUTPUT_HTML.resolve()}")
 
 if __name__ == "__main__":
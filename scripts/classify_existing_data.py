@@ -1,55 +1,178 @@
-import os # os: パス結合やファイル位置取得に使用
-import sys # sys: 現状は未使用（将来的にCLI引数やパス操作に使う余地）
-from dotenv import load_dotenv # dotenv.load_dotenv: .env ファイルから環境変数を読み込むため
-from utils.categorize import categorize_title
-import mysql.connector # mysql.connector: 公式の MySQL Python コネクタ
-
-# .env 読み込み
-env_path = os.path.join(os.path.dirname(__file__), '../.env') # スクリプトファイルの場所（__file__）から相対的に ../.env を指す
-load_dotenv(dotenv_path=env_path)
-
-# DB接続情報（辞書）
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'), # os.getenv で .env → 環境変数から読み込み
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASS'),
-    'database': os.getenv('DB_NAME'),
-    'charset': 'utf8mb4' # charset='utf8mb4' は絵文字や多言語対応に必須
-}
-
-# メイン処理
-def update_categories():
+# 既存の headlines を今のカテゴリ規則で分類し直す
+# 各行には分類に使った規則のバージョン（category_version = utils.categorize.RULES_VERSION）が入っている。
+# 既定（差分モード）では、今と違うバージョンの行だけを対象にし、さらに
+#   1) そのときの規則が category_rulesets に控えてあれば、追加・削除・移動したキーワードを含む見出しだけ分類し直し
+#   2) 残りの行はカテゴリが変わりようがないので、UPDATE 1本でバージョンだけ進める
+# 規則の控えが無い（バージョン未記録の古い行など）ものと --full 指定時は、該当行を全部分類し直す。
+# どちらも id 順に CHUNK_SIZE 件ずつ（WHERE id > 前回の最後の id）読み進め（キーセット・ページネーション）、
+# チャンクごとに categorize_titles でまとめて分類し、変わった行だけを executemany の UPDATE で書き戻す。
+# カテゴリが変わった行があれば、同じトランザクションでその (日付, カテゴリ) のダイジェスト順位だけ付け直す（表全体は作り直さない）。
+# 全件モードはチャンクを書き終えるたびに最後の id をチェックポイントに保存するので、途中で止めても続きから再開できる。
+# 実行：python -m scripts.classify_existing_data [--full] [--chunk-size 5000] [--restart] [--dry-run]
+import os # os: チェックポイントのパス
+import json # json: チェックポイントの保存形式
+import time # time: スループットの計測
+import argparse # argparse: コマンドライン引数
+from sqlalchemy import text
+from db.settings import engine # プロジェクト共通の SQLAlchemy エンジン（.env の DB_* から接続）
+from db.rulesets import save_ruleset, load_ruleset
+from db.digest import refresh_categories # カテゴリが変わったら、変わった (日付, カテゴリ) のダイジェスト順位だけ付け直す
+from utils.categorize import categorize_titles, changed_keywords, CATEGORY_RULES, RULES_VERSION
+
+CHUNK_SIZE = 5000 # 1回に読む行数（メモリに載るのはこの件数ぶんだけ）
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "../.cache/classify_checkpoint.json")
+
+UPDATE_CATEGORY = text("UPDATE headlines SET category = :category, category_version = :version WHERE id = :id")
+
+def load_checkpoint(path=CHECKPOINT_PATH) -> int:
+    """前回どこ（id）まで終わったか。無ければ 0"""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG) # DBへ接続。失敗すると例外→exceptへ。
-        cursor = conn.cursor() # SQLを実行するためのカーソル。
-
-        # データ取得
-        cursor.execute("SELECT id, title FROM headlines") # 全件をメモリに読み込み（件数が多いと重い）。
-        rows = cursor.fetchall()
-
-        updated_count = 0
-
-        for row in rows: # ループで categorize_title(title) を呼ぶ
-            id, title = row
-            category = categorize_title(title)
-            
-            # UPDATE実行
-            cursor.execute(
-                "UPDATE headlines SET category = %s WHERE id = %s", # プレースホルダ %s でパラメータバインド（SQLインジェクション安全）。
-                (category, id)
-            )
-            updated_count += 1
-
-        conn.commit() # まとめてトランザクション確定。ここまでの UPDATE がDBに反映。
-        print(f"✅ カテゴリ更新完了: {updated_count}件")
-
-    except Exception as e:
-        print("❌ エラー:", e)
-    finally: # finally でクリーンアップ。
-        if conn.is_connected():
-            cursor.close()
-            conn.close() # conn.is_connected() を見て cursor/conn をクローズ。
+        with open(path, encoding="utf-8") as f:
+            return int(json.load(f).get("last_id", 0))
+    except FileNotFoundError:
+        return 0
+
+def save_checkpoint(last_id: int, path=CHECKPOINT_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"last_id": last_id, "saved_at": time.time()}, f)
+    os.replace(tmp, path) # 書き込み途中で止まっても壊れたチェックポイントを残さない
+
+def clear_checkpoint(path=CHECKPOINT_PATH):
+    if os.path.exists(path):
+        os.remove(path)
+
+def _like(keyword: str) -> str:
+    """LIKE '%kw%' の値（kw 内の % _ \\ はエスケープ）"""
+    return "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _reclassify(where="1=1", params=None, chunk_size=CHUNK_SIZE, dry_run=False, last_id=0, on_chunk=None):
+    """
+    WHERE {where} に当たる行を id 順にチャンクで読み、分類し直して、カテゴリかバージョンが変わった行だけ書き戻す。
+    on_chunk(last_id)：チャンクを書き終えるたびに呼ぶ（チェックポイント用）
+    カテゴリが変わった行の (日付, 前のカテゴリ)・(日付, 新しいカテゴリ) のダイジェスト順位は、同じトランザクションで付け直す
+    （途中で止めて再開しても、書き終えたチャンクのぶんはダイジェストもそろっている）
+    戻り値: (確認した件数, カテゴリが変わった件数)
+    """
+    params = dict(params or {})
+    select_chunk = text(
+        f"SELECT id, date, title, category, category_version FROM headlines "
+        f"WHERE id > :last_id AND ({where}) ORDER BY id LIMIT :limit"
+    )
+    with engine.connect() as conn:
+        total = conn.execute(text(f"SELECT COUNT(*) FROM headlines WHERE id > :last_id AND ({where})"), {**params, "last_id": last_id}).scalar() or 0
+    print(f"🔁 再分類対象: {total}件（{chunk_size}件ずつ）")
+
+    scanned = changed = 0
+    started = time.perf_counter()
+    while True:
+        # 1チャンク = 1トランザクション（読んで・分類して・変わった行だけ書いて・確定）
+        with engine.begin() as conn:
+            rows = conn.execute(select_chunk, {**params, "last_id": last_id, "limit": chunk_size}).all()
+            if not rows:
+                break
+            categories = categorize_titles([row.title for row in rows])
+            updates = [
+                {"id": row.id, "category": category, "version": RULES_VERSION}
+                for row, category in zip(rows, categories)
+                if row.category != category or row.category_version != RULES_VERSION # 変わらない行には UPDATE を送らない
+            ]
+            if updates and not dry_run:
+                conn.execute(UPDATE_CATEGORY, updates) # パラメータのリストを渡すと executemany になる
+            moved = [(row, category) for row, category in zip(rows, categories) if row.category != category]
+            if moved and not dry_run:
+                refresh_categories(conn, {(row.date, c) for row, category in moved for c in (row.category, category)})
+            changed += len(moved)
+        last_id = rows[-1].id
+        if on_chunk and not dry_run:
+            on_chunk(last_id)
+
+        scanned += len(rows)
+        elapsed = time.perf_counter() - started
+        rate = scanned / elapsed if elapsed else 0.0
+        pct = scanned / total * 100 if total else 100.0
+        print(f"  … {scanned}/{total}件 ({pct:.0f}%) 変更 {changed}件 | {rate:,.0f}件/秒 | id ≤ {last_id}")
+    return scanned, changed
+
+# メイン処理（全件）
+def update_categories(chunk_size=CHUNK_SIZE, restart=False, dry_run=False, checkpoint_path=CHECKPOINT_PATH):
+    last_id = 0 if restart else load_checkpoint(checkpoint_path)
+    if last_id:
+        print(f"↩️ チェックポイントから再開: id > {last_id}")
+    if not dry_run:
+        with engine.begin() as conn:
+            save_ruleset(conn)
+
+    started = time.perf_counter()
+    scanned, changed = _reclassify(
+        chunk_size=chunk_size, dry_run=dry_run, last_id=last_id,
+        on_chunk=lambda last: save_checkpoint(last, checkpoint_path),
+    )
+    if not dry_run:
+        clear_checkpoint(checkpoint_path) # 最後まで終わったら次回は最初から
+    elapsed = time.perf_counter() - started
+    label = "変更予定" if dry_run else "更新"
+    print(f"✅ カテゴリ再分類完了: {scanned}件を確認 / {changed}件{label}（{elapsed:.1f}秒）")
+    return scanned, changed
+
+# メイン処理（差分）
+def update_stale_categories(chunk_size=CHUNK_SIZE, dry_run=False):
+    """category_version が今の RULES_VERSION と違う行だけを、変わったキーワードの分だけ分類し直す"""
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if not dry_run:
+            save_ruleset(conn)
+        stale = conn.execute(text(
+            "SELECT category_version, COUNT(*) FROM headlines "
+            "WHERE category_version IS NULL OR category_version <> :version GROUP BY category_version"
+        ), {"version": RULES_VERSION}).all()
+    if not stale:
+        print(f"✅ すべて最新の規則（{RULES_VERSION}）で分類済みです")
+        return 0, 0
+
+    scanned = changed = bumped = 0
+    for old_version, count in stale:
+        with engine.connect() as conn:
+            old_rules = load_ruleset(conn, old_version) if old_version else None
+        if old_rules is None:
+            # どの規則で分類したか分からない行は全部やり直す
+            print(f"🧾 規則 {old_version or '(未記録)'}: {count}件 → 控えが無いので全件を再分類")
+            where = "category_version IS NULL" if old_version is None else "category_version = :old"
+            s, c = _reclassify(where, {"old": old_version}, chunk_size, dry_run)
+            scanned, changed = scanned + s, changed + c
+            continue
+
+        keywords = sorted(changed_keywords(old_rules, CATEGORY_RULES))
+        print(f"🧾 規則 {old_version}: {count}件 / 変わったキーワード {len(keywords)}個 {keywords[:10]}{' …' if len(keywords) > 10 else ''}")
+        if keywords:
+            # 変わったキーワードを含む見出しだけが候補（LOWER(title) は categorize と同じく小文字で比べるため）
+            likes = " OR ".join(f"LOWER(title) LIKE :kw{i}" for i in range(len(keywords)))
+            params = {"old": old_version, **{f"kw{i}": _like(kw) for i, kw in enumerate(keywords)}}
+            s, c = _reclassify(f"category_version = :old AND ({likes})", params, chunk_size, dry_run)
+            scanned, changed = scanned + s, changed + c
+        # 残りはカテゴリが変わりようがないので、バージョンだけまとめて進める
+        if not dry_run:
+            with engine.begin() as conn:
+                bumped += conn.execute(
+                    text("UPDATE headlines SET category_version = :version WHERE category_version = :old"),
+                    {"version": RULES_VERSION, "old": old_version},
+                ).rowcount
+
+    elapsed = time.perf_counter() - started
+    label = "変更予定" if dry_run else "更新"
+    print(f"✅ 差分再分類完了: 候補 {scanned}件を確認 / {changed}件{label} / バージョンのみ更新 {bumped}件（{elapsed:.1f}秒）")
+    return scanned, changed
 
 # エントリポイント
-if __name__ == '__main__': # スクリプトとして実行されたときだけ update_categories() を走らせる（モジュールimport時は実行されない）。
-    update_categories()
+if __name__ == '__main__': # スクリプトとして実行されたときだけ走らせる（モジュールimport時は実行されない）。
+    parser = argparse.ArgumentParser(description="headlines.category を今のカテゴリ規則で再分類する（既定は古い規則の行だけ）")
+    parser.add_argument("--full", action="store_true", help="バージョンに関係なく全件を再分類する")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="1回に読む行数")
+    parser.add_argument("--restart", action="store_true", help="（--full）チェックポイントを無視して最初から")
+    parser.add_argument("--dry-run", action="store_true", help="件数を数えるだけで書き込まない")
+    args = parser.parse_args()
+    if args.full:
+        update_categories(chunk_size=args.chunk_size, restart=args.restart, dry_run=args.dry_run)
+    else:
+        update_stale_categories(chunk_size=args.chunk_size, dry_run=args.dry_run)
@@ -1,56 +1,123 @@
 import argparse # argparse：コマンドライン引数を扱う標準ライブラリ
 import os # os：ファイルパス操作のために使う
+from functools import partial
+from datetime import timedelta
+import scraper.generate_report as generate_report_module
+import scraper.generate_html as generate_html_module
+import scraper.generate_history_index as generate_history_index_module
+import scripts.build_html as build_html_module
 from scraper.generate_report import generate_pdf
 from scraper.generate_html import generate_html
-from scraper.generate_history_index import generate_history_index
-from datetime import datetime # datetime：今日の日付の取得に使用
-from scraper.fetch_news import get_all_headlines
+from scraper.generate_history_index import generate_history_index, add_archive, load_manifest, month_page
+from scraper.snapshot import take_snapshot, load_snapshot
 from db.save_headlines import save_headlines
-from scripts.build_html import build_html
-
-# get_all_headlines() で全ニュースソースの見出しを収集して、それをDB保存用関数 save_headlines(source_name, headlines) にソースごと渡して保存する制御ループ
-all_news = get_all_headlines()
-for source_name, headlines in all_news:
-    save_headlines(source_name, headlines)
+from db.settings import SessionLocal
+from db.queries import headline_stats, headline_checksum, CATEGORY_WINDOW
+from utils.body_cache import get_body_cache
+from utils.build_manifest import BuildManifest, fingerprint, file_hash # 出力ごとの入力の指紋（変わっていない出力は作り直さない）
+from utils.html_templates import TEMPLATE_HASH
+from utils.categorize import RULES_VERSION
+from scripts.build_html import build_html, OUTPUT_HTML
 
 def main():
     parser = argparse.ArgumentParser(description="ニュースレポート自動生成CLI") # argparse.ArgumentParser(...)→ CLIに説明をつける
-    parser.add_argument("command", choices=["run"], help="コマンド: run = PDF+HTML生成＋index作成") # add_argument("command", choices=["run"])→ 実行コマンドを "run" に限定。
-    args = parser.parse_args() # args.command→ 引数が "run" のときだけ実行する仕組み
+    parser.add_argument("command", choices=["run", "render"],
+                        help="コマンド: run = 収集＋DB保存＋PDF+HTML生成＋index作成 / render = 保存済みスナップショットから再生成（ネットワーク不使用）") # add_argument("command", choices=[...])→ 実行コマンドを限定。
+    parser.add_argument("--force", action="store_true", help="入力が変わっていない出力も作り直す")
+    parser.add_argument("--offline-bodies", action="store_true",
+                        help="（run）新しい記事の本文をダウンロードせず、本文キャッシュ（.cache/bodies）にあるものだけ使う。見出しの収集はする"
+                             "（保存済みの記事の本文を直すのは python -m db.replay_bodies）")
+    args = parser.parse_args() # args.command→ 引数で処理を切り替える
+
+    # パスの準備
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) # __file__ はこのファイル（cli.py）のパス。dirname(__file__) でディレクトリ（scripts/）を取得。.. で親ディレクトリ（news-report-app/）へ移動。abspath(...) で絶対パスに変換
+    # script_dir = os.path.dirname(__file__)
+    # report_dir = os.path.abspath(os.path.join(script_dir, "../../news-report"))
+    # history_dir = os.path.join(report_dir, "history")
+
+    # 出力先のファイルパス定義
+    public_dir = os.path.join(project_root, "public")
+    history_dir = os.path.join(public_dir, "history")
+    latest_html = os.path.join(public_dir, "news_report.html")
+    pdf_path = os.path.join(public_dir, "news_report.pdf")
+    index_path = os.path.join(history_dir, "index.html")
+    snapshot_path = os.path.join(public_dir, "headlines_snapshot.json")
+    # latest_html = os.path.join(report_dir, "news_report.html")
+    # pdf_path = os.path.join(report_dir, "news_report.pdf")
+    # index_path = os.path.join(report_dir, "index.html")
 
     if args.command == "run":
-        # パスの準備
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) # __file__ はこのファイル（cli.py）のパス。dirname(__file__) でディレクトリ（scripts/）を取得。.. で親ディレクトリ（news-report-app/）へ移動。abspath(...) で絶対パスに変換
-        # script_dir = os.path.dirname(__file__)
-        # report_dir = os.path.abspath(os.path.join(script_dir, "../../news-report"))
-        # history_dir = os.path.join(report_dir, "history")
-
-        # 出力先のファイルパス定義
-        public_dir = os.path.join(project_root, "public")
-        history_dir = os.path.join(public_dir, "history")
-        latest_html = os.path.join(public_dir, "news_report.html")
-        pdf_path = os.path.join(public_dir, "news_report.pdf")
-        index_path = os.path.join(history_dir, "index.html")
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        archive_html = os.path.join(history_dir, f"news_{today_str}.html")
-        # latest_html = os.path.join(report_dir, "news_report.html")
-        # pdf_path = os.path.join(report_dir, "news_report.pdf")
-        # index_path = os.path.join(report_dir, "index.html")
-
-        # HTML・PDF・index.html の順に生成
-        print("📄 HTML生成中...")
-        generate_html(latest_html, archive_html)
-
-        print("📰 PDF生成中...")
-        generate_pdf(pdf_path)
-
-        print("📚 履歴一覧(index.html)生成中...")
-        generate_history_index(history_dir, index_path) # public/history/ にある HTML 一覧を読み込み、リンク付きの index.html を作る
-
-        print("📊 カテゴリ別ニュース一覧(reports/index.html)生成中...")
-        build_html()
-
-        print("✅ 完了しました！")
+        # 全ソースを1回だけ並行に収集し、取得が終わったソースから順に save_headlines(source_name, headlines) でDB保存する。
+        # 結果はスナップショット（public/headlines_snapshot.json）として保存され、以降の工程はすべてこれを読む。
+        print("🔎 ニュース収集中...")
+        snapshot = take_snapshot(snapshot_path, on_source=partial(save_headlines, offline=args.offline_bodies))
+        get_body_cache().evict() # 本文キャッシュの古い・上限超過分を掃除
+    else:
+        # render：スクレイピングせず、保存済みのスナップショットとDBだけで出力を作り直す
+        # スナップショットが無いと、どの日のレポートか決まらない（今日の日付で空のアーカイブを作らない）
+        snapshot = load_snapshot(snapshot_path)
+        if snapshot is None:
+            print(f"⚠️ スナップショットがありません: {snapshot_path}（先に cli run を実行してください）")
+            return
+        print(f"🗂 スナップショット {snapshot.date_str} から再生成します")
+
+    archive_html = os.path.join(history_dir, f"news_{snapshot.date_str}.html") # アーカイブ名はスナップショットの取得日で決める
+
+    # 各出力の中身を決める入力だけから指紋を作り、前回の記録（.cache/build_manifest.json）と同じなら作り直さない
+    # （新しい見出しが1件も入らず、既存の行も書き換わっていない実行では、DBへの集計数本だけで終わる）
+    # ※ 発行日時の表示は、中身が変わって作り直したときのものが残る
+    manifest = BuildManifest(force=args.force)
+    session = SessionLocal()
+    try:
+        since = snapshot.fetched_at.date() - timedelta(days=generate_html_module.RECENT_DAYS - 1) # 描く範囲はスナップショットの日まで
+        # (MAX(id), 件数) に、表示範囲の中身の CRC32 合計を足す（既存の行の再分類・要約のやり直しにも気づくように）
+        recent_stats = headline_stats(session, since) + (headline_checksum(session, since=since),) # 直近の表示範囲
+        all_stats = headline_stats(session) + (headline_checksum(session, window=CATEGORY_WINDOW),) # カテゴリ別一覧の範囲（新しい方から CATEGORY_WINDOW 件）
+    finally:
+        session.close()
+    snapshot_hash = snapshot.content_hash()
+
+    # HTML・PDF・index.html の順に生成
+    print("📄 HTML生成中...")
+    manifest.build(
+        "news_report",
+        fingerprint(recent_stats, since, snapshot_hash, archive_html, TEMPLATE_HASH, file_hash(generate_html_module.__file__)),
+        [latest_html, archive_html],
+        lambda: generate_html(latest_html, archive_html, snapshot=snapshot),
+    )
+
+    print("📰 PDF生成中...")
+    manifest.build(
+        "news_report_pdf",
+        fingerprint(snapshot_hash, snapshot.date_str, file_hash(generate_report_module.__file__)), # PDF はスナップショットだけから作る
+        [pdf_path],
+        lambda: generate_pdf(pdf_path, snapshot=snapshot),
+    )
+
+    print("📚 履歴一覧(index.html)生成中...")
+    add_archive(history_dir, snapshot.date_str) # 履歴マニフェスト（public/history/manifest.json）に今日のレポートを追記（フォルダは走査しない）
+    month = snapshot.date_str[:7]
+    # 普段は月の一覧（index.html）と今月のページだけ作り直す。テンプレートか生成コードが変わったとき（と --force）は、過去の月のページも全部
+    layout_fp = fingerprint(TEMPLATE_HASH, file_hash(generate_history_index_module.__file__))
+    relayout = not manifest.is_fresh("history_layout", layout_fp, [])
+    manifest.build(
+        "history_index",
+        fingerprint(load_manifest(history_dir), layout_fp),
+        [index_path, month_page(history_dir, month)],
+        lambda: generate_history_index(history_dir, index_path, months=None if relayout else [month]),
+    )
+    if relayout:
+        manifest.record("history_layout", layout_fp, []) # 全部の月を作り直し終えてから記録する
+
+    print("📊 カテゴリ別ニュース一覧(reports/index.html)生成中...")
+    manifest.build(
+        "reports",
+        fingerprint(all_stats, RULES_VERSION, snapshot.date_str, TEMPLATE_HASH, file_hash(build_html_module.__file__)),
+        [str(OUTPUT_HTML)],
+        lambda: build_html(snapshot=snapshot),
+    )
+
+    print("✅ 完了しました！")
 
 # エントリーポイント
 if __name__ == "__main__":
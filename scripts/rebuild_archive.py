@@ -0,0 +1,113 @@
+# 日ごとのアーカイブ（public/history/news_YYYY-MM-DD.html）を、headlines から指定した期間まとめて作り直す
+# テンプレートを変えた・要約をやり直した・過去分を取り込んだ、などで何年分も描き直したいとき用。
+# 日付を連続した区間（既定は約1か月）に分けてプロセスプールに配り、全コアで並行に描く。
+#   - 各プロセスは自分の DB 接続を持ち（親から受け継いだ接続は使わない）、1日ずつ
+#     「その日までの直近 RECENT_DAYS 日・ソースごとの上位 MAX_PER_SOURCE 件」（cli run の当日と同じ内容）を読んで1枚書く。
+#   - 隣り合う日は同じ記事が何日も載るので、プロセスごとにメモリ上の描画キャッシュを持って <li> を使い回す。
+# 全部書き終わったら、履歴マニフェストへまとめて追記し、触った月のページと index.html だけ作り直す。
+# 実行：python -m scripts.rebuild_archive [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--workers N] [--chunk 日数]
+#       （期間を省略すると、記事のある全部の日付）
+import argparse # argparse：コマンドライン引数
+import os # os：パス・CPU 数
+import time # time：所要時間・進み具合
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed # プロセスプール（描画は CPU を使うので、スレッドではなくプロセスで並べる）
+from db.settings import engine, SessionLocal
+from db.queries import headline_dates, recent_by_source
+from scraper.generate_html import RECENT_DAYS, MAX_PER_SOURCE, ordered_sections, write_daily_page
+from scraper.generate_history_index import generate_history_index, add_archives, archive_name
+from utils.fragment_cache import FragmentCache
+
+CHUNK_DAYS = 31 # 1タスクで描く連続した日数（日をまたいで同じ記事が載るので、まとめた方がキャッシュが効く）
+WORKER_CACHE_ENTRIES = 20000 # プロセスごとの描画キャッシュ
+
+_cache = None
+
+def _init_worker():
+    """プロセスプールの各プロセスで最初に1回だけ呼ばれる"""
+    global _cache
+    # fork で受け継いだ接続プールは親のソケットを指しているので、閉じずに捨てる（この後の接続はこのプロセスが自分で張る）
+    engine.dispose(close=False)
+    _cache = FragmentCache(max_entries=WORKER_CACHE_ENTRIES)
+
+def render_days(days, history_dir):
+    """
+    days（連続した date のリスト）のアーカイブを1日ずつ書く。書いた日付（'YYYY-MM-DD'）と記事数を返す。
+    1日ぶんの行を読んで書いたら次の日へ（期間全体を一度にメモリへ載せない）。
+    """
+    written, items = [], 0
+    session = SessionLocal()
+    try:
+        for day in days:
+            bucket = recent_by_source(session, day - timedelta(days=RECENT_DAYS - 1), MAX_PER_SOURCE, until=day)
+            if not bucket:
+                continue
+            date_str = day.strftime('%Y-%m-%d')
+            sections = ordered_sections(bucket)
+            # 発行日時は当時の実行時刻が分からないので、日付だけを出す
+            write_daily_page(os.path.join(history_dir, archive_name(date_str)), sections, date_str, day.strftime('%Y/%m/%d'), cache=_cache)
+            written.append(date_str)
+            items += sum(len(rows) for _, rows in sections)
+    finally:
+        session.close()
+    return written, items
+
+def _shards(days, size):
+    for start in range(0, len(days), size):
+        yield days[start:start + size]
+
+def rebuild_archive(history_dir, since=None, until=None, workers=None, chunk_days=CHUNK_DAYS):
+    """since〜until（date / None は端まで）の記事のある日を作り直す。作り直した日数を返す"""
+    session = SessionLocal()
+    try:
+        days = headline_dates(session, since, until)
+    finally:
+        session.close()
+    if not days:
+        print("⚠️ 対象の日付がありません")
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    # 日数が少ないときも全プロセスに仕事が行くように、区間を短くする
+    chunk_days = max(1, min(chunk_days, -(-len(days) // workers)))
+    shards = list(_shards(days, chunk_days))
+    print(f"🗃 アーカイブ再生成：{days[0]}〜{days[-1]}（{len(days)}日・{len(shards)}区間・{workers}プロセス）")
+
+    engine.dispose() # 日付一覧を読んだ接続を、プロセスを分ける前に閉じておく
+    os.makedirs(history_dir, exist_ok=True)
+    started = time.perf_counter()
+    written, items, done = [], 0, 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(render_days, shard, history_dir): shard for shard in shards}
+        for future in as_completed(futures):
+            shard_written, shard_items = future.result() # どこかの区間が失敗したら、ここで止める（マニフェストは更新しない）
+            written += shard_written
+            items += shard_items
+            done += len(futures[future])
+            elapsed = time.perf_counter() - started
+            print(f"  🧱 {done}/{len(days)}日（{done / elapsed:.0f}日/秒）")
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ アーカイブ再生成完了：{len(written)}日・{items}件（{elapsed:.1f}秒）")
+
+    # 履歴マニフェストへまとめて追記して、触った月のページと index.html を作り直す
+    added = add_archives(history_dir, written)
+    if added:
+        print(f"🗂 履歴マニフェストに {added}件を追加")
+    generate_history_index(history_dir, os.path.join(history_dir, "index.html"), months=sorted({d[:7] for d in written}))
+    return len(written)
+
+def main():
+    parser = argparse.ArgumentParser(description="日ごとのアーカイブを headlines から作り直す")
+    parser.add_argument("--since", type=date.fromisoformat, help="この日から（YYYY-MM-DD。省略時は最初の日）")
+    parser.add_argument("--until", type=date.fromisoformat, help="この日まで（YYYY-MM-DD。省略時は最後の日）")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数（省略時は CPU コア数）")
+    parser.add_argument("--chunk", type=int, default=CHUNK_DAYS, help=f"1タスクで描く連続した日数（既定 {CHUNK_DAYS}）")
+    args = parser.parse_args()
+
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    history_dir = os.path.join(project_root, "public", "history")
+    rebuild_archive(history_dir, args.since, args.until, args.workers, args.chunk)
+
+if __name__ == "__main__":
+    main()
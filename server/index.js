@@ -29,6 +29,9 @@ function formatReportName(filename) {
   return filename;
 }
 
+// ダイジェストが1日・1カテゴリあたりに持っている件数（db/digest.py の MAX_RANK と同じ。これを超える日は headlines から読む）
+const DIGEST_MAX_RANK = 50;
+
 // カテゴリ定義（画面ボタンなどに使う）
 const CATEGORIES = [
   "政治", "経済", "ビジネス", "金融・マネー", "国際", "気象・災害", "地域・地方", "暮らし",
@@ -36,18 +39,36 @@ const CATEGORIES = [
   "科学・文化", "テクノロジー", "IT・インターネット", "AI・生成AI", "セキュリティ・犯罪", "労働・雇用", "食・グルメ", "ペット・動物", "旅行・観光", "その他"
 ];
 
+// 履歴レポートのファイル名一覧（新しい順）
+// public/history/manifest.json（{"dates": ["YYYY-MM-DD", ...]}、scraper/generate_history_index.py が追記）を読む。
+// マニフェストがまだ無いときだけフォルダを走査する。
+function readArchiveFiles(historyDir, callback) {
+  fs.readFile(path.join(historyDir, 'manifest.json'), 'utf8', (err, text) => {
+    let dates = null;
+    if (!err) {
+      try {
+        dates = JSON.parse(text).dates || [];
+      } catch (e) {
+        // 壊れていたらフォルダの走査に切り替える
+      }
+    }
+    // callback は try の外で呼ぶ（ルート側で例外が出たときに、catch からフォルダ走査へ進んで2回目の応答を返さないように）
+    if (dates) return callback(null, dates.map(d => `news_${d}.html`).reverse());
+    fs.readdir(historyDir, (err2, files) => {
+      if (err2) return callback(err2);
+      // HTMLファイルのみ取得して新しい順にソート（index.htmlは除外）
+      callback(null, files.filter(f => /^news_\d{4}-\d{2}-\d{2}\.html$/.test(f)).sort().reverse());
+    });
+  });
+}
+
 // GET / ：リクエスト（トップページ）へのルート定義（最新HTML＋履歴5件）
 app.get('/', (req, res) => {
   const historyDir = path.join(__dirname, '../public/history');
-  //履歴フォルダの中から最新のHTMLレポートを抽出し、最大5件を整形して返す
-  fs.readdir(historyDir, (err, files) => { //fs.readdir()はNode.js標準のファイルシステム操作関数。第一引数 historyDir に指定されたディレクトリの中身（ファイル名の配列）を取得します。第二引数は コールバック関数、err : 読み込みエラーがあれば入る（例：フォルダがない、権限がない）、files: 読み込んだファイル名の配列（["news_2025-08-01.html", "news_2025-07-31.html", ...]）
+  //履歴の中から最新のHTMLレポートを抽出し、最大5件を整形して返す
+  readArchiveFiles(historyDir, (err, htmlFiles) => { // htmlFiles: 新しい順のファイル名の配列（["news_2025-08-01.html", "news_2025-07-31.html", ...]）
     if (err) return res.status(500).send('履歴フォルダの読み込みに失敗しました'); //フォルダが存在しない場合や権限エラーなどで読み込みが失敗したとき、HTTPレスポンスとして 500（サーバーエラー） を返します。return を使うことで、この時点で処理を終了します。
 
-    // HTMLファイルのみ取得して新しい順にソート（index.htmlは除外）
-    const htmlFiles = files
-      .filter(f => f.endsWith('.html') && f !== 'index.html') // HTMLのみ、index.html除外
-      .sort() // ファイル名昇順
-      .reverse(); // 新しい順に
     // 最新HTMLは配列の先頭
     const latestHtmlFile = htmlFiles.length > 0 ? htmlFiles[0] : null;
     // 履歴は最大5件
@@ -67,80 +88,106 @@ app.get('/', (req, res) => {
   });
 });
 
-// 履歴ページ（全履歴表示）
+// 履歴ページ（月ごと：/history?month=YYYY-MM、省略時は最新の月）
 app.get('/history', (req, res) => {
   const historyDir = path.join(__dirname, '../public/history');
 
-  fs.readdir(historyDir, (err, files) => {
+  readArchiveFiles(historyDir, (err, files) => {
     if (err) return res.status(500).send('履歴フォルダの読み込みに失敗しました');
 
-    // HTMLファイルのみ取得して新しい順にソート（index.htmlは除外）
+    // 月の一覧（新しい順）と、表示する月のレポートだけを渡す（何年分たまっても1ページは1か月分）
+    const months = [...new Set(files.map(f => f.slice(5, 12)))]; // news_YYYY-MM-DD.html → YYYY-MM
+    const month = months.includes(req.query.month) ? req.query.month : (months[0] || null);
     const htmlFiles = files
-      .filter(f => f.endsWith('.html') && f !== 'index.html')
-      .sort()
-      .reverse()
+      .filter(f => f.slice(5, 12) === month)
       .map(file => ({
         filename: file,
         displayName: formatReportName(file)
       }));
 
-    res.render('history', { reports: htmlFiles }); // history.ejs に渡す
+    res.render('history', { reports: htmlFiles, months, month }); // history.ejs に渡す
   });
 });
 
+// 検索条件の組み立て（db/search.py と同じ規則）
+// title / summary / keywords の FULLTEXT 索引 ft_headlines_text（ngram パーサ＝bigram、db/migrations.py の 006）を MATCH ... AGAINST で引く。
+// ※ 索引はストップワードなし（innodb_ft_enable_stopword = OFF）で作ってあり、「is」「an」などを含む bigram も引けるのはそのため。
+//   テーブルを作り直す操作（ALTER TABLE ... FORCE、OPTIMIZE TABLE など）で索引が作り直されるときも、同じ設定のセッションで行うこと。
+// 空白区切りの語はすべて含む（AND）、各語は "..." で囲んでフレーズ検索（+ - * などを演算子として解釈させない）。
+// 2文字未満の語は bigram の索引に載らないので、その語だけ LIKE '%q%' で絞る。
+const MIN_TERM_CHARS = 2; // ngram_token_size（MySQL の既定 2）
+const MATCH_TEXT = 'MATCH(title, summary, keywords) AGAINST (? IN BOOLEAN MODE)';
+function likeValue(term) {
+  return '%' + term.replace(/[\\%_]/g, m => '\\' + m) + '%';
+}
+function buildSearch(q) {
+  const terms = q.split(/\s+/).map(t => t.replace(/"/g, ' ').trim()).filter(Boolean);
+  const longTerms = terms.filter(t => [...t].length >= MIN_TERM_CHARS);
+  const shortTerms = terms.filter(t => [...t].length < MIN_TERM_CHARS);
+  const where = [];
+  const params = [];
+  let score = '0';
+  const scoreParams = [];
+  if (longTerms.length) {
+    const query = longTerms.map(t => `+"${t}"`).join(' ');
+    where.push(MATCH_TEXT);
+    params.push(query);
+    score = MATCH_TEXT;
+    scoreParams.push(query);
+  }
+  for (const t of shortTerms) {
+    where.push('(title LIKE ? OR summary LIKE ? OR keywords LIKE ?)');
+    const v = likeValue(t);
+    params.push(v, v, v);
+  }
+  return { where: where.join(' AND '), params, score, scoreParams, empty: terms.length === 0 };
+}
+
+// 直近5日（＝5レポート分）の日付
+async function recentDates(conn) {
+  const [dateRows] = await conn.execute(
+    `SELECT date AS dt FROM headlines GROUP BY date ORDER BY date DESC LIMIT 5`
+  );
+  return dateRows.map(r => r.dt);
+}
+
 // ニュース本文キーワード検索API
-// 「キーワードでタイトルを部分一致検索」しつつ、scope=recent5 の時だけ「直近5日分に限定」→ 同じ日付（＝レポートファイル）単位でグルーピングしてJSONを返します。
+// 「キーワードでタイトル・要約・キーワードを全文検索」しつつ、scope=recent5 の時だけ「直近5日分に限定」→ 同じ日付（＝レポートファイル）単位でグルーピングしてJSONを返します。
 app.get('/search', async (req, res) => {
   // クエリ取得
-  const q = (req.query.q || '').trim(); // GET /search?q=... を受け取るAPI。trim() で前後空白を除去。q はタイトル検索用キーワード。空なら即終了（無駄なDBアクセスを回避）。
+  const q = (req.query.q || '').trim(); // GET /search?q=... を受け取るAPI。trim() で前後空白を除去。空なら即終了（無駄なDBアクセスを回避）。
   const scope = (req.query.scope || '').trim(); // scope は絞り込みオプション。recent5 指定時だけ検索対象日付を「最後の5日」に限定。
-  if (!q) return res.json([]);
+  const search = buildSearch(q);
+  if (search.empty) return res.json([]);
 
   // DB接続と結果入れ物
   const conn = await mysql.createConnection(dbConfig);
-  let rows = [];
+  let where = search.where;
+  let params = [...search.params];
 
   // scope=recent5 のロジック
-  if (scope === 'recent5') { // レポート単位＝日付ごとの最新5日 を取得。
-    const [dateRows] = await conn.execute(
-      `SELECT date AS dt
-         FROM headlines
-        GROUP BY date
-        ORDER BY date DESC
-        LIMIT 5`
-    );
-    const dates = dateRows.map(r => r.dt);
+  if (scope === 'recent5') { // レポート単位＝日付ごとの最新5日 に限定。
+    const dates = await recentDates(conn);
     if (dates.length === 0) {
       await conn.end();
       return res.json([]);
     }
-
-    // その5日分に限定して検索
-    const placeholders = dates.map(() => '?').join(','); // 取得した 5つの日付だけ を IN (?, ?, ?, ?, ?) で絞り込み、さらにタイトルLIKEで検索。
-    const params = [`%${q}%`, ...dates];
-
-    const [r] = await conn.execute(
-      `SELECT DATE_FORMAT(date,'%Y-%m-%d') AS ymd, id, title, url
-         FROM headlines
-        WHERE title LIKE ?
-          AND date IN (${placeholders})
-        ORDER BY date DESC`,
-      params
-    );
-    rows = r;
-  } else {
-    // 従来の全期間検索
-    const [r] = await conn.execute(
-      `SELECT DATE_FORMAT(date,'%Y-%m-%d') AS ymd, id, title, url
-         FROM headlines
-        WHERE title LIKE ?
-        ORDER BY date DESC
-        LIMIT 300`,
-      [`%${q}%`]
-    );
-    rows = r;
+    where += ` AND date IN (${dates.map(() => '?').join(',')})`;
+    params.push(...dates);
   }
 
+  // 日付（＝レポート）ごとにまとめるので日付の新しい順、同じ日の中は関連度の高い順
+  // 件数の上限は全期間のときだけ（recent5 は5日分に絞ってあるので、その範囲の一致を全部返す）
+  const limit = scope === 'recent5' ? '' : 'LIMIT 300';
+  const [rows] = await conn.execute(
+    `SELECT DATE_FORMAT(date,'%Y-%m-%d') AS ymd, id, title, url, ${search.score} AS score
+       FROM headlines
+      WHERE ${where}
+      ORDER BY date DESC, score DESC, id DESC
+      ${limit}`,
+    [...search.scoreParams, ...params]
+  );
+
   await conn.end();
 
   // レポート（=日付）ごとにグルーピング
@@ -163,7 +210,7 @@ app.get('/search', async (req, res) => {
   res.json([...map.values()]);
 });
 
-// MySQLから記事タイトルをキーワード検索して、HTMLページとして返す機能
+// MySQLから記事をキーワード検索して、HTMLページとして返す機能
 // MySQL接続設定
 const mysql = require('mysql2/promise'); // mysql2/promise を使って async/await で書ける
 // 接続情報を .env から取得
@@ -174,55 +221,47 @@ const dbConfig = {
   database: process.env.DB_NAME
 };
 
-// 検索結果ページ
+// 検索結果ページ（SEARCH_PAGE_SIZE 件ずつ。?page=2, 3, ... で続きを表示）
+const SEARCH_PAGE_SIZE = 100;
 app.get('/search-page', async (req, res) => { // async 関数なので、中で await が使える。
   // クエリパラメータの取得と整形
   const keyword = (req.query.q || '').trim(); //URLの ?q=... 部分からキーワードを取得。.trim() で前後の空白を削除。|| '' で未指定時は空文字にする。
   const scope   = (req.query.scope || '').trim();
+  const page    = Math.max(parseInt(req.query.page, 10) || 1, 1);
+  const search = buildSearch(keyword);
   // キーワードがない場合の処理
-  if (!keyword) return res.render('search_results', { keyword, results: [], scope });
+  if (search.empty) return res.render('search_results', { keyword, results: [], scope, page, hasNext: false });
 
   // MySQLに接続
   const conn = await mysql.createConnection(dbConfig); // mysql.createConnection() で単発のDB接続を作成。await で接続完了を待ってから次へ進む。
-  let rows = [];
+  let where = search.where;
+  let params = [...search.params];
 
   if (scope === 'recent5') {
-    // 直近5日（＝5レポート分）の日付を取得
-    const [dateRows] = await conn.execute(
-      `SELECT date AS dt FROM headlines GROUP BY date ORDER BY date DESC LIMIT 5`
-    );
-    const dates = dateRows.map(r => r.dt);
+    // 直近5日（＝5レポート分）に限定
+    const dates = await recentDates(conn);
     if (dates.length === 0) {
       await conn.end();
-      return res.render('search_results', { keyword, results: [], scope });
+      return res.render('search_results', { keyword, results: [], scope, page, hasNext: false });
     }
-
-    // その5日分に限定して検索
-    const placeholders = dates.map(() => '?').join(',');
-    const params = [`%${keyword}%`, ...dates];
-    const [r] = await conn.execute(
-      `SELECT id, date, title, url
-         FROM headlines
-        WHERE title LIKE ?
-          AND date IN (${placeholders})
-        ORDER BY date DESC`,
-      params
-    );
-    rows = r;
-  } else {
-    // 全期間
-    const [r] = await conn.execute(
-      `SELECT id, date, title, url
-         FROM headlines
-        WHERE title LIKE ?
-        ORDER BY date DESC`,
-      [`%${keyword}%`]
-    );
-    rows = r;
+    where += ` AND date IN (${dates.map(() => '?').join(',')})`;
+    params.push(...dates);
   }
 
+  // 関連度の高い順 → 新しい順。次のページがあるか分かるように1件多く読む
+  // LIMIT / OFFSET は整数に丸めた値を埋め込む（mysql2 の execute は数値バインドで失敗することがあるため）
+  const [rows] = await conn.execute(
+    `SELECT id, date, title, url, ${search.score} AS score
+       FROM headlines
+      WHERE ${where}
+      ORDER BY score DESC, date DESC, id DESC
+      LIMIT ${SEARCH_PAGE_SIZE + 1} OFFSET ${(page - 1) * SEARCH_PAGE_SIZE}`,
+    [...search.scoreParams, ...params]
+  );
+
   await conn.end();
-  res.render('search_results', { keyword, results: rows, scope });
+  const hasNext = rows.length > SEARCH_PAGE_SIZE;
+  res.render('search_results', { keyword, results: rows.slice(0, SEARCH_PAGE_SIZE), scope, page, hasNext });
 });
 
 // カテゴリ別フィルター表示ルート
@@ -234,10 +273,47 @@ app.get('/category/:name', async (req, res) => { // :name は URLパラメータ
     // DB接続開始
     const connection = await mysql.createConnection(dbConfig); // ここでは単発接続（createConnection）高トラフィック時は接続プール（mysql.createPool）推奨。
     // カテゴリ別の記事を取得
-    const [rows] = await connection.execute(
-      'SELECT title, url, date FROM headlines WHERE category = ? ORDER BY date DESC',
-      [category]
+    // ダイジェスト（headline_digest：日ごと・カテゴリごとの新しい順の順位、db/digest.py が更新）を (category, date, category_rank) の索引で読む
+    let [rows] = await connection.execute(
+      `SELECT h.title, h.url, h.date, DATE_FORMAT(d.date,'%Y-%m-%d') AS ymd, d.category_rank
+         FROM headline_digest d
+         JOIN headlines h ON h.id = d.headline_id
+        WHERE d.category = ? AND d.category_rank <= ?
+        ORDER BY d.date DESC, d.category_rank`,
+      [category, DIGEST_MAX_RANK]
     ); // [category] はSQLの ? に安全に埋め込まれる（SQLインジェクション防止）
+    // ダイジェストは1日・1カテゴリあたり DIGEST_MAX_RANK 件までしか持たないので、上限まで埋まっている日は headlines から全件読み直す
+    const capped = [...new Set(rows.filter(r => r.category_rank === DIGEST_MAX_RANK).map(r => r.ymd))];
+    if (capped.length > 0) {
+      const [full] = await connection.execute(
+        `SELECT title, url, date, DATE_FORMAT(date,'%Y-%m-%d') AS ymd
+           FROM headlines
+          WHERE category = ? AND date IN (${capped.map(() => '?').join(',')})
+          ORDER BY date DESC, id DESC`,
+        [category, ...capped]
+      ); // 上限に達した日の分だけ（(date, source, id) の索引で日付を絞る）
+      const byDate = new Map();
+      for (const r of full) {
+        if (!byDate.has(r.ymd)) byDate.set(r.ymd, []);
+        byDate.get(r.ymd).push(r);
+      }
+      const merged = [];
+      for (const r of rows) {
+        if (!byDate.has(r.ymd)) {
+          merged.push(r);
+        } else if (r.category_rank === 1) {
+          merged.push(...byDate.get(r.ymd)); // その日の先頭の位置に、その日の全件を入れる
+        }
+      }
+      rows = merged;
+    }
+    if (rows.length === 0) {
+      // ダイジェスト未作成（python -m db.digest rebuild 前）のときは headlines から直接
+      [rows] = await connection.execute(
+        'SELECT title, url, date FROM headlines WHERE category = ? ORDER BY date DESC',
+        [category]
+      );
+    }
     // 接続終了
     await connection.end(); // await を付けて確実に終了を待つ。
 
@@ -255,6 +331,54 @@ app.get('/category/:name', async (req, res) => { // :name は URLパラメータ
   }
 });
 
+// キーワード（タグ）別の記事一覧
+// headline_keywords（1記事1キーワード1行、db/keywords.py が更新）を (keyword, date, headline_id) の索引で読む。
+app.get('/tag/:name', async (req, res) => {
+  // Express がパスの %XX を1回デコード済み（もう一度 decodeURIComponent すると「%」を含むタグで URIError → 500 になる）
+  const keyword = req.params.name.normalize('NFKC').trim(); // 保存時と同じ正規化（NFKC・前後の空白除去）
+  try {
+    const connection = await mysql.createConnection(dbConfig);
+    const [rows] = await connection.execute(
+      `SELECT h.id, h.date, h.title, h.url
+         FROM headline_keywords k
+         JOIN headlines h ON h.id = k.headline_id
+        WHERE k.keyword = ?
+        ORDER BY k.date DESC, k.headline_id DESC
+        LIMIT 300`,
+      [keyword]
+    );
+    await connection.end();
+    res.render('search_results', { keyword, results: rows, scope: '' }); // 見た目は検索結果ページと同じ
+  } catch (err) {
+    console.error(err);
+    res.status(500).send('サーバーエラー');
+  }
+});
+
+// よく出たキーワード（直近 days 日、既定 7 日）をJSONで返す
+// keyword_daily_counts（日ごと・キーワードごとの記事数）の主キー (date, keyword) を日付の範囲で読んで足すだけ。
+app.get('/trending', async (req, res) => {
+  const days = Math.min(Math.max(parseInt(req.query.days, 10) || 7, 1), 365);
+  const limit = Math.min(Math.max(parseInt(req.query.limit, 10) || 20, 1), 100);
+  try {
+    const connection = await mysql.createConnection(dbConfig);
+    const [rows] = await connection.execute(
+      `SELECT keyword, SUM(count) AS total
+         FROM keyword_daily_counts
+        WHERE date >= CURDATE() - INTERVAL ? DAY
+        GROUP BY keyword
+        ORDER BY total DESC, keyword
+        LIMIT ${limit}`,
+      [days - 1]
+    ); // LIMIT は整数に丸めた値を埋め込む（mysql2 の execute は LIMIT ? の数値バインドで失敗することがあるため）
+    await connection.end();
+    res.json(rows.map(r => ({ keyword: r.keyword, count: Number(r.total) })));
+  } catch (err) {
+    console.error(err);
+    res.status(500).json({ error: 'サーバーエラー' });
+  }
+});
+
 // ポート3000でサーバーを起動し、起動確認メッセージを出力
 app.listen(3000, () => {
   console.log('✅ サーバー起動： http://localhost:3000');
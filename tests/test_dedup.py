@@ -0,0 +1,30 @@
+# utils/dedup.py：近似重複の判定（要約の使い回し）で別の記事を同じとみなさないこと
+from utils import dedup
+
+DAY1 = "東京株式市場 日経平均は反発 終値3万9000円台"
+DAY2 = "東京株式市場 日経平均は反落 終値3万8000円台"
+
+def test_numbers():
+    assert dedup.numbers("終値3万9000円台") == {"3", "9000"}
+    assert dedup.numbers("１，２３４件") == {"1234"} # 全角・区切りのカンマ
+
+def test_market_titles_with_different_numbers_are_not_duplicates():
+    # タイトルだけの指紋でも文字の重なりは 0.6 ほどある（しきい値 0.4 を超える）
+    a, b = dedup.fingerprint(DAY1), dedup.fingerprint(DAY2)
+    assert dedup.similarity(dedup._decode(a), dedup._decode(b)) >= dedup.DUP_THRESHOLD
+    index = dedup.MinHashIndex()
+    index.add(a, "day1", DAY1, title_only=True)
+    assert index.find(b, DAY2) is None
+
+def test_numbers_must_match_even_with_body():
+    body = "東京株式市場で日経平均株価は前日比で大きく動き、取引を終えた。" * 10
+    index = dedup.MinHashIndex()
+    index.add(dedup.fingerprint(DAY1, body), "day1", DAY1)
+    assert index.find(dedup.fingerprint(DAY2, body), DAY2) is None
+    assert index.find(dedup.fingerprint(DAY1, body), DAY1) == "day1"
+
+def test_title_only_needs_nearly_identical_title():
+    index = dedup.MinHashIndex()
+    index.add(dedup.fingerprint(DAY1), "day1", DAY1, title_only=True)
+    assert index.find(dedup.fingerprint(DAY1), DAY1) == "day1"
+    assert index.find(dedup.fingerprint("東京株式市場 日経平均は下落 終値3万9000円台"), "東京株式市場 日経平均は下落 終値3万9000円台") is None
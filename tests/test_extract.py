@@ -0,0 +1,25 @@
+# utils/extract.py：BeautifulSoup フォールバックの本文抽出で、行内のタグが段落を分断しないこと
+from bs4 import BeautifulSoup
+from utils.extract import block_text
+from utils.snippet import build_snippet
+
+LEAD = "政府は日銀と協議し、来年度の予算案を閣議決定した。"
+HTML = (
+    "<article><h1>予算案を閣議決定</h1>"
+    "<p>政府は<a href='/boj'>日銀</a>と協議し、来年度の<strong>予算案</strong>を閣議決定した。"
+    "歳出総額は過去最大となる見通しで、国会での審議は来月から始まる。</p>"
+    "<p>財務省は<span>国債の発行額</span>を抑える方針だ。</p></article>"
+)
+
+def test_inline_tags_stay_in_one_line():
+    lines = block_text(BeautifulSoup(HTML, "html.parser").article).split("\n")
+    assert lines[0] == "予算案を閣議決定"
+    assert lines[1].startswith(LEAD)
+    assert lines[2] == "財務省は国債の発行額を抑える方針だ。"
+
+def test_snippet_keeps_lead_sentence():
+    assert build_snippet(block_text(BeautifulSoup(HTML, "html.parser"))).startswith(LEAD) # 短い見出しは落ちても、リードの文は残る
+
+def test_english_spacing_is_kept():
+    soup = BeautifulSoup("<p>The <a href='#'>central bank</a> raised\n rates.</p>", "html.parser")
+    assert block_text(soup) == "The central bank raised rates."
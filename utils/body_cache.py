@@ -0,0 +1,167 @@
+# 記事本文のディスクキャッシュ（正規化URLのハッシュをキーにした content-addressed な保存）
+# 1エントリ = 生HTML + 抽出済み本文 + 取得日時 + ETag / Last-Modified を圧縮して1ファイルに保存する。
+# 再実行・翌日も残るランキング記事・要約のやり直しで、同じ記事を何度もダウンロードしないために使う。
+import os # os：ファイル操作（保存・削除・サイズ計測）
+import json # json：エントリの中身の保存形式
+import time # time：取得日時・期限切れ判定
+import zlib # zlib：zstandard が無い環境での圧縮
+import hashlib # hashlib：正規化URL → キー（sha256）
+import threading # threading：並行取得中のヒット/ミス集計を守るロック
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    import zstandard as zstd # あれば zstd（速くて縮む）。無ければ zlib を使う
+except ImportError:
+    zstd = None
+
+CACHE_DIR = os.getenv("BODY_CACHE_DIR", os.path.join(os.path.dirname(__file__), "../.cache/bodies"))
+MAX_BYTES = int(os.getenv("BODY_CACHE_MAX_MB", "500")) * 1024 * 1024 # キャッシュ全体の上限サイズ
+MAX_AGE_DAYS = int(os.getenv("BODY_CACHE_MAX_AGE_DAYS", "30")) # これより古いエントリは捨てる
+
+# 記事の中身に関係ない計測用クエリ（同じ記事が別URL扱いにならないよう除く）
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "yclid", "mc_cid", "mc_eid")
+
+def normalize_url(url: str) -> str:
+    """スキーム/ホストの小文字化・デフォルトポートとフラグメントの除去・計測用クエリの除去・クエリの並べ替え"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+def cache_key(url: str) -> str:
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+def _compress(data: bytes) -> bytes:
+    if zstd:
+        return b"S" + zstd.ZstdCompressor(level=10).compress(data)
+    return b"Z" + zlib.compress(data, 6)
+
+def _decompress(blob: bytes) -> bytes:
+    codec, payload = blob[:1], blob[1:]
+    if codec == b"S":
+        if zstd is None:
+            raise RuntimeError("zstandard がインストールされていないため読めないエントリです")
+        return zstd.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+class BodyCache:
+    """
+    使い方:
+        cache = BodyCache()
+        entry = cache.get(url)   # -> dict(url, html, text, fetched_at, etag, last_modified) or None
+        cache.put(url, html, text, etag=..., last_modified=...)
+    """
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, max_age_days=MAX_AGE_DAYS):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.bin") # 先頭2文字でディレクトリを分けて1フォルダのファイル数を抑える
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, url: str, count: bool = True):
+        """エントリを返す（無い・壊れている・期限切れなら None）"""
+        path = self._path(cache_key(url))
+        entry = None
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(_decompress(f.read()))
+            if time.time() - entry.get("fetched_at", 0) > self.max_age:
+                entry = None
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[body_cache WARN] 壊れたエントリを無視します: {path} :: {e}")
+        if count:
+            self._count(entry is not None)
+        return entry
+
+    def put(self, url: str, html: str, text: str, etag=None, last_modified=None, fetched_at=None):
+        entry = {
+            "url": url,
+            "html": html or "",
+            "text": text or "",
+            "fetched_at": fetched_at or time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        path = self._path(cache_key(url))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp" # スレッドごとに別の一時ファイル → 置き換えで書き込み途中のファイルを見せない
+        with open(tmp, "wb") as f:
+            f.write(_compress(json.dumps(entry, ensure_ascii=False).encode("utf-8")))
+        os.replace(tmp, path)
+        return entry
+
+    def touch(self, url: str):
+        """304 Not Modified で中身が変わっていないと分かったとき、取得日時だけ更新する"""
+        entry = self.get(url, count=False)
+        if entry:
+            self.put(url, entry["html"], entry["text"], entry.get("etag"), entry.get("last_modified"))
+        return entry
+
+    def evict(self):
+        """期限切れのエントリを消し、さらに全体が上限を超えていれば古い（最終更新が前の）ものから消す"""
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".bin"):
+                    path = os.path.join(dirpath, name)
+                    st = os.stat(path)
+                    files.append((st.st_mtime, st.st_size, path))
+
+        removed = 0
+        now = time.time()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files): # 古い順
+            if now - mtime > self.max_age or total > self.max_bytes:
+                os.remove(path)
+                total -= size
+                removed += 1
+        return removed, total
+
+    def report(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            rate = (self.hits / total * 100) if total else 0.0
+            return f"🗄 本文キャッシュ: hit={self.hits} miss={self.misses} ({rate:.0f}%)"
+
+_default = None
+def get_body_cache():
+    """プロセス内で共有するキャッシュ（ヒット/ミスの集計もここに溜まる）"""
+    global _default
+    if _default is None:
+        _default = BodyCache()
+    return _default
+
+# 直接実行：python -m utils.body_cache [evict]
+if __name__ == "__main__":
+    import sys
+    cache = get_body_cache()
+    if len(sys.argv) > 1 and sys.argv[1] == "evict":
+        removed, total = cache.evict()
+        print(f"🧹 {removed}件削除 / 残り {total / 1024 / 1024:.1f}MB ({cache.root})")
+    else:
+        count, total = 0, 0
+        for dirpath, _, names in os.walk(cache.root):
+            for name in names:
+                if name.endswith(".bin"):
+                    count += 1
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        print(f"🗄 {count}件 / {total / 1024 / 1024:.1f}MB ({cache.root})")
@@ -0,0 +1,77 @@
+# 出力ファイルごとの「入力の指紋」を記録しておき、指紋が前回と同じ出力は作り直さない（差分ビルド）
+# 指紋は出力ごとに、その出力の中身を決める入力だけから作る。例：
+#   news_report.html … 直近7日の headlines の MAX(id)・件数、カテゴリ規則のバージョン、テンプレートのハッシュ、生成コードのハッシュ
+#   reports/index.html … headlines 全体の MAX(id)・件数、カテゴリ規則のバージョン、テンプレートのハッシュ
+#   news_report.pdf … スナップショットの中身のハッシュ
+# 記録は .cache/build_manifest.json（{名前: {"fingerprint": ..., "outputs": [...], "built_at": ...}}）。
+# 指紋が同じでも、出力ファイルが消えていれば作り直す。
+import os # os：パス・ファイルの存在確認・置き換え
+import json # json：マニフェストの保存形式・指紋の組み立て
+import time # time：作成時刻の記録・所要時間
+import hashlib # hashlib：指紋
+
+MANIFEST_PATH = os.getenv("BUILD_MANIFEST_PATH", os.path.join(os.path.dirname(__file__), "../.cache/build_manifest.json"))
+
+def fingerprint(*parts) -> str:
+    """入力（JSON にできる値・日付など）の並びから指紋を作る"""
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+
+def file_hash(path) -> str:
+    """ファイルの中身のハッシュ（生成コードが変わったら作り直すため）。無ければ空文字"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()[:12]
+    except FileNotFoundError:
+        return ""
+
+class BuildManifest:
+    """
+    使い方:
+        manifest = BuildManifest()
+        manifest.build("reports", fingerprint(max_id, count, ...), [output_path], lambda: build_html(...))
+        # 指紋が前回と同じで出力もそろっていれば何もしない（False）、作り直したら True
+    """
+    def __init__(self, path=MANIFEST_PATH, force=False):
+        self.path = path
+        self.force = force # True なら指紋に関係なく全部作り直す
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def is_fresh(self, name, fp, outputs) -> bool:
+        entry = self.entries.get(name)
+        return (
+            not self.force
+            and entry is not None
+            and entry.get("fingerprint") == fp
+            and all(os.path.exists(p) for p in outputs)
+        )
+
+    def record(self, name, fp, outputs):
+        self.entries[name] = {
+            "fingerprint": fp,
+            "outputs": list(outputs),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def save(self):
+        """一時ファイルに書いてから置き換える（途中で落ちても壊れた JSON を残さない）"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def build(self, name, fp, outputs, fn) -> bool:
+        """指紋が変わっていれば fn() で作り直して記録する。作り直したら True"""
+        if self.is_fresh(name, fp, outputs):
+            print(f"⏭️ {name}: 変更なし（スキップ）")
+            return False
+        started = time.perf_counter()
+        fn()
+        self.record(name, fp, outputs) # fn() が例外で終わったら記録しない（次回また作り直す）
+        print(f"🔨 {name}: 再生成（{(time.perf_counter() - started) * 1000:.0f}ms）")
+        return True
@@ -1,38 +1,97 @@
+# ニュースの見出しをキーワードでカテゴリに振り分ける
+# ルールは import 時に1回だけ正規表現にコンパイルしておき、呼び出しごとには辞書の組み立ても
+# キーワードごとの `in` 判定もしない（DB全件の再分類で数十万件を回すため）。
+import re # re：カテゴリごとのキーワードを1本の選択肢パターンにまとめる
+import json # json：ルールのハッシュ（RULES_VERSION）を取るための正規化
+import hashlib # hashlib：RULES_VERSION
+
+OTHER = "その他" # どれにも当てはまらない場合
+
+# カテゴリ辞書の定義（上から順に判定し、最初に一致したカテゴリを採用する）
+CATEGORY_RULES = {
+    "政治": ['政府', '首相', '内閣', '大臣', '選挙', '国会', '官邸', '政党', '議員', '政治家'],
+    "経済": ['経済', '景気', 'gdp', 'インフレ', '円安', '金利', '財政', '物価', 'デフレ'],
+    "ビジネス": ['企業', '経営', '人事', '株価', '市場', '決算', '合併', '業績', '商社', '上場', '経営者', '会計', '新規事業'],
+    "金融・マネー": ['投資', '銀行', '税金', '確定申告', 'fx', 'クレカ', '預金', '為替', '資産運用', '金融庁', '口座', '証券'],
+    "国際": ['外交', '米国', 'アメリカ', '中国', 'ロシア', '国連', '戦争', 'ウクライナ', '北朝鮮', '台湾', '欧州', 'asean', '大使館'],
+    "気象・災害": ['台風', '地震', '津波', '噴火', '豪雨', '気象庁', '気温', '落雷', '猛暑', '雪崩', '警報', '浸水', '洪水'],
+    "地域・地方": ['自治体', '地方', '地域', '町おこし', '移住', '観光地', 'ふるさと', '道の駅', '都道府県', '県庁'],
+    "暮らし": ['生活', '保険', '年金', '節約', '子育て', '買い物', '家庭', '衣食住', '家事', 'ガス代', '電気代', 'ライフスタイル'],
+    "医療・健康": ['医療', '健康', '病院', 'ワクチン', '感染症', 'コロナ', 'インフルエンザ', 'がん', '癌', '薬', '厚労省', '検診', '診察'],
+    "教育・受験": ['教育', '受験', '大学', '授業料', '学校', '学生', '入試', '文科省', '教科書', '学力', '塾', '試験'],
+    "社会": ['事件', '犯罪', '裁判', '逮捕', '警察', '覚醒剤', '暴行', '詐欺', '不正', '汚職', '検察', '拘束'],
+    "交通・事故": ['渋滞', '事故', '電車遅延', '人身事故', '通行止め', '運転', '高速道路', '脱線', '踏切', '鉄道', '新幹線', 'ダイヤ改正'],
+    "スポーツ": ['野球', 'サッカー', '大谷', 'w杯', '五輪', 'オリンピック', '試合', '日本代表', 'プロ野球', 'jリーグ', '選手', '得点'],
+    "エンタメ": ['芸能', 'ドラマ', '映画', 'アイドル', '歌手', 'テレビ', '舞台', 'ジャニーズ', '俳優', 'アニメ', '紅白', '放送'],
+    "科学・文化": ['宇宙', '科学', '技術', '発見', '研究', '博物館', '文化財', '展覧会', '遺跡', '美術', 'ノーベル賞'],
+    "テクノロジー": ['ai', 'iot', 'チップ', 'robot', '量子コンピューター', 'ドローン', '半導体', '自動運転'],
+    "IT・インターネット": ['sns', 'ネット', 'youtube', 'x（旧twitter）', 'x (旧twitter)', 'アプリ', 'ログイン', '炎上', 'サブスク', 'line', 'it企業'],
+    "AI・生成AI": ['openai', 'chatgpt', 'gemini', 'claude', '生成ai', '大規模言語モデル', 'llm'],
+    "セキュリティ・犯罪": ['ハッキング', '情報漏洩', 'サイバー攻撃', 'マルウェア', '不正アクセス', 'ウイルス'],
+    "労働・雇用": ['雇用', '解雇', '転職', '労働環境', 'ブラック企業', '労基署', '失業'],
+    "食・グルメ": ['レシピ', '食材', '飲食店', 'グルメ', '調味料', '料理', 'お菓子', '外食'],
+    "ペット・動物": ['犬', '猫', '動物園', 'ペット', '野生動物', '保護犬', 'ペットショップ'],
+    "旅行・観光": ['観光', '旅行', 'ツアー', '温泉', '名所', 'ホテル', '宿泊', '航空券']
+}
+
+def _compile_rules(rules):
+    """
+    {カテゴリ: [キーワード, ...]} → [(カテゴリ, パターン), ...]（辞書の順番を保つ）
+    カテゴリごとにキーワードを `kw1|kw2|...` の1本にまとめる。検索は C 実装の中で1回の走査で済み、
+    キーワード数だけ `in` を回すより速い（scripts/bench_categorize.py で計測）。
+    """
+    return [
+        (category, re.compile("|".join(re.escape(kw.lower()) for kw in keywords)))
+        for category, keywords in rules.items()
+    ]
+
+_MATCHERS = _compile_rules(CATEGORY_RULES)
+
+def rules_version(rules) -> str:
+    """ルール表のハッシュ（先頭12文字）。キーワード・カテゴリ・順番のどれかが変われば変わる"""
+    return hashlib.sha1(json.dumps(list(rules.items()), ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+RULES_VERSION = rules_version(CATEGORY_RULES) # headlines.category_version に記録する（どの規則で分類したか）
+
+def _keyword_ranks(rules):
+    """{小文字キーワード: (カテゴリの順位, カテゴリ名)}（同じキーワードが複数あれば先のカテゴリが効く）"""
+    ranks = {}
+    for rank, (category, keywords) in enumerate(rules.items()):
+        for kw in keywords:
+            ranks.setdefault(kw.lower(), (rank, category))
+    return ranks
+
+def changed_keywords(old_rules, new_rules=CATEGORY_RULES) -> set:
+    """
+    old_rules → new_rules で、追加・削除・所属カテゴリ（や順位）が変わったキーワードの集合。
+    見出しの分類結果は「含まれるキーワードのうち最上位のカテゴリ」で決まるので、
+    このどれも含まない見出しは規則が変わってもカテゴリが変わらない（再分類の候補から外せる）。
+    """
+    old, new = _keyword_ranks(old_rules), _keyword_ranks(new_rules)
+    return {kw for kw in old.keys() | new.keys() if old.get(kw) != new.get(kw)}
+
 def categorize_title(title: str) -> str: # 引数：title（文字列型）→ 分類対象になるニュースの見出しやタイトル。戻り値：文字列（カテゴリ名、例：「政治」「経済」など）
     # タイトルの小文字化
-    title = title.lower() # タイトル全体を小文字に変換します。こうすることで、大文字・小文字の違いを気にせず比較できるようになります。
-
-    # カテゴリ辞書の定義
-    categories = {
-       "政治": ['政府', '首相', '内閣', '大臣', '選挙', '国会', '官邸', '政党', '議員', '政治家'],
-        "経済": ['経済', '景気', 'gdp', 'インフレ', '円安', '金利', '財政', '物価', 'デフレ'],
-        "ビジネス": ['企業', '経営', '人事', '株価', '市場', '決算', '合併', '業績', '商社', '上場', '経営者', '会計', '新規事業'],
-        "金融・マネー": ['投資', '銀行', '税金', '確定申告', 'fx', 'クレカ', '預金', '為替', '資産運用', '金融庁', '口座', '証券'],
-        "国際": ['外交', '米国', 'アメリカ', '中国', 'ロシア', '国連', '戦争', 'ウクライナ', '北朝鮮', '台湾', '欧州', 'asean', '大使館'],
-        "気象・災害": ['台風', '地震', '津波', '噴火', '豪雨', '気象庁', '気温', '落雷', '猛暑', '雪崩', '警報', '浸水', '洪水'],
-        "地域・地方": ['自治体', '地方', '地域', '町おこし', '移住', '観光地', 'ふるさと', '道の駅', '都道府県', '県庁'],
-        "暮らし": ['生活', '保険', '年金', '節約', '子育て', '買い物', '家庭', '衣食住', '家事', 'ガス代', '電気代', 'ライフスタイル'],
-        "医療・健康": ['医療', '健康', '病院', 'ワクチン', '感染症', 'コロナ', 'インフルエンザ', 'がん', '癌', '薬', '厚労省', '検診', '診察'],
-        "教育・受験": ['教育', '受験', '大学', '授業料', '学校', '学生', '入試', '文科省', '教科書', '学力', '塾', '試験'],
-        "社会": ['事件', '犯罪', '裁判', '逮捕', '警察', '覚醒剤', '暴行', '詐欺', '不正', '汚職', '検察', '拘束'],
-        "交通・事故": ['渋滞', '事故', '電車遅延', '人身事故', '通行止め', '運転', '高速道路', '脱線', '踏切', '鉄道', '新幹線', 'ダイヤ改正'],
-        "スポーツ": ['野球', 'サッカー', '大谷', 'w杯', '五輪', 'オリンピック', '試合', '日本代表', 'プロ野球', 'jリーグ', '選手', '得点'],
-        "エンタメ": ['芸能', 'ドラマ', '映画', 'アイドル', '歌手', 'テレビ', '舞台', 'ジャニーズ', '俳優', 'アニメ', '紅白', '放送'],
-        "科学・文化": ['宇宙', '科学', '技術', '発見', '研究', '博物館', '文化財', '展覧会', '遺跡', '美術', 'ノーベル賞'],
-        "テクノロジー": ['ai', 'iot', 'チップ', 'robot', '量子コンピューター', 'ドローン', '半導体', '自動運転'],
-        "IT・インターネット": ['sns', 'ネット', 'youtube', 'x（旧twitter）', 'x (旧twitter)', 'アプリ', 'ログイン', '炎上', 'サブスク', 'line', 'it企業'],
-        "AI・生成AI": ['openai', 'chatgpt', 'gemini', 'claude', '生成ai', '大規模言語モデル', 'llm'],
-        "セキュリティ・犯罪": ['ハッキング', '情報漏洩', 'サイバー攻撃', 'マルウェア', '不正アクセス', 'ウイルス'],
-        "労働・雇用": ['雇用', '解雇', '転職', '労働環境', 'ブラック企業', '労基署', '失業'],
-        "食・グルメ": ['レシピ', '食材', '飲食店', 'グルメ', '調味料', '料理', 'お菓子', '外食'],
-        "ペット・動物": ['犬', '猫', '動物園', 'ペット', '野生動物', '保護犬', 'ペットショップ'],
-        "旅行・観光": ['観光', '旅行', 'ツアー', '温泉', '名所', 'ホテル', '宿泊', '航空券']
-    }
+    title = (title or "").lower() # タイトル全体を小文字に変換します。こうすることで、大文字・小文字の違いを気にせず比較できるようになります。
 
     # 分類ロジック
-    for category, keywords in categories.items(): # categories.items()カテゴリ辞書を (カテゴリ名, キーワードリスト) のペアとして順番に取り出します。
-        if any(kw.lower() in title for kw in keywords): # そのカテゴリのキーワードリストの中に、1つでもタイトルに含まれているものがあれば True。
+    for category, pattern in _MATCHERS: # カテゴリ辞書の順番に (カテゴリ名, コンパイル済みパターン) を取り出します。
+        if pattern.search(title): # そのカテゴリのキーワードが1つでもタイトルに含まれていれば一致。
             return category # 最初に一致したカテゴリを即座に返します
 
     # どれにも当てはまらない場合
-    return "その他"
+    return OTHER
+
+def categorize_titles(titles) -> list:
+    """複数のタイトルをまとめて分類する（戻り値は titles と同じ順のカテゴリ名のリスト）"""
+    matchers = _MATCHERS # ループ内でグローバル参照を繰り返さない
+    out = []
+    for title in titles:
+        title = (title or "").lower()
+        for category, pattern in matchers:
+            if pattern.search(title):
+                out.append(category)
+                break
+        else:
+            out.append(OTHER)
+    return out
@@ -0,0 +1,125 @@
+# 近似重複（同じ出来事を別ソースが報じた記事）の検出
+# タイトル＋本文の冒頭を正規化して文字 3-gram の集合にし、MinHash（64個の最小ハッシュ）で指紋を作る。
+# 推定 Jaccard 係数が DUP_THRESHOLD 以上なら同じ記事とみなす（要約を使い回して LLM を呼ばない）。
+# ただし、タイトルに出てくる数字（株価・件数・日付など）がそろわない組は同じ記事にしない
+# （「日経平均は反発 終値3万9000円台」と「…反落 終値3万8000円台」は文字の重なりが 0.6 あっても別の日の別の記事）。
+# 本文が取れなかった記事は照合しない（タイトルだけの指紋は、言い回しの決まった定型記事どうしで簡単に重なる）。
+# 以前に本文なしで保存された指紋は、TITLE_ONLY_THRESHOLD（ほぼ同じタイトル）以上のときだけ一致とする。
+# 探索は指紋を BANDS 個の帯に分けた LSH 索引で行い、どれかの帯が一致した候補だけ Jaccard を確かめる。
+# ※ SimHash は数百文字の記事だと言い換え1つで10ビット以上動くため、短いニュース本文向きの MinHash を使う。
+import os # os：しきい値の環境変数
+import re # re：正規化（記号・空白の除去）
+import random # random：ハッシュ関数の係数（シード固定で毎回同じもの）
+import hashlib # hashlib：3-gram → 64bit ハッシュ
+import threading # threading：回避件数の集計を守るロック
+import unicodedata # unicodedata：全角/半角をそろえる（NFKC）
+from collections import defaultdict
+
+NUM_PERM = 64 # 最小ハッシュの個数（指紋は 32bit × 64 = 16進512文字）
+BANDS = 32 # LSH の帯の数（1帯 = 2個。Jaccard 0.4 の組でも 99% 以上が候補に上がる）
+DUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.4")) # 推定 Jaccard がこれ以上なら重複（媒体ごとの言い換えで 0.3〜0.5 程度になる）
+TITLE_ONLY_THRESHOLD = float(os.getenv("DEDUP_TITLE_ONLY_THRESHOLD", "0.9")) # 片方がタイトルだけの指紋のときのしきい値
+DEDUP_DAYS = int(os.getenv("DEDUP_DAYS", "3")) # DB から照合相手として読む日数
+BODY_CHARS = 600 # 指紋に使う本文の長さ（冒頭はどの媒体でもリードで、出来事の中身が一番そろう）
+MIN_CHARS = 20 # 正規化後にこれより短いテキストは指紋を作らない（短い見出しだけだと誤判定しやすい）
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)] # 係数を変えると保存済みの指紋と比べられなくなる
+
+_STRIP = re.compile(r"[\W_]+", re.UNICODE) # 記号・空白・句読点
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*") # 3万9000 → '3', '9000'（NFKC 後なので全角数字も含む）
+
+def normalize_text(text: str) -> str:
+    """NFKC ＋ 小文字化 ＋ 記号・空白の除去"""
+    return _STRIP.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+def numbers(text: str) -> frozenset:
+    """タイトルに出てくる数字の集合（区切りのカンマは除く）。数字が違えば別の出来事とみなす"""
+    return frozenset(n.replace(",", "") for n in _NUMBER.findall(unicodedata.normalize("NFKC", text or "")))
+
+def shingles(text: str, n: int = 3) -> set:
+    """文字 n-gram の集合（日本語は分かち書きしないので文字単位）"""
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def minhash(text: str):
+    """MinHash 署名（NUM_PERM 個の int）。正規化後 MIN_CHARS 未満なら None"""
+    norm = normalize_text(text)
+    if len(norm) < MIN_CHARS:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big") for g in shingles(norm)]
+    return [min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMS]
+
+def fingerprint(title: str, body: str = ""):
+    """記事の指紋（タイトル＋本文冒頭の MinHash）。DB には16進512文字で保存する"""
+    sig = minhash(f"{title}\n{(body or '')[:BODY_CHARS]}")
+    return None if sig is None else "".join(f"{v:08x}" for v in sig)
+
+def _decode(fp: str):
+    return [int(fp[i:i + 8], 16) for i in range(0, len(fp), 8)]
+
+def similarity(a, b) -> float:
+    """2つの署名から推定した Jaccard 係数"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+def _bands(sig):
+    rows = NUM_PERM // BANDS
+    return [(i, tuple(sig[i * rows:(i + 1) * rows])) for i in range(BANDS)]
+
+class MinHashIndex:
+    """
+    使い方:
+        index = MinHashIndex()
+        index.add(fingerprint(title, body), payload, title)
+        index.find(fingerprint(title2, body2), title2)  # -> 最も似ている payload（推定 Jaccard が threshold 以上・数字が同じ）or None
+    title_only=True は本文なしで作った指紋（しきい値を TITLE_ONLY_THRESHOLD まで上げる）。
+    """
+    def __init__(self, threshold: float = DUP_THRESHOLD, title_only_threshold: float = TITLE_ONLY_THRESHOLD):
+        self.threshold = threshold
+        self.title_only_threshold = max(threshold, title_only_threshold)
+        self._sigs = [] # [(署名, タイトルの数字, title_only, payload), ...]
+        self._buckets = defaultdict(list) # (帯番号, 帯の値) -> [_sigs の添字, ...]
+
+    def add(self, fp: str, payload, title: str = "", title_only: bool = False):
+        sig = _decode(fp)
+        if len(sig) != NUM_PERM: # 形式の違う指紋（設定変更前のものなど）は比べない
+            return
+        self._sigs.append((sig, numbers(title), title_only, payload))
+        for band in _bands(sig):
+            self._buckets[band].append(len(self._sigs) - 1)
+
+    def find(self, fp: str, title: str = "", title_only: bool = False):
+        if not fp:
+            return None
+        sig = _decode(fp)
+        nums = numbers(title)
+        candidates = {i for band in _bands(sig) for i in self._buckets.get(band, ())}
+        best, best_sim = None, 0.0
+        for i in sorted(candidates): # 同点なら先に登録したもの
+            other, other_nums, other_title_only, payload = self._sigs[i]
+            if other_nums != nums:
+                continue
+            threshold = self.title_only_threshold if (title_only or other_title_only) else self.threshold
+            sim = similarity(sig, other)
+            if sim >= threshold and sim > best_sim:
+                best, best_sim = payload, sim
+        return best
+
+# 何件の要約（LLM 呼び出し）を近似重複で省けたかの集計
+_stats = {"checked": 0, "avoided": 0}
+_stats_lock = threading.Lock()
+
+def record(checked: int, avoided: int):
+    with _stats_lock:
+        _stats["checked"] += checked
+        _stats["avoided"] += avoided
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+def report() -> str:
+    st = get_stats()
+    return f"🧬 近似重複: 照合={st['checked']} 要約を再利用={st['avoided']}（LLM呼び出しを回避）"
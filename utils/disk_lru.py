@@ -0,0 +1,90 @@
+# メモリ上の LRU ＋ SQLite ファイルを裏に持つ、プロセスをまたいで残るキー・バリューキャッシュ
+# 値は文字列（JSON など）で保存する。複数スレッドから同時に使ってもよい。
+import os # os：保存先ディレクトリの作成
+import time # time：最終利用時刻（ディスク側の LRU 判定用）
+import sqlite3 # sqlite3：標準ライブラリだけで使えるディスク保存先
+import threading # threading：接続とメモリ側 LRU を守るロック
+from collections import OrderedDict # OrderedDict：メモリ側の LRU（最近使ったものを末尾へ）
+
+class DiskLRU:
+    """
+    使い方:
+        store = DiskLRU("path/to/file.sqlite3", max_entries=50000)
+        store.put("key", "value")
+        store.get("key")  # -> "value" / None
+    max_entries を超えたら、最後に使われたのが古いものから消す。
+    """
+    def __init__(self, path: str, max_entries: int = 50000, memory_entries: int = 2000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False) # 1本の接続をロック付きで共有
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, used_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_kv_used_at ON kv (used_at)")
+        self._db.commit()
+        self._writes = 0
+
+    def _remember(self, key, value):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                value = self._mem[key]
+            else:
+                row = self._db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                value = row[0]
+                self._remember(key, value)
+            self._db.execute("UPDATE kv SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, used_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._db.commit()
+            self._writes += 1
+            if self._writes % 500 == 0: # 書き込みのたびに数えるのは重いので、ときどき上限を確認する
+                self._evict_locked()
+
+    def delete(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._mem.pop(key, None)
+            self._db.executemany("DELETE FROM kv WHERE key = ?", [(k,) for k in keys])
+            self._db.commit()
+
+    def _evict_locked(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM kv").fetchone()
+        over = count - self.max_entries
+        if over > 0:
+            self._db.execute(
+                "DELETE FROM kv WHERE key IN (SELECT key FROM kv ORDER BY used_at LIMIT ?)", (over,)
+            )
+            self._db.commit()
+            self._mem.clear() # 消したものがメモリ側に残らないように作り直す
+        return max(over, 0)
+
+    def evict(self):
+        """上限を超えた分を古い順に消して、消した件数を返す"""
+        with self._lock:
+            return self._evict_locked()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
@@ -1,39 +1,194 @@
 # URLから本文テキストを安全に抜き出す
+# 1つのURLは1回だけダウンロードし、trafilatura と BeautifulSoup の両方を同じHTMLに当てる。
+# 複数URLは keep-alive の共有セッション上で並行取得する（ホストごとの同時接続数と、1リクエストあたりの期限付き）。
+# 取得結果は utils.body_cache にも保存し、次回以降はネットワークに行かずに再利用する。
+import re # re：行ごとの空白の整理
+import time # time：1リクエストあたりの期限（deadline）の判定
+import threading # threading：ホストごとの同時接続数を制限するセマフォ・共有セッションの生成を守るロック
+from urllib.parse import urlsplit # urlsplit：URLからホスト名を取り出す
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor # 複数記事を並行に取得する
 import trafilatura # trafilatura: HTML から本文抽出に強いライブラリ（見出し/本文/不要要素の切り分けが賢い）。
 import requests # requests: HTTP取得。
+from requests.adapters import HTTPAdapter # HTTPAdapter：接続プール（keep-alive）の大きさを指定する
+from requests.compat import chardet # chardet（実体は charset_normalizer）：本文のバイト列から文字コードを推定する
 from bs4 import BeautifulSoup # BeautifulSoup: HTML構文木を作り、要素抽出用。
+from utils.body_cache import get_body_cache # 本文のディスクキャッシュ
 
-# URL を受け取り、本文テキスト（失敗時は空文字）を返す関数。
-def fetch_article_body(url: str) -> str:
+USER_AGENT = "Mozilla/5.0"
+MAX_WORKERS = 8 # 全体の同時取得数
+PER_HOST_LIMIT = 4 # 同じホストへの同時接続数（相手サイトに負荷をかけすぎない）
+CONNECT_TIMEOUT = 5 # 接続までの上限（秒）
+DEADLINE = 15 # 1リクエストあたりの上限（接続〜本文の受信完了まで、秒）
+MAX_BYTES = 3 * 1024 * 1024 # これより大きいページは先頭だけ使う
+REVALIDATE_AFTER = 24 * 3600 # キャッシュがこれより新しければネットワークに問い合わせずに使う（秒）
+RETRY_EMPTY_AFTER = 3600 # 本文が取れなかった（空の）エントリは、これを過ぎたら取り直す（秒。失敗を1日中使い回さない）
+
+_session = None
+_session_lock = threading.Lock()
+_host_semaphores = {} # {ホスト名: BoundedSemaphore}
+_host_lock = threading.Lock()
+
+def get_session():
+    """keep-alive の共有 Session をシングルトンで保持（同じホストへの接続を使い回す）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update({"User-Agent": USER_AGENT})
+            _session = s
+    return _session
+
+def _host_semaphore(url: str):
+    host = urlsplit(url).netloc.lower()
+    with _host_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_semaphores[host]
+
+def _decode(raw: bytes, declared: str) -> str:
+    """ヘッダの charset を優先し、無ければ（または requests の既定値 ISO-8859-1 なら）中身から推定して文字列にする"""
+    encoding = declared
+    if not encoding or encoding.lower() == "iso-8859-1":
+        encoding = chardet.detect(raw).get("encoding") or "utf-8" # 日本語サイトでも文字化けしにくいように中身から推定
+    return raw.decode(encoding, errors="replace")
+
+def _download(url: str, deadline: float = DEADLINE, etag=None, last_modified=None):
+    """
+    URL を1回だけダウンロードする。
+    ホストごとの同時接続数を守り、deadline 秒を超えたら TimeoutError。
+    etag / last_modified を渡すと条件付きリクエストになり、変更が無ければ (None, etag, last_modified) を返す。
+    戻り値: (HTML文字列, ETag, Last-Modified)
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    with _host_semaphore(url):
+        start = time.monotonic()
+        with get_session().get(url, timeout=(CONNECT_TIMEOUT, deadline), stream=True, headers=headers) as res:
+            if res.status_code == 304: # 前回から変わっていない
+                return None, etag, last_modified
+            res.raise_for_status()
+            chunks, size = [], 0
+            for chunk in res.iter_content(64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if time.monotonic() - start > deadline: # 少しずつ送ってくる遅いサーバーでも期限で打ち切る
+                    raise TimeoutError(f"deadline {deadline}s exceeded")
+                if size >= MAX_BYTES:
+                    break
+            html = _decode(b"".join(chunks), res.encoding)
+            return html, res.headers.get("ETag"), res.headers.get("Last-Modified")
+
+def download_html(url: str, deadline: float = DEADLINE) -> str:
+    """URL を1回だけダウンロードして HTML 文字列を返す（キャッシュは使わない）"""
+    return _download(url, deadline)[0]
+
+# 段落の境目になる要素（この前後だけ改行を入れる。<a> <strong> <span> などの行内要素ではつながったまま）
+BLOCK_TAGS = (
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "div", "br", "section", "article", "header", "footer", "aside", "nav",
+    "blockquote", "pre", "ul", "ol", "dl", "dt", "dd", "table", "tr", "figcaption",
+)
+
+_BREAK = "\x00" # 段落の区切りの目印（HTML ソース内の改行と区別するため、空白ではない文字）
+
+def block_text(el) -> str:
+    """
+    要素のテキストを、ブロック要素ごとに1行で返す。
+    get_text("\n") だと行内のタグ（<a>日銀</a> など）の前後でも改行され、短い断片が定型文として落とされるため。
+    """
+    for tag in el.find_all(BLOCK_TAGS):
+        tag.insert_before(_BREAK)
+        tag.insert_after(_BREAK)
+    lines = (re.sub(r"\s+", " ", line).strip() for line in el.get_text("").split(_BREAK)) # HTML ソース内の改行・連続空白は1つの空白に
+    return "\n".join(line for line in lines if line)
+
+def extract_body(html: str, url: str = "") -> str:
+    """取得済みの HTML から本文テキストを抜き出す（失敗時は空文字）。ネットワークには触れない。"""
+    if not html:
+        return ""
     try:
-        # trafilatura の fetch_url でHTMLを取得。
-        downloaded = trafilatura.fetch_url(url)
-        if downloaded: # 取得できたら extract で本文抽出。
-            text = trafilatura.extract(
-                downloaded,
-                include_comments=False, # include_comments=False：コメント欄などを除外。
-                include_tables=False # include_tables=False：表はノイズになりやすいので除外。
-            )
-            if text and len(text.strip()) > 80: # 抽出テキストの 長さが80文字超 なら本文とみなして返す。
-                return text.strip()
+        text = trafilatura.extract(
+            html,
+            url=url or None,
+            include_comments=False, # include_comments=False：コメント欄などを除外。
+            include_tables=False # include_tables=False：表はノイズになりやすいので除外。
+        )
+        if text and len(text.strip()) > 80: # 抽出テキストの 長さが80文字超 なら本文とみなして返す。
+            return text.strip()
     except Exception as e: # trafilatura 側の例外はログを出して握りつぶす（アプリが落ちないようにするため）。
         print(f"[trafilatura ERROR] {url} :: {e}")
 
-    # BeautifulSoup フォールバック
+    # BeautifulSoup フォールバック（同じ HTML を使う。再ダウンロードはしない）
     try:
-        res = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"}) # requests で再取得。ここでは timeout を明示（10秒）。
-        res.encoding = res.apparent_encoding # apparent_encoding でレスポンスの実体に合わせたエンコーディングを設定（日本語サイトでも文字化け回避しやすい）。
         # よく本文が入る 代表的なセレクタ を順に試す。
-        soup = BeautifulSoup(res.text, "html.parser")
+        soup = BeautifulSoup(html, "html.parser")
         for sel in ["article", "main", "[role=main]", ".articleBody", ".article", "#main"]: # article, main, role=main はHTML5の意味論的タグ/ロール。.articleBody や .article、#main はニュースサイトで頻繁に使われるクラス/ID。
             el = soup.select_one(sel)
             if el:
-                txt = el.get_text(" ", strip=True) # get_text(" ", strip=True) はテキストの抽出時に余計な空白をトリム、ブロック間をスペースで連結して読みやすくする（改行が消えても語がくっつかない）。
+                txt = block_text(el) # ブロック要素の間だけ改行で連結する（段落の境目が残るので、要約前に定型文の行だけ落とせる）。
                 if txt and len(txt) > 80: # ここでも 80文字超 なら本文として採用。
                     return txt
         # セレクタで取れないサイト向けの最後の手段。
-        txt = soup.get_text(" ", strip=True)
+        txt = block_text(soup)
         return txt if len(txt) > 120 else "" # ページ全体のテキストを拾って 120文字超 なら返す（全体だとナビやメニュー文言が混じりやすいので、しきい値を少し高めに設定）。
-    except Exception as e: # ネットワーク/解析エラーでも落とさず空文字を返す。
-        print(f"[requests ERROR] {url} :: {e}")
+    except Exception as e: # 解析エラーでも落とさず空文字を返す。
+        print(f"[bs4 ERROR] {url} :: {e}")
+        return ""
+
+# URL を受け取り、本文テキスト（失敗時は空文字）を返す関数。
+# offline=True：ネットワークに一切触れず、キャッシュにあるものだけ返す（再実行・要約のやり直し用）
+# reextract=True：キャッシュの生HTMLから本文を抽出し直す（抽出ロジックを変えたとき用。保存済みの行を直すのは db/replay_bodies.py）
+# 本文が空だったエントリ（抽出の失敗）は生HTMLを残しておくが、RETRY_EMPTY_AFTER を過ぎたら取り直す。
+def fetch_article_body(url: str, offline: bool = False, reextract: bool = False) -> str:
+    cache = get_body_cache()
+    entry = cache.get(url)
+    if entry:
+        text = extract_body(entry["html"], url) if reextract else entry["text"]
+        if reextract and text != entry["text"]:
+            cache.put(url, entry["html"], text, entry.get("etag"), entry.get("last_modified"), entry["fetched_at"])
+        fresh_for = REVALIDATE_AFTER if text else RETRY_EMPTY_AFTER
+        if offline or time.time() - entry["fetched_at"] < fresh_for:
+            return text
+        # 古くなったキャッシュは条件付きリクエストで確認（変わっていなければダウンロードしない）
+        # 本文が空だったエントリは 304 で空のまま延命しないよう、条件を付けずに取り直す
+        validators = {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")} if text else {}
+        try:
+            html, etag, last_modified = _download(url, **validators)
+        except Exception as e: # 確認に失敗したら手元のキャッシュを使う
+            print(f"[requests WARN] {url} :: {e}（キャッシュを使用）")
+            return text
+        if html is None:
+            cache.touch(url)
+            return text
+    elif offline:
         return ""
+    else:
+        try:
+            html, etag, last_modified = _download(url)
+        except Exception as e: # ネットワークエラーでも落とさず空文字を返す。
+            print(f"[requests ERROR] {url} :: {e}")
+            return ""
+
+    text = extract_body(html, url)
+    cache.put(url, html, text, etag, last_modified)
+    return text
+
+def fetch_article_bodies(urls, max_workers: int = MAX_WORKERS, offline: bool = False, reextract: bool = False) -> dict:
+    """
+    複数URLの本文をまとめて並行取得する（キャッシュにあるものはネットワークに行かない）。
+    戻り値: {url: 本文テキスト（失敗時は空文字）}
+    """
+    unique = list(dict.fromkeys(u for u in urls if u)) # 同じURLは1回だけ取りに行く（順序は保つ）
+    if not unique:
+        return {}
+    fetch = partial(fetch_article_body, offline=offline, reextract=reextract)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique)), thread_name_prefix="extract") as pool:
+        bodies = dict(zip(unique, pool.map(fetch, unique)))
+    print(get_body_cache().report())
+    return bodies
@@ -0,0 +1,72 @@
+# 記事1件ぶんの描画結果（<li>…</li>）のメモリ上のキャッシュ（scripts/rebuild_archive.py で使う）
+# アーカイブを何日ぶんも続けて描くと、直近7日の記事は7日分のページに同じ形で載るので、描画済みの <li> を使い回す。
+# キーは (variant, 行の id)、値は「内容のキー + 描画済み HTML」。
+# 内容のキー = テンプレート（utils/html_templates.py）のハッシュ ＋ タイトル・URL・要約・キーワード・メモ・メモ種別・出典・日付・カテゴリ。
+# 内容のキーが変わった行は描き直して上書きする。
+# ※ ディスクには残さない。普段の cli run では1行が1つの variant で1回しか描かれず（アーカイブは最新版のハードリンク）、
+#   プロセスをまたいだキャッシュは SQLite の読み書きのぶん描画と変わらないか遅かったため。
+import operator # operator：列をまとめて読む attrgetter
+import threading # threading：ヒット数の集計を守るロック
+from collections import OrderedDict # OrderedDict：LRU（最近使ったものを末尾へ）
+from utils.html_templates import item_html, TEMPLATE_HASH
+
+MAX_ENTRIES = 20000 # 1か月ぶんのアーカイブ（数千件）が収まる程度
+
+_FIELDS = ("title", "url", "summary", "keywords", "comment", "comment_type", "source", "date", "category")
+_get_fields = operator.attrgetter(*_FIELDS) # DISPLAY_COLUMNS の Row ならこれ1回で全部取れる
+
+def content_key(h, variant: str) -> str:
+    """
+    描画結果を左右する値をつないだ文字列（どれかが変われば別物）。
+    ダイジェスト（sha1 など）にしないのは、日本語の UTF-8 変換＋ハッシュだけで <li> を描き直すのと同じくらい時間がかかるため。
+    値の中身をそのまま比べれば、衝突も無い。
+    """
+    try:
+        title, url, summary, keywords, comment, ctype, source, day, category = _get_fields(h)
+    except AttributeError: # 一部の列しか持たない行
+        title, url, summary, keywords, comment, ctype, source, day, category = (getattr(h, f, None) for f in _FIELDS)
+    return f"{TEMPLATE_HASH}\x1f{variant}\x1f{title}\x1f{url}\x1f{summary}\x1f{keywords}\x1f{comment}\x1f{ctype}\x1f{source}\x1f{day}\x1f{category}\x1e"
+
+class FragmentCache:
+    """
+    使い方:
+        cache = FragmentCache()
+        write_items(out, items, "daily", cache=cache)  # utils.html_templates.write_items
+    """
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # {f"{variant}:{id}": 内容のキー + HTML}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def render_items(self, items, variant="daily"):
+        """items を描画した <li> のリストを返す（items と同じ順）。無い・内容が変わったものだけ描画する"""
+        out = []
+        with self._lock:
+            for h in items:
+                if getattr(h, "id", None) is None: # id の無いもの（スナップショットからのフォールバック表示）はキャッシュしない
+                    out.append(item_html(h, variant))
+                    continue
+                key = f"{variant}:{h.id}"
+                sig = content_key(h, variant)
+                entry = self._entries.get(key)
+                if entry and entry.startswith(sig):
+                    self._entries.move_to_end(key)
+                    out.append(entry[len(sig):])
+                    self.hits += 1
+                    continue
+                html = item_html(h, variant)
+                self._entries[key] = sig + html
+                self._entries.move_to_end(key)
+                out.append(html)
+                self.misses += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return out
+
+    def report(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            rate = (self.hits / total * 100) if total else 0.0
+            return f"🧩 描画キャッシュ: hit={self.hits} miss={self.misses} ({rate:.0f}%)"
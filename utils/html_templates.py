@@ -0,0 +1,314 @@
+# HTML 生成の共通テンプレート（generate_html・build_html・履歴一覧のすべてがここを使う）
+# ・ページの枠（head / CSS / フッター）と記事1件ぶんのマークアップ（見出し・要約・キーワード・編集部メモ）はここだけに書く。
+# ・テンプレートは '{{name}}' を差し込み口にした文字列で、読み込み時に1回だけ「固定部分と差し込み口の並び」に分けておく（コンパイル）。
+#   描画はその並びを順に書き出すだけで、差し込む値は HTML エスケープする（'{{name|raw}}' はそのまま）。
+# ・出力は1つの巨大な文字列を作らず、open_pages() のライターへ順に書き出す（書き終えたら一時ファイルを置き換えるので、途中の状態は見えない）。
+import io # io：文字列への描画（render）
+import os # os：一時ファイルの置き換え・ディレクトリ作成
+import re # re：差し込み口の解析
+import shutil # shutil：ハードリンクできないときのコピー
+import hashlib # hashlib：テンプレートのハッシュ（描画結果のキャッシュ・ビルドの要否判定に使う）
+from collections import namedtuple
+from contextlib import contextmanager
+from html import escape as _escape
+
+with open(__file__, "rb") as _f:
+    TEMPLATE_HASH = hashlib.sha1(_f.read()).hexdigest()[:12] # このファイル（マークアップ・CSS）を変えると変わる
+
+def esc(value) -> str:
+    """HTML エスケープ（None は空文字。属性値にも使えるよう引用符もエスケープする）"""
+    return "" if value is None else _escape(str(value), quote=True)
+
+class Template:
+    """
+    使い方:
+        page = Template("<h1>{{title}}</h1>{{body|raw}}")
+        page.render_to(out, title="A&B", body="<p>..</p>")  # out.write(...) で順に書き出す
+        page.render(title="A&B", body="")                    # 文字列が欲しいとき
+    """
+    _FIELD = re.compile(r"\{\{\s*(\w+)\s*(\|\s*raw\s*)?\}\}")
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts = [] # [(固定部分, 差し込む名前 or None, エスケープしないか), ...]
+        pos = 0
+        for m in self._FIELD.finditer(source):
+            self._parts.append((source[pos:m.start()], m.group(1), bool(m.group(2))))
+            pos = m.end()
+        self._parts.append((source[pos:], None, False))
+
+    def render_to(self, out, **ctx):
+        write = out.write
+        for literal, name, raw in self._parts:
+            if literal:
+                write(literal)
+            if name is not None:
+                value = ctx[name]
+                write(str(value) if raw else esc(value))
+
+    def render(self, **ctx) -> str:
+        buf = io.StringIO()
+        self.render_to(buf, **ctx)
+        return buf.getvalue()
+
+class _Tee:
+    """複数のファイルへ同じ内容を書く（最新版とアーカイブを1回の描画で書くため）"""
+    def __init__(self, files):
+        self._files = files
+
+    def write(self, s: str):
+        for f in self._files:
+            f.write(s)
+
+@contextmanager
+def open_pages(*paths):
+    """
+    with open_pages(main_path, archive_path) as out:
+        out.write("...")
+    すべてのパスへ同じ内容を書く。各ファイルは「.tmp に書いて、最後に置き換え」なので、書き込み中に読まれても壊れた HTML は見えない。
+    例外で抜けたときは一時ファイルを消し、元のファイルはそのまま残す。
+    """
+    files, tmps = [], []
+    try:
+        for path in paths:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = f"{path}.tmp"
+            tmps.append(tmp)
+            files.append(open(tmp, "w", encoding="utf-8", buffering=1 << 16))
+        yield _Tee(files)
+        for f in files:
+            f.close()
+        for tmp, path in zip(tmps, paths):
+            os.replace(tmp, path)
+    except BaseException:
+        for f in files:
+            f.close()
+        for tmp in tmps:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+
+def link_page(src, dst):
+    """
+    dst を src と同じ中身にする（同じバイト列をもう一度書かない）。ハードリンクにできなければコピー。
+    src は次回 open_pages() で「置き換え」られる（別のファイルになる）ので、dst の中身は今回のまま残る。
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    tmp = f"{dst}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError: # 別のファイルシステム・ハードリンク非対応
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+# —— 記事1件ぶん ——
+
+Link = namedtuple("Link", "title url") # 要約などを持たない見出しだけの記事（スナップショットからのフォールバック表示用）
+
+COMMENT_LABELS = {"insight": "示唆", "caution": "注意", "impact": "影響"} # insight：中立・気づき、caution：危険・警告、impact：社会的に重要
+
+def remove_leading_number(text):
+    """番号付きの見出しから番号を除く（"1○○" → "○○"）"""
+    if isinstance(text, str) and text[:1].isdigit():
+        return text[1:]
+    return text
+
+def keyword_tags(csv) -> str:
+    """'台風, 災害' → '#台風 #災害'（空要素は除く）"""
+    tags = [k.strip() for k in (csv or "").split(",") if k.strip()]
+    return "#" + " #".join(tags) if tags else ""
+
+def item_html(h, variant="daily") -> str:
+    """
+    記事1件の <li>…</li>。h は title / url を持つもの（DB の Row・Link など。summary 等は無くてもよい）。
+    variant:
+      "daily"  … 今日のニュース（generate_html）：見出しの番号を除く
+      "report" … カテゴリ別一覧（build_html）：見出しを太字にし、末尾に出典と日付
+    要約・キーワード・編集部メモ（comment_type に応じたバッジ付き）は、どちらも <li> の中に入れる。
+    """
+    title = h.title or ""
+    if variant == "daily":
+        title = remove_leading_number(title)
+        parts = [f'<li><a href="{esc(h.url)}" target="_blank" rel="noopener">{esc(title)}</a>']
+    else:
+        parts = [f'<li><a class="title" href="{esc(h.url)}" target="_blank" rel="noopener">{esc(title)}</a>']
+    summary = getattr(h, "summary", None)
+    if summary:
+        parts.append(f'<div class="summary">{esc(summary)}</div>')
+    tags = keyword_tags(getattr(h, "keywords", None))
+    if tags:
+        parts.append(f'<div class="keywords">{esc(tags)}</div>')
+    comment = getattr(h, "comment", None)
+    if comment:
+        ctype = (getattr(h, "comment_type", "") or "").lower()
+        if ctype not in COMMENT_LABELS:
+            ctype = "insight"
+        parts.append(f'<div class="memo"><span class="badge badge-{ctype}">{COMMENT_LABELS[ctype]}</span>{esc(comment)}</div>')
+    if variant == "report":
+        parts.append(f'<div class="source">{esc(getattr(h, "source", ""))} / {esc(getattr(h, "date", ""))}</div>')
+    parts.append("</li>\n")
+    return "".join(parts)
+
+def write_items(out, items, variant="daily", cache=None):
+    """記事を順に書き出す。cache（utils.fragment_cache.FragmentCache）を渡すと、描画済みの <li> を使い回す"""
+    if cache is not None:
+        out.write("".join(cache.render_items(items, variant)))
+        return
+    for h in items:
+        out.write(item_html(h, variant))
+
+# —— 共通の CSS（記事の要約・キーワード・メモ・バッジ）——
+
+ITEM_CSS_LIGHT = """
+        .summary{ margin:6px 0 2px; font-size:0.95rem; color:#222; }
+        .keywords{ font-size:0.85rem; color:#666; }
+        .memo{ margin-top:6px; font-size:0.9rem; color:#2b2b2b; background:#f7f9fc; border:1px solid #e6ecf5; padding:8px 10px; border-radius:8px; }
+        .badge{ display:inline-block; font-size:0.7rem; padding:2px 6px; border-radius:999px; margin-right:6px; vertical-align:1px; }
+        .badge-insight{ background:#e8f5e9; color:#1b5e20; }
+        .badge-caution{ background:#fff3e0; color:#e65100; }
+        .badge-impact{ background:#e3f2fd; color:#0d47a1; }"""
+
+ITEM_CSS_DARK = """
+  .summary{margin:6px 0 2px 0;font-size:14px;opacity:.95}
+  .keywords{font-size:12px;opacity:.75}
+  .memo{margin-top:6px;font-size:14px;background:#141824;border:1px solid #202437;padding:8px 10px;border-radius:8px}
+  .badge{display:inline-block;font-size:11px;padding:1px 6px;border-radius:999px;margin-right:6px;vertical-align:1px}
+  .badge-insight{background:#103b28;color:#8ee6b6}
+  .badge-caution{background:#3d2c12;color:#f6c38b}
+  .badge-impact{background:#10263f;color:#9ecbff}"""
+
+# —— 今日のニュース（scraper/generate_html.py）——
+
+DAILY_HEAD = Template("""<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>今日のニュース（{{date_str}}）</title>
+    <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+JP:wght@400;700&display=swap" rel="stylesheet">
+    <style>
+        body {
+            font-family: 'Noto Sans JP', sans-serif;
+            margin: 0;
+            padding: 2rem 1rem;
+            background-color: #f0f2f5;
+            color: #333;
+        }
+        .container {
+            max-width: 720px;
+            margin: auto;
+            background: #fff;
+            padding: 2rem;
+            border-radius: 12px;
+            box-shadow: 0 4px 12px rgba(0,0,0,0.05);
+        }
+        h1 {
+            font-size: 1.8rem;
+            margin-bottom: 0.5rem;
+            color: #111;
+        }
+        .date {
+            font-size: 0.9rem;
+            color: #888;
+            margin-bottom: 1.5rem;
+        }
+        ol {
+            padding-left: 1.2rem;
+        }
+        li {
+            margin-bottom: 1rem;
+            line-height: 1.6;
+        }
+        a {
+            color: #007acc;
+            text-decoration: none;
+            font-weight: bold;
+        }
+        a:hover {
+            text-decoration: underline;
+        }
+        footer {
+            margin-top: 3rem;
+            font-size: 0.85rem;
+            text-align: center;
+            color: #aaa;
+        }""" + ITEM_CSS_LIGHT + """
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>📰 今日の主要ニュース（{{date_str}}）</h1>
+        <p class="date">発行日時：{{now_str}}</p>
+""")
+DAILY_SECTION = Template("<h2>{{source}}</h2>\n<ol>\n")
+DAILY_SECTION_END = "</ol>\n"
+DAILY_FOOT = """    </div>
+    <footer>提供：まいにゅ〜</footer>
+</body>
+</html>"""
+
+# —— カテゴリ別一覧（scripts/build_html.py）——
+
+REPORT_HEAD = Template("""<!doctype html>
+<html lang="ja">
+<head>
+  <meta charset="utf-8">
+  <title>毎朝ニュースレポート</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <style>
+  body{font-family:system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial,"Noto Sans JP","Hiragino Kaku Gothic ProN","Yu Gothic",sans-serif;line-height:1.6;margin:24px;background:#0b0b0f;color:#e9e9ee}
+  a{color:#9ecbff;text-decoration:none}
+  a:hover{text-decoration:underline}
+  .wrap{max-width:980px;margin:0 auto}
+  h1{font-size:24px;margin-bottom:8px}
+  .meta{opacity:.7;font-size:12px;margin-bottom:24px}
+  .cat{display:inline-block;padding:2px 8px;border-radius:999px;background:#1b1b25;font-size:12px;margin-left:8px}
+  ul{list-style:none;padding:0;margin:0}
+  li{padding:14px 0;border-bottom:1px solid #222}
+  .title{font-weight:600}
+  .source{opacity:.8;font-size:12px}""" + ITEM_CSS_DARK + """
+  </style>
+</head>
+<body><div class="wrap">
+<h1>毎朝ニュースレポート</h1>
+<div class="meta">{{today}} 生成</div>
+""")
+REPORT_SECTION = Template("<h2>{{category}} <span class='cat'>{{count}}件</span></h2>\n<ul>\n")
+REPORT_SECTION_END = "</ul>\n"
+REPORT_FOOT = """
+</div></body></html>
+"""
+
+# —— 過去のニュース一覧（scraper/generate_history_index.py）——
+# history/index.html … 月ごとのページへのリンクだけ（何年分たまっても月の数だけ）
+# history/months/YYYY-MM.html … その月の日付ごとのレポートへのリンク
+
+HISTORY_HEAD = Template("""<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <title>{{title}}</title>
+    <style>
+        body { font-family: sans-serif; padding: 2rem; max-width: 800px; margin: auto; }
+        h1 { font-size: 1.6rem; }
+        ul { padding-left: 1.2rem; }
+        li { margin: 0.5rem 0; }
+        a { text-decoration: none; color: #0066cc; }
+        a:hover { text-decoration: underline; }
+        .count { color: #999; font-size: 0.85rem; }
+        footer { margin-top: 3rem; font-size: 0.8rem; color: #999; }
+    </style>
+</head>
+<body>
+    <h1>🗂 {{title}}</h1>
+""")
+HISTORY_NAV = Template('    <p><a href="{{href}}">{{label}}</a></p>\n')
+HISTORY_LIST = "    <ul>\n"
+HISTORY_ITEM = Template('        <li><a href="{{href}}">{{label}}</a></li>\n')
+HISTORY_MONTH_ITEM = Template('        <li><a href="{{href}}">{{label}}</a> <span class="count">（{{count}}件）</span></li>\n')
+HISTORY_LIST_END = "    </ul>\n"
+HISTORY_FOOT = """    <footer>提供：まいにゅ〜</footer>
+</body>
+</html>"""
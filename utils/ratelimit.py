@@ -0,0 +1,42 @@
+# API のレート制限（1分あたりのリクエスト数 RPM / トークン数 TPM）を守るためのトークンバケット
+# 複数スレッドから同時に acquire() されても、合計で上限を超えないように待たせる。
+import time # time：バケットの補充量の計算・待機
+import threading # threading：複数スレッドからの同時アクセスを守るロック
+
+class TokenBucket:
+    """
+    1分あたり rate_per_minute だけ補充されるバケット（最大 capacity まで溜まる）。
+    acquire(n) は n 個取り出せるようになるまで待つ。
+    """
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0 # 1秒あたりの補充量
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity) # 1回で上限を超える要求は上限ぶんだけ待てば通す（永遠に待たないように）
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """RPM と TPM の2つのバケットをまとめたもの。1リクエストごとに acquire(見積もりトークン数) を呼ぶ。"""
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
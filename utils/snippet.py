@@ -0,0 +1,86 @@
+# 要約に渡す本文スニペットを「トークン数の予算」で切り出す
+# 文字数で先頭 N 文字を切ると、日本語と英語でトークン数が大きく違い、ナビやシェアボタンの文言まで混じる。
+# ここでは段落ごとに見て、定型文（著作権表示・関連記事・SNS 共有など）を落とし、リードから順に予算まで詰める。
+import os # os：予算の環境変数
+import re # re：定型文の判定・段落分割
+
+try:
+    import tiktoken # あれば実際のトークナイザで数える。無ければ文字種からの見積もりで代用
+except ImportError:
+    tiktoken = None
+
+SNIPPET_TOKENS = int(os.getenv("SNIPPET_TOKENS", "1200")) # 1記事あたりの本文トークン予算
+MIN_PARAGRAPH_CHARS = 15 # これより短い行はメニュー・ボタン文言とみなす（句点で終わる文は残す）
+
+# ナビゲーション・広告・共有ボタンなど、本文ではない行によく出る文言
+BOILERPLATE = re.compile(
+    r"(©|無断転載|著作権|関連記事|関連ニュース|おすすめ記事|人気記事|ランキング|"
+    r"シェア|ツイート|ブックマーク|フォローする|会員登録|ログイン|有料会員|続きを読む|この記事を読む|"
+    r"ページの先頭|トップへ戻る|広告|\bPR\b|"
+    r"(?i:\b(?:copyright|all rights reserved|cookies?|javascript|share this|follow us|sign in|subscribe|read more|advertisement)\b))"
+)
+SENTENCE_END = ("。", "」", "．", ".", "!", "?", "！", "？")
+
+_encoding = None
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base") # gpt-4o / gpt-4.1 系のトークナイザ
+        except Exception:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """トークン数（tiktoken が無ければ、全角は1文字≒1トークン・半角は4文字≒1トークンで見積もる）"""
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+    wide = sum(1 for ch in text if ord(ch) > 0x2E7F) # CJK・かな・全角記号
+    return wide + (len(text) - wide + 3) // 4
+
+def _truncate(text: str, budget: int) -> str:
+    """text を budget トークン以内に切る"""
+    enc = _get_encoding()
+    if enc is not None:
+        return enc.decode(enc.encode(text)[:budget])
+    lo, hi = 0, len(text) # 見積もりは文字数に対して単調なので二分探索
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+def _is_boilerplate(line: str) -> bool:
+    if len(line) < MIN_PARAGRAPH_CHARS and not line.endswith(SENTENCE_END):
+        return True
+    # 長い段落の中に「広告」などが出るのは普通なので、短めの行だけ定型文扱いにする
+    return len(line) < 60 and bool(BOILERPLATE.search(line))
+
+def paragraphs(text: str):
+    """本文を段落に分け、定型文と重複を除いて順に返す"""
+    seen = set()
+    for line in re.split(r"\n+", text or ""):
+        line = re.sub(r"\s+", " ", line).strip()
+        if not line or line in seen or _is_boilerplate(line):
+            continue
+        seen.add(line)
+        yield line
+
+def build_snippet(text: str, budget: int = SNIPPET_TOKENS) -> str:
+    """リード段落から順に、合計 budget トークンまで詰めたスニペットを返す（最後の段落は途中で切る）"""
+    out, used = [], 0
+    for para in paragraphs(text):
+        cost = count_tokens(para) + 1 # 区切りの改行ぶん
+        if used + cost > budget:
+            rest = budget - used
+            if rest > 20: # 切れ端が短すぎるなら入れない
+                out.append(_truncate(para, rest))
+            break
+        out.append(para)
+        used += cost
+    return "\n".join(out)
@@ -4,38 +4,76 @@
 # comment：編集メモ風のひと言
 # comment_type：insight | caution | impact
 # quality：ok | shortened | fallback
-# さらに、軽いリトライ・JSONモード強制・文字数クランプ・旧API互換ラッパー・バッチ処理まで揃った“実運用寄り”の拡張版
-import os, json, time
+# さらに、レート制限付きリトライ・JSONモード強制・文字数クランプ・旧API互換ラッパー・並行バッチ処理まで揃った“実運用寄り”の拡張版
+import os, json, time, random, threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, APIStatusError, APIConnectionError, APITimeoutError
+from utils.ratelimit import RateLimiter
+from utils.summary_cache import get_summary_cache, summary_key
+from utils.snippet import build_snippet, count_tokens, SNIPPET_TOKENS
 
 # 事前設定（.env／モデル／クライアント）
 load_dotenv()
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")  # .env から OPENAI_API_KEY を読み込み。OPENAI_MODEL 未設定時は "gpt-4.1-mini" にフォールバック。
 
+# 並行数とレート制限（アカウントの上限に合わせて .env で調整）
+SUMMARIZE_WORKERS = int(os.getenv("SUMMARIZE_WORKERS", "8")) # batch_summarize_plus の同時リクエスト数
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500")) # 1分あたりのリクエスト数の上限
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000")) # 1分あたりのトークン数の上限
+COMPLETION_TOKENS_ESTIMATE = 300 # 出力側のトークン見積もり（JSON 1件ぶん）
+BATCH_SIZE = int(os.getenv("SUMMARIZE_BATCH_SIZE", "5")) # 1リクエストに詰める記事数（1 にすると1件ずつ）
+BACKOFF_BASE = 0.5 # 再試行の待ち時間の基準（秒）。0.5, 1, 2, 4 ... と倍々にする
+BACKOFF_MAX = 30.0
+
+_limiter = RateLimiter(OPENAI_RPM, OPENAI_TPM)
+
 _client = None
 def get_client():
     """OpenAI() をシングルトンで保持（再接続コスト削減）"""
     global _client
     if _client is None:
-        _client = OpenAI()
+        _client = OpenAI(max_retries=0) # 再試行は _call 側で（レート制限と合わせて）行うので、SDK の自動リトライは切る
     return _client
 
 # —— プロンプト設計（拡張版） ——
+# システムプロンプトは固定文（上限値などの可変部分は user メッセージの limits で渡す）。
+# 毎回同じ先頭部分になるので、プロバイダ側のプロンプトキャッシュ（prefix caching）が効く。
 SYSTEM_PROMPT_PLUS = (
     "あなたは新聞見出しの要約アシスタントです。\n"
+    "入力は JSON で {'limits': {'max_chars','comment_max'}, 'title', 'text'}。\n"
     "出力は必ず JSON で、keys="
     "['summary','keywords','comment','comment_type','quality']。\n"
     "厳守事項：\n"
-    "1) summary: 1〜2文、最大{max_chars}文字。誇張・推測禁止。固有名詞・数値・時期を優先。\n"
+    "1) summary: 1〜2文、最大 limits.max_chars 文字。誇張・推測禁止。固有名詞・数値・時期を優先。\n"
+    "2) keywords: 具体語3〜6個の配列（一般語や重複は不可）。\n"
+    "3) comment: 編集メモ風に短く最大 limits.comment_max 文字。事実ベースの示唆/注意/影響のいずれかに絞る。\n"
+    "4) comment_type: 'insight'|'caution'|'impact' のいずれか。\n"
+    "5) quality: 'ok'|'shortened'|'fallback'。上限超過や情報不足なら 'shortened'。\n"
+    "6) 本文(text)があれば優先（見出しに無い固有情報を抽出）。URLや媒体名は書かない。\n"
+)
+
+# 複数記事を1リクエストにまとめる版（システムプロンプトの送信とリクエストの往復を記事数ぶん減らす）
+SYSTEM_PROMPT_BATCH = (
+    "あなたは新聞見出しの要約アシスタントです。\n"
+    "入力は JSON で {'limits': {'max_chars','comment_max'}, 'items': [{'id','title','text'}, ...]} の複数記事。記事ごとに独立して処理する。\n"
+    "出力は必ず JSON で {'items': [...]}。各要素の keys="
+    "['id','summary','keywords','comment','comment_type','quality']、id は入力と同じ値。\n"
+    "厳守事項：\n"
+    "1) summary: 1〜2文、最大 limits.max_chars 文字。誇張・推測禁止。固有名詞・数値・時期を優先。\n"
     "2) keywords: 具体語3〜6個の配列（一般語や重複は不可）。\n"
-    "3) comment: 編集メモ風に短く最大{comment_max}文字。事実ベースの示唆/注意/影響のいずれかに絞る。\n"
+    "3) comment: 編集メモ風に短く最大 limits.comment_max 文字。事実ベースの示唆/注意/影響のいずれかに絞る。\n"
     "4) comment_type: 'insight'|'caution'|'impact' のいずれか。\n"
     "5) quality: 'ok'|'shortened'|'fallback'。上限超過や情報不足なら 'shortened'。\n"
     "6) 本文(text)があれば優先（見出しに無い固有情報を抽出）。URLや媒体名は書かない。\n"
+    "7) 他の記事の情報を混ぜない。入力のすべての id について1要素ずつ返す。\n"
 )
 
+# 要約キャッシュのキーに入れるプロンプト（どちらか・本文の予算を変えたら既存の要約は使われなくなる）
+PROMPT_FINGERPRINT = SYSTEM_PROMPT_PLUS + SYSTEM_PROMPT_BATCH + f"snippet_tokens={SNIPPET_TOKENS}"
+COMMENT_TYPES = ("insight", "caution", "impact")
+
 # 旧APIとの整合を取りつつ chat.completions の JSONモードを利用
 def _response_format():
     return {"type": "json_object"} # Chat Completions の JSONモードを使用（崩れ対策の第一手）。
@@ -57,21 +95,128 @@ def _coerce_json(text: str) -> Dict:
         "quality": "fallback",
     }
 
-def _call(payload: Dict, max_retries: int = 2) -> str: # 最大2回の再試行＋短い待機。瞬間的なエラー（レート制限・ネットワーク）を吸収。
-    """軽いリトライ付き呼び出し"""
-    last_err = None
+def _estimate_tokens(payload: Dict) -> int:
+    """TPM 用の見積もり（入力のトークン数＋出力ぶん）"""
+    return sum(count_tokens(m.get("content") or "") for m in payload.get("messages", [])) + COMPLETION_TOKENS_ESTIMATE
+
+def _retry_after(err) -> Optional[float]:
+    """429 などのレスポンスに Retry-After(-ms) ヘッダがあれば待つべき秒数を返す"""
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def _is_retryable(err) -> bool:
+    """レート制限(429)・サーバー側エラー(5xx)・通信エラー・空レスポンスだけ再試行する（400系は何度やっても同じ）"""
+    if isinstance(err, (APIConnectionError, APITimeoutError)): # APITimeoutError は APIConnectionError の一種だが明示しておく
+        return True
+    if isinstance(err, APIStatusError):
+        return err.status_code == 429 or err.status_code >= 500
+    return isinstance(err, RuntimeError)
+
+# 呼び出しごとのトークン数・レイテンシの集計（get_usage_stats() で参照）
+_usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "latency": 0.0}
+_usage_lock = threading.Lock()
+
+def _record_usage(resp, latency: float) -> int:
+    """レスポンスの usage を集計に足し、この呼び出しの合計トークン数を返す"""
+    usage = getattr(resp, "usage", None)
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0 # プレフィックスキャッシュに乗った入力トークン
+    with _usage_lock:
+        _usage["calls"] += 1
+        _usage["prompt_tokens"] += prompt
+        _usage["cached_tokens"] += cached
+        _usage["completion_tokens"] += completion
+        _usage["latency"] += latency
+    return getattr(usage, "total_tokens", 0) or (prompt + completion)
+
+def get_usage_stats() -> Dict:
+    """これまでの API 呼び出しの合計（calls, prompt_tokens, cached_tokens, completion_tokens, latency, avg_latency, cached_ratio）"""
+    with _usage_lock:
+        stats = dict(_usage)
+    stats["avg_latency"] = stats["latency"] / stats["calls"] if stats["calls"] else 0.0
+    stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+    return stats
+
+def usage_report() -> str:
+    st = get_usage_stats()
+    return (f"💰 API使用量: calls={st['calls']} prompt={st['prompt_tokens']} "
+            f"(cached={st['cached_tokens']}, {st['cached_ratio'] * 100:.0f}%) completion={st['completion_tokens']} "
+            f"平均{st['avg_latency']:.2f}秒")
+
+def _call(payload: Dict, max_retries: int = 4) -> str:
+    """レート制限付き・再試行付き呼び出し（本文だけ返す）"""
+    return _call_with_usage(payload, max_retries)[0]
+
+def _call_with_usage(payload: Dict, max_retries: int = 4): # 指数バックオフ（ジッター付き）で最大4回再試行。Retry-After があればそれに従う。
+    """レート制限付き・再試行付き呼び出し。戻り値: (本文, 使ったトークン数)"""
     cli = get_client()
-    for _ in range(max_retries + 1):
+    for attempt in range(max_retries + 1):
+        _limiter.acquire(_estimate_tokens(payload)) # RPM / TPM の枠が空くまで待つ
         try:
+            started = time.monotonic()
             resp = cli.chat.completions.create(**payload)
+            tokens = _record_usage(resp, time.monotonic() - started)
             content = resp.choices[0].message.content
             if not content:
                 raise RuntimeError("Empty response content")
-            return content
+            return content, tokens
         except Exception as e:
-            last_err = e
-            time.sleep(0.5)
-    raise last_err
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))) # full jitter：同時に失敗したスレッドが一斉に再送しないようにばらす
+            retry_after = _retry_after(e)
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, BACKOFF_BASE)
+            time.sleep(delay)
+
+def _limits(max_chars: int, comment_max: int):
+    """上限の安全化"""
+    return max(30, min(160, max_chars)), max(40, min(100, comment_max))
+
+def _user_item(title: str, body: str) -> Dict:
+    """モデルに渡す1記事ぶんの入力"""
+    return {
+        "title": title,
+        "text": build_snippet(body, SNIPPET_TOKENS) if body else "",  # 定型文を落としてトークン予算内に収める
+    }
+
+def _user_message(limits: Dict, **fields) -> str:
+    """user メッセージ（上限値はシステムプロンプトではなくここで渡す）"""
+    return json.dumps({"limits": limits, **fields}, ensure_ascii=False)
+
+def _finalize(data: Dict, hard_limit: int, comment_limit: int) -> Dict:
+    """モデル出力1件ぶんを整形＆ガード"""
+    summary = (data.get("summary") or "").strip()
+    comment = (data.get("comment") or "").strip()
+    kws = data.get("keywords") or []
+    if isinstance(kws, str):
+        try:
+            kws = json.loads(kws)
+        except Exception:
+            kws = [k.strip() for k in kws.split(",") if k.strip()]
+    if len(summary) > hard_limit:
+        summary = summary[:hard_limit]
+        data["quality"] = "shortened"
+    if len(comment) > comment_limit:
+        comment = comment[:comment_limit]
+        data["quality"] = "shortened"
+
+    return {
+        "summary": summary,
+        "keywords": kws[:6],
+        "comment": comment,
+        "comment_type": data.get("comment_type", "insight"),
+        "quality": data.get("quality", "ok"),
+        "model": MODEL,
+    } # keywords は最大6件に制限。comment_type が欠けたら insight にフォールバック。
 
 # —— 新: 複合モードのメイン関数 ——
 def generate_summary_plus(
@@ -81,66 +226,144 @@ def generate_summary_plus(
     body: str = "",
     comment_max: int = 70,
     temperature: float = 0.2,
+    use_cache: bool = True,
 ) -> Dict:
     """
     要約 + 独自コメントを同時生成する拡張版。
     戻り値: dict(summary, keywords[], comment, comment_type, quality, model)
+    use_cache=False で要約キャッシュを使わずに必ず API を呼ぶ（作り直したいとき）。
     """
     # 上限の安全化
-    hard_limit = max(30, min(160, max_chars))
-    comment_limit = max(40, min(100, comment_max))
+    hard_limit, comment_limit = _limits(max_chars, comment_max)
 
-    system = SYSTEM_PROMPT_PLUS.format(max_chars=hard_limit, comment_max=comment_limit)
+    # 同じ (モデル, プロンプト, 上限, タイトル, 本文) の要約が既にあれば API を呼ばない
+    cache = get_summary_cache() if use_cache else None
+    key = summary_key(MODEL, PROMPT_FINGERPRINT, hard_limit, comment_limit, title, body or "")
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+    limits = {"max_chars": hard_limit, "comment_max": comment_limit}
+    user = _user_message(limits, **_user_item(title, body))
 
-    if body:
-        snippet = body[:4000]  # トークン節約
-        user = {
-            "title": title,
-            "text": snippet
-        }
-    else:
-        user = {
-            "title": title,
-            "text": ""
-        }
     # APIペイロード
     payload = {
         "model": MODEL,
         "messages": [
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
+            {"role": "system", "content": SYSTEM_PROMPT_PLUS},
+            {"role": "user", "content": user},
         ],
         "response_format": _response_format(),
         "temperature": temperature,
     }
     # 呼び出し → パース
-    raw = _call(payload)
+    raw, tokens = _call_with_usage(payload)
     data = _coerce_json(raw)
 
     # 整形＆ガード
-    summary = (data.get("summary") or "").strip()
-    comment = (data.get("comment") or "").strip()
-    kws = data.get("keywords") or []
-    if isinstance(kws, str):
-        try:
-            kws = json.loads(kws)
-        except Exception:
-            kws = [k.strip() for k in kws.split(",") if k.strip()]
-    if len(summary) > hard_limit:
-        summary = summary[:hard_limit]
-        data["quality"] = "shortened"
-    if len(comment) > comment_limit:
-        comment = comment[:comment_limit]
-        data["quality"] = "shortened"
+    result = _finalize(data, hard_limit, comment_limit)
+    if cache and result["quality"] != "fallback": # JSONが壊れていた結果は残さない（次回は取り直す）
+        cache.put(key, result, tokens)
+    return result
 
-    return {
-        "summary": summary,
-        "keywords": kws[:6],
-        "comment": comment,
-        "comment_type": data.get("comment_type", "insight"),
-        "quality": data.get("quality", "ok"),
+# —— 新: 複数記事を1リクエストで要約 ——
+def _valid_batch_item(d) -> bool:
+    """バッチ応答の1要素が使える形か（足りない・壊れているものは1件ずつ取り直す）"""
+    return (
+        isinstance(d, dict)
+        and isinstance(d.get("summary"), str) and d["summary"].strip() != ""
+        and isinstance(d.get("keywords"), (list, str))
+        and isinstance(d.get("comment", ""), str)
+        and d.get("comment_type", "insight") in COMMENT_TYPES
+    )
+
+def _summarize_chunk(chunk: List[Dict], hard_limit: int, comment_limit: int, temperature: float):
+    """
+    chunk: [{'title','body'}, ...]（BATCH_SIZE 件まで）を1リクエストで要約する。
+    戻り値: (chunk と同じ順の [結果dict or None], 使ったトークン数)。None は応答に無かった・壊れていた要素。
+    """
+    limits = {"max_chars": hard_limit, "comment_max": comment_limit}
+    user = _user_message(limits, items=[
+        {"id": str(i), **_user_item(it.get("title", ""), it.get("body", ""))} for i, it in enumerate(chunk, start=1)
+    ])
+    payload = {
         "model": MODEL,
-    } # keywords は最大6件に制限。comment_type が欠けたら insight にフォールバック。
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT_BATCH},
+            {"role": "user", "content": user},
+        ],
+        "response_format": _response_format(),
+        "temperature": temperature,
+    }
+    raw, tokens = _call_with_usage(payload)
+    try:
+        returned = json.loads(raw).get("items") or []
+    except Exception:
+        returned = []
+    by_id = {str(d.get("id")): d for d in returned if isinstance(d, dict)}
+
+    results = []
+    for i in range(1, len(chunk) + 1):
+        d = by_id.get(str(i))
+        results.append(_finalize(d, hard_limit, comment_limit) if _valid_batch_item(d) else None)
+    return results, tokens
+
+def generate_summary_plus_batch(
+    items: List[Dict],
+    max_chars: int = 90,
+    comment_max: int = 70,
+    temperature: float = 0.2,
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = SUMMARIZE_WORKERS,
+    use_cache: bool = True,
+) -> List[Dict]:
+    """
+    items: [{ 'title': str, 'body': Optional[str] }, ...] を batch_size 件ずつ1リクエストにまとめて要約する。
+    応答に無かった・壊れていた記事だけ generate_summary_plus() で1件ずつ取り直す。
+    戻り値: items と同じ順の generate_summary_plus() と同じ形の dict（取り直しも失敗した要素は例外オブジェクト）
+    """
+    hard_limit, comment_limit = _limits(max_chars, comment_max)
+    cache = get_summary_cache() if use_cache else None
+    keys = [summary_key(MODEL, PROMPT_FINGERPRINT, hard_limit, comment_limit, it.get("title", ""), it.get("body", "") or "") for it in items]
+
+    results: List = [None] * len(items)
+    todo = [] # キャッシュに無かった要素の添字
+    for i, key in enumerate(keys):
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            results[i] = dict(cached)
+        else:
+            todo.append(i)
+
+    def _run_chunk(idxs: List[int]):
+        try:
+            out, tokens = _summarize_chunk([items[i] for i in idxs], hard_limit, comment_limit, temperature)
+        except Exception as e:
+            print(f"[summarize WARN] バッチ要約に失敗、1件ずつ取り直します: {e}")
+            out, tokens = [None] * len(idxs), 0
+        for i, res in zip(idxs, out):
+            if res is not None:
+                results[i] = res
+                if cache and res["quality"] != "fallback":
+                    cache.put(keys[i], res, tokens // len(idxs)) # トークンは記事数で按分して記録
+        # 足りない・壊れていた記事だけ1件ずつ
+        for i in idxs:
+            if results[i] is None:
+                it = items[i]
+                try:
+                    results[i] = generate_summary_plus(
+                        title=it.get("title", ""), source=it.get("source", ""), body=it.get("body", "") or "",
+                        max_chars=max_chars, comment_max=comment_max, temperature=temperature, use_cache=use_cache,
+                    )
+                except Exception as e:
+                    results[i] = e
+
+    chunks = [todo[j:j + batch_size] for j in range(0, len(todo), max(1, batch_size))]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix="summarize") as pool:
+            list(pool.map(_run_chunk, chunks))
+    return results
 
 # —— 既存互換（旧インターフェース） ——
 def generate_summary(title: str, source: str, max_chars: int = 60, body: str = "") -> dict:
@@ -163,30 +386,47 @@ def generate_summary(title: str, source: str, max_chars: int = 60, body: str = "
     }
 
 # —— まとめ実行（複数件） ——
-def batch_summarize_plus(items: List[Dict], **kwargs) -> List[Dict]:
+def _failed(it: Dict, err) -> Dict:
+    return {
+        "summary": (it.get("title") or "")[:90],
+        "keywords": [],
+        "comment": "",
+        "comment_type": "insight",
+        "quality": "fallback",
+        "model": MODEL,
+        "error": str(err),
+    }
+
+def batch_summarize_plus(items: List[Dict], max_workers: int = SUMMARIZE_WORKERS, batch_size: int = BATCH_SIZE, **kwargs) -> List[Dict]:
     """
     items: [{ 'title': str, 'body': Optional[str], 'source': Optional[str] }, ...]
-    それぞれに generate_summary_plus を適用。
+    batch_size > 1 なら generate_summary_plus_batch で複数記事を1リクエストにまとめ、
+    1 なら1件ずつ generate_summary_plus を適用（どちらも最大 max_workers 本を並行。レート制限は _call 側で共有）。
+    戻り値は items と同じ順番。個別エラーはその要素だけ fallback（error 付き）。全体停止を避けます。
     """
-    out: List[Dict] = []
-    for it in items: # 1件ずつ順次処理し、個別エラーはその要素だけ fallback。全体停止を避けます。
-        try:
-            out.append(generate_summary_plus(
-                title=it.get("title", ""),
-                source=it.get("source", ""),
-                body=it.get("body", "") or it.get("text", ""),
-                **kwargs
-            ))
-        except Exception as e:
-            out.append({
-                "summary": (it.get("title") or "")[:90],
-                "keywords": [],
-                "comment": "",
-                "comment_type": "insight",
-                "quality": "fallback",
-                "model": MODEL,
-                "error": str(e),
-            })
+    if not items:
+        return []
+    norm = [{**it, "body": it.get("body", "") or it.get("text", "")} for it in items]
+
+    if batch_size > 1:
+        results = generate_summary_plus_batch(norm, batch_size=batch_size, max_workers=max_workers, **kwargs)
+        out = [_failed(it, r) if isinstance(r, Exception) else r for it, r in zip(norm, results)]
+    else:
+        def _one(it: Dict) -> Dict:
+            try:
+                return generate_summary_plus(
+                    title=it.get("title", ""),
+                    source=it.get("source", ""),
+                    body=it["body"],
+                    **kwargs
+                )
+            except Exception as e:
+                return _failed(it, e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(norm))), thread_name_prefix="summarize") as pool:
+            out = list(pool.map(_one, norm))
+    print(get_summary_cache().report())
+    print(usage_report())
     return out
 
 # —— 動作確認（直接実行） ——（サンプル）
@@ -0,0 +1,58 @@
+# 要約結果のキャッシュ（同じ記事を同じ設定で要約し直すときに API を呼ばない）
+# キー = (MODEL, プロンプトテンプレートのハッシュ, max_chars, comment_max, タイトル, 本文のハッシュ)
+# MODEL や SYSTEM_PROMPT_PLUS を変えるとキーが変わるので、古いエントリは自然に使われなくなる（LRU で消えていく）。
+import os # os：保存先パス・環境変数
+import json # json：キーの組み立て・値の保存形式
+import hashlib # hashlib：プロンプト・本文のハッシュ
+import threading # threading：ヒット数などの集計を守るロック
+from utils.disk_lru import DiskLRU
+
+CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", os.path.join(os.path.dirname(__file__), "../.cache/summaries.sqlite3"))
+MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "50000"))
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def summary_key(model: str, prompt: str, max_chars: int, comment_max: int, title: str, body: str) -> str:
+    return _sha256(json.dumps(
+        [model, _sha256(prompt), max_chars, comment_max, title, _sha256(body)],
+        ensure_ascii=False,
+    ))
+
+class SummaryCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.store = DiskLRU(path, max_entries=max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0 # ヒットしたおかげで使わずに済んだトークン数（元の呼び出しで使った分）
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        raw = self.store.get(key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            entry = json.loads(raw)
+            self.hits += 1
+            self.saved_tokens += entry.get("tokens", 0)
+        return entry["result"]
+
+    def put(self, key: str, result: dict, tokens: int = 0):
+        self.store.put(key, json.dumps({"result": result, "tokens": tokens}, ensure_ascii=False))
+
+    def report(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            rate = (self.hits / total * 100) if total else 0.0
+            return f"🧠 要約キャッシュ: hit={self.hits} miss={self.misses} ({rate:.0f}%) 節約トークン={self.saved_tokens}"
+
+_default = None
+_default_lock = threading.Lock()
+def get_summary_cache():
+    """プロセス内で共有するキャッシュ"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SummaryCache()
+    return _default